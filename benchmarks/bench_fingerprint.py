@@ -0,0 +1,93 @@
+"""
+Fingerprint Index Benchmark: candidate count per query vs. registry size.
+
+向 FingerprintIndex 插入 N 个随机 64 位指纹，再查询其中一部分的近重复 (翻转 <= radius 位) 与全新指纹，
+统计每次查询精确比较的候选数、耗时与召回率 (与暴力扫描对比)。
+对照列为按 radius + 1 段切分、整段精确匹配 (改动前的方案，当时默认半径 8，约 7 位一段) 时的候选数，段越窄越接近线性扫描。
+
+    python benchmarks/bench_fingerprint.py
+    python benchmarks/bench_fingerprint.py --sizes 1000 10000 100000 --radius 7
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from src.core.fingerprint import FingerprintIndex, DEFAULT_RADIUS, split_chunks
+from src.core.image_algo import hamming64
+
+
+def near(h, radius, rng):
+    for b in rng.sample(range(64), rng.randint(0, radius)):
+        h ^= 1 << b
+    return h
+
+
+def legacy_candidates(hashes, queries, radius):
+    """Note: radius + 1 段整段精确匹配 (改动前的切分方式) 的平均候选数"""
+    chunks = split_chunks(64, radius + 1)
+    tables = [{} for _ in chunks]
+    for key, h in enumerate(hashes):
+        for table, (shift, mask) in zip(tables, chunks):
+            table.setdefault((h >> shift) & mask, []).append(key)
+    total = 0
+    for q in queries:
+        seen = set()
+        for table, (shift, mask) in zip(tables, chunks):
+            seen.update(table.get((q >> shift) & mask, ()))
+        total += len(seen)
+    return total / len(queries)
+
+
+def bench(size, radius, queries, rng):
+    hashes = [rng.getrandbits(64) for _ in range(size)]
+    index = FingerprintIndex(radius)
+    for key, h in enumerate(hashes):
+        index.add(key, h)
+
+    half = queries // 2
+    probes = [near(hashes[rng.randrange(size)], radius, rng) for _ in range(half)]
+    probes += [rng.getrandbits(64) for _ in range(queries - half)]
+
+    t0 = time.perf_counter()
+    results = [index.query(q) for q in probes]
+    elapsed = time.perf_counter() - t0
+
+    # 召回率：只对前 50 个查询做暴力扫描核对
+    found = expected = 0
+    for q, hits in zip(probes[:50], results[:50]):
+        truth = {k for k, h in enumerate(hashes) if hamming64(q, h) <= radius}
+        expected += len(truth)
+        found += len(truth & {k for _, k in hits})
+    return {
+        "candidates": index.compared / queries,
+        "us_per_query": elapsed / queries * 1e6,
+        "recall": found / expected if expected else 1.0,
+        "legacy": legacy_candidates(hashes, probes, radius),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 4000, 16000, 64000])
+    parser.add_argument("--radius", type=int, default=DEFAULT_RADIUS)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"radius {args.radius}, {args.queries} queries per size (half near-duplicates, half unseen)")
+    print(f"{'N':>8} | {'cand/query':>10} | {'us/query':>8} | {'recall':>6} | {'legacy cand/query':>17}")
+    for size in args.sizes:
+        r = bench(size, args.radius, args.queries, rng)
+        print(f"{size:>8} | {r['candidates']:>10.2f} | {r['us_per_query']:>8.1f} | {r['recall']:>6.3f} | "
+              f"{r['legacy']:>17.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Pipeline Benchmark: per-stage microbenchmarks + end-to-end throughput + accuracy.
+
+在本地合成确定性的幻灯片视频 (带 ground truth)，输出：
+    micro      -- 各阶段单次调用耗时 (decode / crop / cvtColor / resize / MSE / hash / blur / encode ...)
+    end_to_end -- SlideExtractor 完整运行的 视频帧/秒、每小时视频耗时、实时倍率
+    accuracy   -- 抽取结果与 ground truth 幻灯片序列的比对 (召回率 / 准确率 / 是否完全一致)
+
+    python benchmarks/bench_pipeline.py --json bench.json
+    python benchmarks/bench_pipeline.py --json new.json --baseline bench.json      # 与上一次提交对比
+    python benchmarks/bench_pipeline.py --video talk.mp4 --truth talk_truth.json   # 自带视频 (truth 可选)
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import cv2
+import numpy as np
+
+from benchmarks.synth import synth_deck, render_slide, expected_slides, save_truth, load_truth
+from src.core.extractor import SlideExtractor, ExtractionParams
+from src.core.image_algo import (auto_crop_smart, crop_roi, dhash64, frame_diff_series, get_blur_score,
+                                 get_dhash, gray_thumbnail, thumb_diff)
+from src.core.writer import OutputFormat
+from src.utils.file_ops import cv2_imread_safe
+
+# 识别抽取结果属于哪一页时允许的缩略图 MSE (JPEG 压缩 + 噪声远低于此值)
+MATCH_THRESHOLD = 3.0
+
+
+def _time_per_call(fn, items, repeat):
+    """Returns: 单次调用耗时的中位数 (微秒)，在 repeat 轮中取最快的一轮以降低抖动"""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for item in items:
+            fn(item)
+        best = min(best, (time.perf_counter() - t0) / len(items))
+    return best * 1e6
+
+
+def bench_decode(video, count):
+    """Returns: {'decode_read_us', 'decode_grab_us'} 顺序解码/跳帧的单帧耗时"""
+    out = {}
+    for name, op in (("decode_read_us", lambda c: c.read()[0]), ("decode_grab_us", lambda c: c.grab())):
+        cap = cv2.VideoCapture(video)
+        n, t0 = 0, time.perf_counter()
+        while n < count and op(cap):
+            n += 1
+        out[name] = (time.perf_counter() - t0) / max(n, 1) * 1e6
+        cap.release()
+    return out
+
+
+def sample_frames(video, count):
+    """Note: 在全片均匀取 count 帧用于微基准"""
+    cap = cv2.VideoCapture(video)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    frames = []
+    for idx in np.linspace(0, max(total - 1, 0), count).astype(int):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(idx))
+        ret, frame = cap.read()
+        if ret:
+            frames.append(frame)
+    cap.release()
+    return frames
+
+
+def bench_micro(video, frames, repeat):
+    h, w = frames[0].shape[:2]
+    roi = (w // 10, h // 10, w * 8 // 10, h * 8 // 10)
+    grays = [cv2.cvtColor(f, cv2.COLOR_BGR2GRAY) for f in frames]
+    thumbs = [gray_thumbnail(f) for f in frames]
+    pairs = list(zip(thumbs, thumbs[1:] + thumbs[:1]))
+    stack = np.stack(thumbs)
+
+    micro = bench_decode(video, 300)
+    micro.update({
+        "crop_roi_us": _time_per_call(lambda f: crop_roi(f, roi), frames, repeat),
+        "cvtcolor_us": _time_per_call(lambda f: cv2.cvtColor(f, cv2.COLOR_BGR2GRAY), frames, repeat),
+        "resize_64_us": _time_per_call(lambda g: cv2.resize(g, (64, 64)), grays, repeat),
+        "gray_thumbnail_us": _time_per_call(gray_thumbnail, frames, repeat),
+        "mse_pair_us": _time_per_call(lambda p: thumb_diff(*p), pairs, repeat),
+        "mse_vectorized_us": _time_per_call(frame_diff_series, [stack], repeat) / len(stack),
+        "dhash_thumb_us": _time_per_call(dhash64, thumbs, repeat),
+        "dhash_frame_us": _time_per_call(get_dhash, frames, repeat),
+        "blur_score_us": _time_per_call(get_blur_score, frames, repeat),
+        "auto_crop_us": _time_per_call(auto_crop_smart, frames, repeat),
+    })
+    for spec in ("jpg", "png", "webp"):
+        params = OutputFormat.parse(spec).params() or []
+        micro[f"encode_{spec}_us"] = _time_per_call(lambda f: cv2.imencode("." + spec, f, params), frames[:10], 1)
+    return micro
+
+
+def bench_end_to_end(video, duration, frame_count, args):
+    params = ExtractionParams(diff_threshold=args.threshold, stability_frames=args.stability,
+                              check_interval=args.interval)
+    with tempfile.TemporaryDirectory() as out_dir:
+        engine = SlideExtractor(video, out_dir, project_name="bench", params=params, make_pdf=args.pdf,
+                                workers=args.workers, sampling=args.sampling, use_cache=False)
+        t0 = time.perf_counter()
+        result = engine.run()
+        elapsed = time.perf_counter() - t0
+        slides = [cv2_imread_safe(p, cv2.IMREAD_COLOR) for p in result.images]
+
+    stats = {
+        "elapsed_s": elapsed,
+        "video_fps": frame_count / elapsed,
+        "sec_per_video_hour": elapsed / duration * 3600,
+        "realtime_factor": duration / elapsed,
+        "slides": len(result.images),
+    }
+    return stats, slides
+
+
+def score_accuracy(slides, truth, size, global_dedup=True):
+    """
+    Note: 用缩略图 MSE 把每张抽取结果识别为某一页 (识别失败记为 -1)，再与期望序列比对
+    """
+    ids = sorted({seg["slide"] for seg in truth["segments"]})
+    refs = {sid: gray_thumbnail(render_slide(sid, size)) for sid in ids}
+    detected = []
+    for img in slides:
+        if img is None:
+            detected.append(-1)
+            continue
+        g = gray_thumbnail(img)
+        sid, d = min(((sid, thumb_diff(g, ref)) for sid, ref in refs.items()), key=lambda x: x[1])
+        detected.append(sid if d < MATCH_THRESHOLD else -1)
+
+    expected = expected_slides(truth, global_dedup)
+    hits = len(set(detected) & set(expected))
+    return {
+        "expected": len(expected),
+        "detected": len(detected),
+        "matched": hits,
+        "recall": hits / len(expected) if expected else 1.0,
+        "precision": hits / len(detected) if detected else 1.0,
+        "unrecognised": detected.count(-1),
+        "duplicates": len(detected) - len(set(detected)),
+        "exact_sequence": detected == expected,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report, baseline=None):
+    def _delta(section, key, value):
+        if not baseline or key not in baseline.get(section, {}):
+            return ""
+        old = baseline[section][key]
+        if not isinstance(old, (int, float)) or not old:
+            return ""
+        return f"  ({(value - old) / old * 100:+.1f}%)"
+
+    print("\n== Micro (per call) ==")
+    for key, value in report["micro"].items():
+        print(f"  {key:<22} {value:>10.1f}{_delta('micro', key, value)}")
+    print("\n== End to end ==")
+    for key, value in report["end_to_end"].items():
+        print(f"  {key:<22} {value:>10.2f}{_delta('end_to_end', key, value)}")
+    if report.get("accuracy"):
+        print("\n== Accuracy ==")
+        for key, value in report["accuracy"].items():
+            print(f"  {key:<22} {value!s:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--video", help="Existing video (default: synthesise one)")
+    parser.add_argument("--truth", help="Ground truth JSON for --video (as written by --keep-video)")
+    parser.add_argument("--duration", type=float, default=300, help="Synthetic video length in seconds")
+    parser.add_argument("--fps", type=float, default=30, help="Synthetic video frame rate")
+    parser.add_argument("--size", default="1280x720", help="Synthetic video size WxH")
+    parser.add_argument("--seed", type=int, default=0, help="Synthetic deck seed")
+    parser.add_argument("--keep-video", help="Directory to keep the synthetic video + truth JSON")
+    parser.add_argument("--threshold", type=float, default=10)
+    parser.add_argument("--stability", type=int, default=5)
+    parser.add_argument("--interval", type=float, default=0.5)
+    parser.add_argument("--sampling", choices=("auto", "grab", "seek"), default="auto")
+    parser.add_argument("-j", "--workers", type=int, default=1)
+    parser.add_argument("--pdf", action="store_true", help="Include PDF generation in the end-to-end run")
+    parser.add_argument("--samples", type=int, default=40, help="Frames used for microbenchmarks")
+    parser.add_argument("--repeat", type=int, default=3, help="Microbenchmark rounds (fastest is kept)")
+    parser.add_argument("--json", help="Write the report to this JSON file")
+    parser.add_argument("--baseline", help="Previous JSON report to compare against")
+    args = parser.parse_args()
+
+    tmp = None
+    video, truth = args.video, load_truth(args.truth) if args.truth else None
+    if not video:
+        w, h = (int(v) for v in args.size.lower().split("x"))
+        out_dir = args.keep_video
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        else:
+            tmp = tempfile.TemporaryDirectory()
+            out_dir = tmp.name
+        video = os.path.join(out_dir, f"deck_{args.seed}.mp4")
+        print(f"Synthesising {args.duration:.0f}s @ {args.fps:.0f}fps {w}x{h} ...")
+        truth = synth_deck(video, args.duration, args.fps, (w, h), seed=args.seed)
+        if args.keep_video:
+            save_truth(truth, os.path.splitext(video)[0] + "_truth.json")
+
+    try:
+        cap = cv2.VideoCapture(video)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+        duration = frame_count / fps if fps else 0
+
+        frames = sample_frames(video, args.samples)
+        report = {
+            "meta": {
+                "commit": _git_commit(),
+                "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "python": platform.python_version(),
+                "opencv": cv2.__version__,
+                "numpy": np.__version__,
+                "machine": f"{platform.system()} {platform.machine()} ({os.cpu_count()} cpus)",
+                "video": os.path.basename(video),
+                "frames": frame_count,
+                "duration_s": duration,
+                "size": f"{frames[0].shape[1]}x{frames[0].shape[0]}" if frames else None,
+                "params": {k: v for k, v in vars(args).items() if k not in ("json", "baseline", "keep_video")},
+            },
+            "micro": bench_micro(video, frames, args.repeat),
+        }
+        report["end_to_end"], slides = bench_end_to_end(video, duration, frame_count, args)
+        if truth:
+            report["accuracy"] = score_accuracy(slides, truth, tuple(truth["size"]))
+    finally:
+        if tmp:
+            tmp.cleanup()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Synthetic slide-deck videos with ground truth (no downloads needed).
+
+每页幻灯片由随机色块 + 页码文字组成，按 seed 完全确定；
+页间使用硬切或淡入淡出过渡，偶尔翻回之前的某一页 (检验全局去重)，
+每帧叠加循环使用的低幅噪声，模拟压缩与摄像头噪点。
+"""
+import json
+
+import cv2
+import numpy as np
+
+
+def render_slide(slide_id, size=(1280, 720)):
+    """Returns: 第 slide_id 页的 BGR 图像 (同一 id 每次渲染结果相同)"""
+    w, h = size
+    rng = np.random.default_rng(1000 + slide_id)
+    slide = np.full((h, w, 3), 240, np.uint8)
+    for _ in range(12):
+        bw, bh = int(w * 0.15), int(h * 0.07)
+        x, y = int(rng.integers(0, w - bw)), int(rng.integers(int(h * 0.2), h - bh))
+        cv2.rectangle(slide, (x, y), (x + bw, y + bh), [int(c) for c in rng.integers(0, 200, 3)], -1)
+    cv2.putText(slide, f"Slide {slide_id}", (int(w * 0.05), int(h * 0.12)), cv2.FONT_HERSHEY_SIMPLEX,
+                h / 400, (0, 0, 0), max(1, h // 240))
+    return slide
+
+
+def plan_deck(duration, slide_sec=(20, 60), seed=0, revisit_prob=0.1, fade_prob=0.5, fade_sec=0.5):
+    """
+    Returns: 分段列表 [{"slide": id, "start": 秒, "end": 秒, "fade": bool}]
+    fade 表示该段开头是从上一页淡入 (过渡期间画面持续变化)
+    """
+    rng = np.random.default_rng(seed)
+    segments, t, next_id = [], 0.0, 0
+    while t < duration:
+        length = float(rng.uniform(*slide_sec))
+        if segments and rng.random() < revisit_prob and next_id > 2:
+            slide = int(rng.integers(0, next_id - 1))
+            if slide == segments[-1]["slide"]:
+                slide, next_id = next_id, next_id + 1
+        else:
+            slide, next_id = next_id, next_id + 1
+        fade = bool(segments) and rng.random() < fade_prob
+        segments.append({"slide": slide, "start": round(t, 3), "end": round(min(duration, t + length), 3),
+                         "fade": fade and length > fade_sec * 4})
+        t += length
+    return segments
+
+
+def synth_deck(path, duration=300, fps=30, size=(1280, 720), slide_sec=(20, 60), seed=0,
+               revisit_prob=0.1, fade_prob=0.5, fade_sec=0.5, fourcc="mp4v"):
+    """
+    Note: 写出合成视频并返回 ground truth：
+        {"fps", "size", "duration", "frames", "fade_sec", "segments": [...]}
+    """
+    w, h = size
+    segments = plan_deck(duration, slide_sec, seed, revisit_prob, fade_prob, fade_sec)
+    noise_rng = np.random.default_rng(seed + 1)
+    noise = [noise_rng.integers(-2, 3, (h, w, 3), dtype=np.int16) for _ in range(8)]
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, (w, h))
+    if not writer.isOpened():
+        raise RuntimeError(f"Cannot open VideoWriter for {path}")
+    cache, prev, n = {}, None, 0
+    try:
+        for seg in segments:
+            slide = cache.setdefault(seg["slide"], render_slide(seg["slide"], size))
+            base16 = slide.astype(np.int16)
+            fade_frames = int(fade_sec * fps) if seg["fade"] and prev is not None else 0
+            for i in range(int(round(seg["end"] * fps)) - int(round(seg["start"] * fps))):
+                if i < fade_frames:
+                    a = (i + 1) / (fade_frames + 1)
+                    frame16 = (prev.astype(np.float32) * (1 - a) + slide.astype(np.float32) * a).astype(np.int16)
+                else:
+                    frame16 = base16
+                writer.write(np.clip(frame16 + noise[n % len(noise)], 0, 255).astype(np.uint8))
+                n += 1
+            prev = slide
+    finally:
+        writer.release()
+
+    return {"fps": fps, "size": list(size), "duration": duration, "frames": n, "fade_sec": fade_sec,
+            "seed": seed, "segments": segments}
+
+
+def expected_slides(truth, global_dedup=True):
+    """Returns: 期望被抽取的幻灯片 id 序列 (global_dedup 时翻回的旧页不计入)"""
+    out, seen = [], set()
+    for seg in truth["segments"]:
+        sid = seg["slide"]
+        if out and out[-1] == sid:
+            continue
+        if global_dedup and sid in seen:
+            continue
+        out.append(sid)
+        seen.add(sid)
+    return out
+
+
+def save_truth(truth, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(truth, f, indent=2)
+
+
+def load_truth(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
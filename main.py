@@ -31,19 +31,37 @@ def initialize_high_dpi_awareness():
             pass
 
 
+def is_cli_invocation(argv):
+    from src.cli import is_cli_invocation as check
+    return check(argv)
+
+
+def run_cli(argv):
+    """Note: 命令行模式 (python main.py extract ...)，全程不加载 Tk / ttkbootstrap"""
+    from src.cli import main as cli_main
+    return cli_main(argv)
+
+
 def bootstrap():
     """Application Entry Point"""
     # Safety: 防止 Windows 下 PyInstaller 打包后的多进程无限递归炸弹
     multiprocessing.freeze_support()
 
     configure_runtime_path()
+
+    if is_cli_invocation(sys.argv[1:]):
+        sys.exit(run_cli(sys.argv[1:]))
+
+    # Note: 其余参数 (文件关联 / 拖放) 视为要打开的视频，只取第一个存在的文件
+    video = next((arg for arg in sys.argv[1:] if os.path.isfile(arg)), None)
+
     initialize_high_dpi_awareness()
 
     try:
         # Note: 延迟导入，确保环境配置完成后再加载 UI 依赖
         from src.ui.main_window import PPTExtractorEngine
 
-        app = PPTExtractorEngine()
+        app = PPTExtractorEngine(video)
         # Refactor: 直接运行，进入主事件循环
         app.mainloop()
 
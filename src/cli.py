@@ -0,0 +1,509 @@
+import argparse
+import os
+import signal
+import sqlite3
+import sys
+import time
+
+from src.utils.time_ops import parse_time, format_time
+
+
+def _parse_roi(text):
+    """Note: ROI 参数格式为 x,y,w,h (像素)"""
+    try:
+        x, y, w, h = (int(v) for v in text.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError("ROI must be 'x,y,w,h'")
+    if w <= 0 or h <= 0:
+        raise argparse.ArgumentTypeError("ROI width/height must be positive")
+    return x, y, w, h
+
+
+def _parse_time_arg(text):
+    sec = parse_time(text)
+    if sec < 0:
+        raise argparse.ArgumentTypeError(f"Invalid time '{text}', expected HH:MM:SS / MM:SS / SS")
+    return sec
+
+
+def _parse_format(text):
+    from src.core.writer import OutputFormat
+
+    try:
+        return OutputFormat.parse(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def _parse_radius(text, max_radius):
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid radius '{text}'")
+    if not 0 <= value <= max_radius:
+        raise argparse.ArgumentTypeError(f"Radius must be 0-{max_radius}")
+    return value
+
+
+def _parse_dedup_radius(text):
+    from src.core.fingerprint import MAX_RADIUS
+
+    return _parse_radius(text, MAX_RADIUS)
+
+
+def _parse_query_radius(text):
+    from src.core.library import MAX_QUERY_RADIUS
+
+    return _parse_radius(text, MAX_QUERY_RADIUS)
+
+
+def _positive_float(text):
+    try:
+        value = float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid number '{text}'")
+    if not 0 < value < float("inf"):
+        raise argparse.ArgumentTypeError("Must be greater than 0")
+    return value
+
+
+def _positive_int(text):
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid integer '{text}'")
+    if value < 1:
+        raise argparse.ArgumentTypeError("Must be at least 1")
+    return value
+
+
+def _parse_workers(text):
+    """Note: 0 保留为“全部 CPU 核心”"""
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid integer '{text}'")
+    if value < 0:
+        raise argparse.ArgumentTypeError("Workers must be 0 (all CPU cores) or a positive integer")
+    return value
+
+
+def _log(text):
+    ts = time.strftime("%H:%M:%S")
+    sys.stderr.write(f"[{ts}] {text}\n")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="main.py", description="PPT Extractor Pro - headless command line")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("extract", help="Extract slides from a video without loading the GUI")
+    p.add_argument("video", help="Source video file")
+    p.add_argument("-o", "--output", required=True, help="Base output directory")
+    p.add_argument("-n", "--project", default=None, help="Project name (default: Lecture_<timestamp>)")
+    _add_detection_args(p)
+    p.add_argument("-j", "--workers", type=_parse_workers, default=1,
+                   help="Decode time shards in N processes (0 = all CPU cores)")
+    p.add_argument("--library", nargs="?", const="", default=None, metavar="DB",
+                   help="Add the finished project to the slide library (default DB if no path)")
+    p.add_argument("--no-resume", action="store_true", help="Ignore an existing checkpoint and start over")
+    p.add_argument("--checkpoint-interval", type=_positive_float, default=30.0, help="Seconds between checkpoints")
+    p.add_argument("--profile", action="store_true",
+                   help="Time each pipeline stage and write profile.json / profile.csv to the project dir")
+    p.add_argument("-q", "--quiet", action="store_true", help="Only print the final summary")
+    p.set_defaults(func=cmd_extract)
+
+    p = sub.add_parser("batch", help="Extract every video in a folder / glob, one project per video")
+    p.add_argument("source", help="Directory or glob pattern, e.g. 'D:/Semester/*.mp4'")
+    p.add_argument("-o", "--output", required=True, help="Base output directory")
+    _add_detection_args(p)
+    p.add_argument("-c", "--concurrency", type=int, default=0, help="Videos processed in parallel (0 = CPU cores)")
+    p.add_argument("--force", action="store_true", help="Re-run jobs that already finished")
+    p.add_argument("--library", nargs="?", const="", default=None, metavar="DB",
+                   help="Add finished projects to the slide library (default DB if no path)")
+    p.set_defaults(func=cmd_batch)
+
+    p = sub.add_parser("sweep", help="Count slides for a grid of threshold x stability values (single decode pass)")
+    p.add_argument("video", help="Source video file")
+    _add_scan_args(p)
+    p.add_argument("--thresholds", type=float, nargs="+", default=[5, 8, 10, 12, 15, 20],
+                   help="Diff thresholds to evaluate")
+    p.add_argument("--stabilities", type=_positive_int, nargs="+", default=[2, 3, 5, 8],
+                   help="Stability values to evaluate")
+    _add_dedup_args(p)
+    p.set_defaults(func=cmd_sweep)
+
+    p = sub.add_parser("proxy", help="Build the low-resolution scan proxy ahead of time (stored in the feature cache)")
+    p.add_argument("videos", nargs="+", help="Source video files")
+    p.add_argument("--cache-dir", default=None, help="Feature cache directory (default: ~/.cache/ppt_extractor)")
+    p.add_argument("--cache-size", type=float, default=2.0, help="Feature cache size limit in GB (LRU eviction)")
+    p.set_defaults(func=cmd_proxy)
+
+    p = sub.add_parser("library", help="Cross-project slide library (SQLite perceptual-hash index)")
+    lib = p.add_subparsers(dest="action", required=True)
+    q = lib.add_parser("index", help="Incrementally index every project (folder with Runs/) under the given roots")
+    q.add_argument("roots", nargs="+", help="Output directories or single project directories")
+    q.add_argument("--prune", action="store_true", help="Drop projects that no longer exist on disk")
+    _add_library_arg(q)
+    q.set_defaults(func=cmd_library_index)
+    q = lib.add_parser("query", help="Find near-duplicates of the given images in the library")
+    q.add_argument("images", nargs="+", help="Slide images to look up")
+    q.add_argument("--radius", type=_parse_query_radius, default=6, help="Max dHash Hamming distance (0-15)")
+    q.add_argument("--limit", type=int, default=5, help="Matches printed per image")
+    _add_library_arg(q)
+    q.set_defaults(func=cmd_library_query)
+
+    p = sub.add_parser("pdf", help="(Re)build PDFs/<project>_Full.pdf from an existing project's Runs/ folder")
+    p.add_argument("projects", nargs="+", help="Project directories")
+    _add_pdf_args(p)
+    p.set_defaults(func=cmd_pdf)
+
+    return parser
+
+
+def _add_scan_args(p):
+    """Note: 决定采样序列本身的参数 (与特征缓存键对应)"""
+    p.add_argument("--roi", type=_parse_roi, default=None, help="Scan region as x,y,w,h")
+    p.add_argument("--start", type=_parse_time_arg, default=0, help="Start time (HH:MM:SS)")
+    p.add_argument("--end", type=_parse_time_arg, default=0, help="End time (HH:MM:SS), default: end of video")
+    p.add_argument("--remove-borders", action="store_true",
+                   help="Detect static black borders once per video and exclude them from analysis and output")
+    p.add_argument("--auto-range", action="store_true",
+                   help="Detect where slides are on screen (coarse pre-pass) and use it for --start/--end if unset")
+    p.add_argument("--interval", type=_positive_float, default=0.5, help="Sampling interval in seconds")
+    p.add_argument("--sampling", choices=("auto", "grab", "seek"), default="auto",
+                   help="Frame skipping: sequential grab, direct seek, or pick the faster one (default)")
+    p.add_argument("--no-cache", action="store_true", help="Do not read or write the per-video feature cache")
+    p.add_argument("--cache-dir", default=None, help="Feature cache directory (default: ~/.cache/ppt_extractor)")
+    p.add_argument("--cache-size", type=float, default=2.0, help="Feature cache size limit in GB (LRU eviction)")
+    p.add_argument("--proxy", action="store_true",
+                   help="Scan a low-resolution MJPEG proxy (built once, cached); only captures decode the original")
+
+
+def _add_detection_args(p):
+    _add_scan_args(p)
+    p.add_argument("--threshold", type=float, default=10, help="Diff threshold, lower is more sensitive")
+    p.add_argument("--stability", type=_positive_int, default=5, help="Consecutive stable samples before capture")
+    p.add_argument("--adaptive", action="store_true",
+                   help="Widen the stride on static slides (up to --max-interval), back to --interval on change")
+    p.add_argument("--max-interval", type=_positive_float, default=8.0, help="Largest adaptive sampling stride in seconds")
+    p.add_argument("--refine", action="store_true",
+                   help="Bisect each transition to the exact frame, save the sharpest frame, write slides.json")
+    p.add_argument("--sharpest", action="store_true",
+                   help="Save the sharpest frame of each stable window instead of the first stable sample")
+    p.add_argument("--auto-tune", action="store_true",
+                   help="Fit --threshold/--stability to this video's noise floor first (the sample pass is cached)")
+    _add_dedup_args(p)
+    p.add_argument("--format", type=_parse_format, default="jpg", dest="output_format",
+                   help="Slide image format: jpg[:quality] | png[:0-9] | webp[:quality|lossless] "
+                        "(webp defaults to quality 90)")
+    p.add_argument("--writer-threads", type=int, default=2, help="Background encoder threads")
+    p.add_argument("--no-pdf", action="store_true", help="Skip PDF generation")
+    _add_pdf_args(p)
+
+
+def _add_dedup_args(p):
+    p.add_argument("--keep-revisits", action="store_true",
+                   help="Only compare against the previous slide, save slides again when the speaker flips back")
+    p.add_argument("--dedup-radius", type=_parse_dedup_radius, default=3,
+                   help="dHash Hamming radius for revisit lookup (0-15)")
+
+
+def _add_pdf_args(p):
+    p.add_argument("--pdf-page", choices=("fit", "a4", "letter"), default="fit",
+                   help="PDF page size; 'fit' sizes each page to its slide")
+    p.add_argument("--pdf-dpi", type=float, default=72, help="Pixel density for --pdf-page fit")
+
+
+def _add_library_arg(p):
+    p.add_argument("--db", default=None, help="Library database (default: ~/.cache/ppt_extractor/library.sqlite)")
+
+
+def _apply_auto_range(args, video):
+    """Note: 检测结果只替换未指定的 --start / --end"""
+    from src.core.content_range import find_content_range
+
+    if not args.auto_range:
+        return
+    span = find_content_range(video, use_cache=not args.no_cache, cache_dir=args.cache_dir, on_log=_log)
+    if span is None:
+        _log("Auto range: no slide segments found, using the full video")
+        return
+    args.start = args.start or span[0]
+    args.end = args.end or span[1]
+    _log(f"Auto range: {format_time(args.start)} -> {format_time(args.end)}")
+
+
+def _auto_tune(engine):
+    from src.core.calibrate import auto_tune
+
+    cal = auto_tune(engine)
+    if cal is None:
+        return
+    _log(f"Auto tune: threshold={cal.threshold}, stability={cal.stability}")
+    for line in cal.explain().splitlines():
+        _log(f"  {line}")
+
+
+def _params_from_args(args):
+    from src.core.extractor import ExtractionParams
+
+    return ExtractionParams(diff_threshold=args.threshold,
+                            stability_frames=args.stability,
+                            check_interval=args.interval,
+                            global_dedup=not args.keep_revisits,
+                            dedup_radius=args.dedup_radius,
+                            adaptive_interval=args.adaptive,
+                            max_interval=args.max_interval,
+                            refine_transitions=args.refine,
+                            sharpest_frame=args.sharpest,
+                            remove_borders=args.remove_borders)
+
+
+def cmd_extract(args):
+    from src.core.extractor import SlideExtractor, ExtractionError
+
+    _apply_auto_range(args, args.video)
+    engine = SlideExtractor(args.video, args.output, project_name=args.project, roi=args.roi,
+                            start_sec=args.start, end_sec=args.end, params=_params_from_args(args),
+                            make_pdf=not args.no_pdf, workers=args.workers or os.cpu_count(), sampling=args.sampling,
+                            output_format=args.output_format, writer_threads=args.writer_threads,
+                            pdf_page_size=args.pdf_page, pdf_dpi=args.pdf_dpi,
+                            resume=not args.no_resume, checkpoint_interval=args.checkpoint_interval,
+                            use_cache=not args.no_cache, cache_dir=args.cache_dir,
+                            cache_max_bytes=int(args.cache_size * 1024 ** 3), profile=args.profile,
+                            use_proxy=args.proxy, on_log=None if args.quiet else _log)
+
+    def _on_sigint(signum, frame):
+        # Note: 第一次 Ctrl+C 优雅停止 (写检查点)，第二次恢复默认行为直接中断
+        _log("Stopping... (Ctrl+C again to abort)")
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        engine.stop()
+
+    t0 = time.time()
+    previous = signal.signal(signal.SIGINT, _on_sigint)
+    try:
+        if args.auto_tune:
+            _auto_tune(engine)
+        result = engine.run()
+    except ExtractionError as e:
+        _log(f"Error: {e}")
+        return 2
+    except KeyboardInterrupt:
+        _log("Interrupted.")
+        return 130
+    finally:
+        signal.signal(signal.SIGINT, previous)
+
+    if result.cancelled:
+        _log(f"Stopped: {len(result.images)} slides so far, re-run the same command to resume.")
+        return 130
+
+    _log(f"Done: {len(result.images)} slides in {format_time(time.time() - t0)} -> {result.project_dir}")
+    if args.library is not None:
+        _index_projects(args.library or None, [result.project_dir])
+    return 0
+
+
+def cmd_batch(args):
+    from src.core.batch import BatchQueue, collect_videos, plan_jobs
+
+    videos = collect_videos(args.source)
+    if not videos:
+        _log(f"Error: no videos found in '{args.source}'")
+        return 2
+
+    jobs = plan_jobs(videos, args.output)
+    _log(f"Queued {len(jobs)} videos -> {args.output}")
+
+    def _on_update(job):
+        n = jobs.index(job) + 1
+        if job.status == "running":
+            if job.percent % 10:
+                return
+            _log(f"[{n}/{len(jobs)}] {job.project_name}: {job.percent:3d}%  "
+                 f"{format_time(job.pos_sec)} @ {job.throughput:.1f}x")
+        elif job.status == "failed":
+            _log(f"[{n}/{len(jobs)}] {job.project_name}: FAILED ({job.error})")
+        else:
+            _log(f"[{n}/{len(jobs)}] {job.project_name}: {job.status} ({job.slides} slides)")
+
+    t0 = time.time()
+    queue = BatchQueue(jobs, _params_from_args(args), concurrency=args.concurrency, roi=args.roi,
+                       start_sec=args.start, end_sec=args.end, make_pdf=not args.no_pdf, sampling=args.sampling,
+                       output_format=args.output_format, writer_threads=args.writer_threads,
+                       pdf_page_size=args.pdf_page, pdf_dpi=args.pdf_dpi, use_cache=not args.no_cache,
+                       cache_dir=args.cache_dir, cache_max_bytes=int(args.cache_size * 1024 ** 3),
+                       force=args.force, auto_range=args.auto_range, use_proxy=args.proxy,
+                       auto_tune=args.auto_tune, on_update=_on_update)
+    try:
+        queue.run()
+    except KeyboardInterrupt:
+        _log("Interrupted.")
+        return 130
+
+    if args.library is not None:
+        _index_projects(args.library or None, [j.project_dir for j in jobs if j.status == "done"])
+
+    done = sum(1 for j in jobs if j.status == "done")
+    skipped = sum(1 for j in jobs if j.status == "skipped")
+    failed = sum(1 for j in jobs if j.status == "failed")
+    _log(f"Batch finished in {format_time(time.time() - t0)}: {done} done, {skipped} skipped, {failed} failed")
+    return 1 if failed else 0
+
+
+def cmd_sweep(args):
+    from src.core.extractor import SlideExtractor, ExtractionParams, ExtractionError
+    from src.core.fingerprint import SlideRegistry
+    from src.core.image_algo import frame_diff_series, sweep_detection
+
+    _apply_auto_range(args, args.video)
+    engine = SlideExtractor(args.video, "", roi=args.roi, start_sec=args.start, end_sec=args.end,
+                            params=ExtractionParams(check_interval=args.interval, remove_borders=args.remove_borders),
+                            sampling=args.sampling,
+                            use_cache=not args.no_cache, cache_dir=args.cache_dir,
+                            cache_max_bytes=int(args.cache_size * 1024 ** 3), use_proxy=args.proxy, on_log=_log)
+    try:
+        features = engine.collect_features()
+    except ExtractionError as e:
+        _log(f"Error: {e}")
+        return 2
+    except KeyboardInterrupt:
+        _log("Interrupted.")
+        return 130
+
+    t0 = time.time()
+    diffs = frame_diff_series(features.thumbs)
+    make_registry = None if args.keep_revisits else (lambda: SlideRegistry(args.dedup_radius))
+    results = sweep_detection(features.thumbs, args.thresholds, args.stabilities, diffs=diffs,
+                              make_registry=make_registry)
+    _log(f"Evaluated {len(results)} combinations over {len(features)} samples in {time.time() - t0:.2f}s")
+
+    # 表格输出到 stdout (slides per threshold x stability)，便于重定向
+    print("threshold " + "".join(f"{f'stab={s}':>9}" for s in args.stabilities))
+    for t in args.thresholds:
+        print(f"{t:>9g} " + "".join(f"{len(results[(t, s)]):>9d}" for s in args.stabilities))
+    return 0
+
+
+def cmd_proxy(args):
+    from src.core.proxy import build_proxy
+
+    failed = 0
+    for video in args.videos:
+        t0 = time.time()
+        last = [-1]
+
+        def _progress(percent):
+            if percent // 10 != last[0]:
+                last[0] = percent // 10
+                _log(f"{os.path.basename(video)}: {percent:3d}%")
+
+        try:
+            proxy = build_proxy(video, args.cache_dir, int(args.cache_size * 1024 ** 3),
+                                on_progress=_progress, on_log=_log)
+        except KeyboardInterrupt:
+            _log("Interrupted.")
+            return 130
+        if proxy is None:
+            _log(f"{video}: cannot build proxy")
+            failed += 1
+            continue
+        _log(f"{video}: {proxy.frames} proxy frames in {format_time(time.time() - t0)} -> {proxy.path}")
+    return 1 if failed else 0
+
+
+def _index_projects(db_path, project_dirs):
+    from src.core.library import SlideLibrary
+
+    try:
+        with SlideLibrary(db_path) as library:
+            for project_dir in project_dirs:
+                added, _ = library.index_project(project_dir)
+                _log(f"Library: +{added} slides from {project_dir}")
+    except (OSError, sqlite3.Error) as e:
+        _log(f"Library Error: {e}")
+
+
+def cmd_library_index(args):
+    from src.core.library import SlideLibrary
+
+    def _on_project(project_dir, added, removed):
+        if added or removed:
+            _log(f"{project_dir}: +{added} / -{removed}")
+
+    t0 = time.time()
+    with SlideLibrary(args.db) as library:
+        if args.prune:
+            _log(f"Pruned {library.prune()} missing projects")
+        for root in args.roots:
+            if not os.path.isdir(root):
+                _log(f"Skipped: '{root}' is not a directory")
+                continue
+            added, removed = library.index_tree(root, on_project=_on_project)
+            _log(f"{root}: {added} slides added/updated, {removed} removed")
+        _log(f"Library: {len(library)} slides in {library.db_path} ({time.time() - t0:.1f}s)")
+    return 0
+
+
+def cmd_library_query(args):
+    import cv2
+    from src.core.library import SlideLibrary, image_fingerprint, is_low_detail
+    from src.utils.file_ops import cv2_imread_safe
+
+    found = 0
+    with SlideLibrary(args.db) as library:
+        for image_path in args.images:
+            img = cv2_imread_safe(image_path, cv2.IMREAD_COLOR)
+            if img is None:
+                _log(f"{image_path}: cannot read image")
+                continue
+            t0 = time.perf_counter()
+            matches = library.query_image(img, radius=args.radius, limit=args.limit)
+            ms = (time.perf_counter() - t0) * 1000
+            # 结果输出到 stdout：距离 <TAB> 项目 <TAB> 幻灯片路径
+            h = image_fingerprint(img)
+            note = " (low-detail image, matched by thumbnail)" if h is not None and is_low_detail(h) else ""
+            print(f"{image_path}: {len(matches)} match(es) in {ms:.1f} ms{note}")
+            for d, project, path in matches:
+                print(f"  {d:2d}\t{os.path.basename(project)}\t{path}")
+            found += bool(matches)
+    return 0 if found else 1
+
+
+def cmd_pdf(args):
+    from src.utils.pdf_ops import build_project_pdf
+
+    failed = 0
+    for project_dir in args.projects:
+        try:
+            pdf_path = build_project_pdf(project_dir, page_size=args.pdf_page, dpi=args.pdf_dpi)
+        except (OSError, ValueError) as e:
+            _log(f"{project_dir}: PDF Gen Error: {e}")
+            failed += 1
+            continue
+        if pdf_path:
+            _log(f"{project_dir}: -> {pdf_path}")
+        else:
+            _log(f"{project_dir}: no slides found in Runs/")
+            failed += 1
+    return 1 if failed else 0
+
+
+def is_cli_invocation(argv):
+    """
+    Note: 只有首个参数是子命令或 -h/--help 时才走命令行；
+    文件关联 / 拖放启动时 argv 只有文件路径，应交给 GUI 而不是 argparse
+    """
+    if not argv:
+        return False
+    if argv[0] in ("-h", "--help"):
+        return True
+    sub = next(a for a in build_parser()._actions if isinstance(a, argparse._SubParsersAction))
+    return argv[0] in sub.choices
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    return args.func(args)
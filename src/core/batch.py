@@ -0,0 +1,223 @@
+import glob
+import json
+import os
+import queue
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+
+from src.core.feature_cache import DEFAULT_MAX_BYTES
+from src.utils.file_ops import sanitize_filename
+
+VIDEO_EXTS = (".mp4", ".avi", ".mkv")
+DONE_MARKER = "extract_done.json"
+
+
+@dataclass
+class BatchJob:
+    video_path: str
+    project_name: str
+    project_dir: str
+    status: str = "pending"       # pending / skipped / running / done / failed
+    percent: int = 0
+    pos_sec: float = 0.0
+    slides: int = 0
+    elapsed: float = 0.0
+    error: str = None
+
+    @property
+    def throughput(self):
+        """Note: 处理速度，单位为 视频秒 / 墙钟秒 (>1 即快于实时)，pos_sec 为相对起点的已处理时长"""
+        return self.pos_sec / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def collect_videos(source):
+    """
+    Note: source 可以是目录 (非递归) 或 glob 模式 (如 'D:/Lectures/**/*.mp4')
+    Returns: 排序后的视频路径列表
+    """
+    if os.path.isdir(source):
+        paths = [os.path.join(source, f) for f in os.listdir(source)]
+    else:
+        paths = glob.glob(source, recursive=True)
+    return sorted(p for p in paths if os.path.isfile(p) and p.lower().endswith(VIDEO_EXTS))
+
+
+def plan_jobs(videos, output_dir):
+    """Note: 每个视频一个项目目录，项目名取自清洗后的文件名，重名时追加序号"""
+    jobs, used = [], set()
+    for video in videos:
+        base = sanitize_filename(os.path.splitext(os.path.basename(video))[0]).strip() or "Lecture"
+        name, n = base, 2
+        while name.lower() in used:
+            name = f"{base}_{n}"
+            n += 1
+        used.add(name.lower())
+        jobs.append(BatchJob(video, name, os.path.join(output_dir, name)))
+    return jobs
+
+
+def read_done_marker(job):
+    """
+    Safety: 只有标记文件中记录的源文件大小一致才视为已完成 (视频被替换时重新处理)
+    Returns: 标记信息 dict，未完成返回 None
+    """
+    marker = os.path.join(job.project_dir, DONE_MARKER)
+    try:
+        with open(marker, "r", encoding="utf-8") as f:
+            info = json.load(f)
+        if info.get("video_size") == os.path.getsize(job.video_path):
+            return info
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _write_done_marker(job, result):
+    marker = os.path.join(job.project_dir, DONE_MARKER)
+    info = {
+        "video": os.path.abspath(job.video_path),
+        "video_size": os.path.getsize(job.video_path),
+        "slides": len(result.images),
+        "pdf": result.pdf_path,
+        "finished_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    with open(marker, "w", encoding="utf-8") as f:
+        json.dump(info, f, ensure_ascii=False, indent=2)
+
+
+def run_job(job_dict, params_dict, options, events):
+    """
+    Worker: 子进程内执行单个视频的完整抽取。
+    进度通过 events 队列回传 (job 序号, 事件类型, 数据)，百分比变化时才发送。
+    """
+    from src.core.extractor import SlideExtractor, ExtractionParams
+
+    job = BatchJob(**job_dict)
+    idx = options["index"]
+    last = [-1]
+
+    def _progress(percent, pos_sec):
+        if percent != last[0]:
+            last[0] = percent
+            events.put((idx, "progress", (percent, pos_sec)))
+
+    events.put((idx, "start", None))
+    start_sec, end_sec = options.get("start_sec", 0), options.get("end_sec")
+    if options.get("auto_range"):
+        from src.core.content_range import find_content_range
+
+        # Note: 只替换未指定的边界，每个视频各自检测
+        span = find_content_range(job.video_path, use_cache=options.get("use_cache", True),
+                                  cache_dir=options.get("cache_dir"))
+        if span is not None:
+            start_sec = start_sec or span[0]
+            end_sec = end_sec or span[1]
+    engine = SlideExtractor(job.video_path, os.path.dirname(job.project_dir), project_name=job.project_name,
+                            roi=options.get("roi"), start_sec=start_sec,
+                            end_sec=end_sec, params=ExtractionParams(**params_dict),
+                            make_pdf=options.get("make_pdf", True), sampling=options.get("sampling", "auto"),
+                            output_format=options.get("output_format"),
+                            writer_threads=options.get("writer_threads", 2),
+                            pdf_page_size=options.get("pdf_page_size", "fit"), pdf_dpi=options.get("pdf_dpi", 72),
+                            use_cache=options.get("use_cache", True), cache_dir=options.get("cache_dir"),
+                            cache_max_bytes=options.get("cache_max_bytes") or DEFAULT_MAX_BYTES,
+                            use_proxy=options.get("use_proxy", False), on_progress=_progress)
+    if options.get("auto_tune"):
+        from src.core.calibrate import auto_tune
+
+        # Note: 每个视频各自标定；采样结果写入特征缓存，紧接着的抽取直接重放
+        auto_tune(engine)
+    result = engine.run()
+    _write_done_marker(job, result)
+    return len(result.images)
+
+
+class BatchQueue:
+    """
+    Multi-Video Job Queue.
+    多个视频在进程池中并发处理；每个视频内部仍是单线程引擎，避免解码器争抢 CPU。
+    """
+
+    def __init__(self, jobs, params, concurrency=None, roi=None, start_sec=0, end_sec=None,
+                 make_pdf=True, sampling="auto", output_format=None, writer_threads=2, pdf_page_size="fit",
+                 pdf_dpi=72, use_cache=True, cache_dir=None, cache_max_bytes=None, force=False,
+                 auto_range=False, use_proxy=False, auto_tune=False, on_update=None):
+        self.jobs = jobs
+        self.params = params
+        self.concurrency = max(1, concurrency or os.cpu_count() or 1)
+        self.options = {"roi": roi, "start_sec": start_sec, "end_sec": end_sec, "make_pdf": make_pdf,
+                        "sampling": sampling, "output_format": output_format, "writer_threads": writer_threads,
+                        "pdf_page_size": pdf_page_size, "pdf_dpi": pdf_dpi, "use_cache": use_cache,
+                        "cache_dir": cache_dir, "cache_max_bytes": cache_max_bytes, "auto_range": auto_range,
+                        "use_proxy": use_proxy, "auto_tune": auto_tune}
+        self.force = force
+        self.on_update = on_update
+
+    def _notify(self, job):
+        if self.on_update:
+            self.on_update(job)
+
+    def run(self):
+        pending = []
+        for job in self.jobs:
+            info = None if self.force else read_done_marker(job)
+            if info is not None:
+                job.status = "skipped"
+                job.slides = info.get("slides", 0)
+                self._notify(job)
+            else:
+                pending.append(job)
+        if not pending:
+            return self.jobs
+
+        manager = multiprocessing.Manager()
+        try:
+            events = manager.Queue()
+            started = {}
+            with ProcessPoolExecutor(max_workers=min(self.concurrency, len(pending))) as pool:
+                futures = {}
+                for job in pending:
+                    idx = self.jobs.index(job)
+                    opts = dict(self.options, index=idx)
+                    futures[pool.submit(run_job, asdict(job), asdict(self.params), opts, events)] = job
+
+                while futures:
+                    self._drain_events(events, started)
+                    for fut in [f for f in futures if f.done()]:
+                        job = futures.pop(fut)
+                        self._drain_events(events, started)
+                        job.elapsed = time.time() - started.get(self.jobs.index(job), time.time())
+                        try:
+                            job.slides = fut.result()
+                            job.status = "done"
+                            job.percent = 100
+                        except Exception as e:
+                            job.status = "failed"
+                            job.error = str(e)
+                        self._notify(job)
+        finally:
+            manager.shutdown()
+        return self.jobs
+
+    def _drain_events(self, events, started, timeout=0.2):
+        try:
+            idx, kind, data = events.get(timeout=timeout)
+        except queue.Empty:
+            return
+        while True:
+            job = self.jobs[idx]
+            if kind == "start":
+                started[idx] = time.time()
+                job.status = "running"
+                self._notify(job)
+            elif kind == "progress":
+                job.percent, pos_sec = data
+                job.pos_sec = max(0.0, pos_sec - (self.options["start_sec"] or 0))
+                job.elapsed = time.time() - started.get(idx, time.time())
+                self._notify(job)
+            try:
+                idx, kind, data = events.get_nowait()
+            except queue.Empty:
+                return
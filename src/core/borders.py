@@ -0,0 +1,65 @@
+import cv2
+
+from src.core.image_algo import crop_roi, find_content_rect
+
+# 每隔多少秒 (视频时间) 取一个探测帧；探测帧数的上下限
+BORDER_PROBE_SEC = 120.0
+MIN_PROBES = 5
+MAX_PROBES = 31
+# 黑边至少这么宽 (像素) 才裁掉，编码器在画面边缘留下的 1-2 像素暗线不算黑边
+MIN_BORDER_PX = 4
+
+
+def union_rect(a, b):
+    if a is None:
+        return b
+    x0, y0 = min(a[0], b[0]), min(a[1], b[1])
+    x1, y1 = max(a[0] + a[2], b[0] + b[2]), max(a[1] + a[3], b[1] + b[3])
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def has_border(rect, shape, min_px=MIN_BORDER_PX):
+    """Returns: rect 是否在任意一侧比画面 (shape) 小至少 min_px 像素"""
+    h, w = shape[:2]
+    x, y, rw, rh = rect
+    return x >= min_px or y >= min_px or w - (x + rw) >= min_px or h - (y + rh) >= min_px
+
+
+def detect_content_roi(video_path, roi=None, start_frame=0, end_frame=0, stop_event=None):
+    """
+    Border Removal (per video).
+    在扫描范围内均匀定位解码若干帧 (ROI 裁剪后)，取各帧内容区域的并集：单帧可能是深色幻灯片或黑场，
+    并集才是画面真正的显示区域。探测帧按 BORDER_PROBE_SEC 分布在整个范围内，中途切换画幅 (如 4:3 -> 16:9) 的
+    较宽画面也会被并集覆盖。
+    Returns: 去掉黑边后的 ROI (原片坐标)；没有可裁的黑边、被取消或无法读取时返回原 roi
+    """
+    cap = cv2.VideoCapture(video_path)
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        if end_frame <= start_frame:
+            end_frame = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        span = max(1, end_frame - start_frame)
+        count = int(min(MAX_PROBES, max(MIN_PROBES, span / fps / BORDER_PROBE_SEC)))
+
+        content, shape = None, None
+        for k in range(count):
+            if stop_event is not None and stop_event.is_set():
+                return roi
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame + span * (2 * k + 1) // (2 * count))
+            ret, frame = cap.read()
+            if not ret:
+                continue
+            frame = crop_roi(frame, roi)
+            shape = frame.shape
+            rect = find_content_rect(frame)
+            if rect is not None:
+                content = union_rect(content, rect)
+    finally:
+        cap.release()
+
+    if content is None or not has_border(content, shape):
+        return roi
+    x, y, w, h = content
+    if roi:
+        x, y = x + max(0, roi[0]), y + max(0, roi[1])
+    return x, y, w, h
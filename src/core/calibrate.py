@@ -0,0 +1,151 @@
+import math
+
+import numpy as np
+
+from src.core.fingerprint import SlideRegistry, DEFAULT_RADIUS
+from src.core.image_algo import detect_captures, frame_diff_series
+
+# 与界面滑块一致的取值范围
+THRESHOLD_RANGE = (2, 50)
+STABILITY_RANGE = (2, 20)
+# 噪声底的下限：近乎无损的源 (录屏/合成视频) 静止 MSE 接近 0，阈值仍需容忍重新编码带来的抖动
+MIN_NOISE = 0.5
+# 防抖至少覆盖的时长 (秒)，留给翻页动画/鼠标移动收敛
+MIN_SETTLE_SEC = 1.0
+# 稳定计数连续这么多档页数不变才算进入平台区
+PLATEAU = 3
+# 静止采样占比低于该值时视为无法标定 (几乎全程是摄像头/视频画面)
+MIN_QUIET_RATIO = 0.2
+# 噪声与切页之间至少相差的数量级 (log10)，否则认为分布没有明显分界
+MIN_GAP_DECADES = 0.5
+
+
+class Calibration:
+    """自动标定结果 + 依据 (noise_floor/transition_level 与 diff_threshold 同一度量)"""
+    __slots__ = ("threshold", "stability", "noise_floor", "transition_level", "quiet_ratio", "max_blip",
+                 "slides", "samples", "interval", "fallback")
+
+    def __init__(self, threshold, stability, noise_floor, transition_level, quiet_ratio, max_blip, slides,
+                 samples, interval, fallback=False):
+        self.threshold = threshold
+        self.stability = stability
+        self.noise_floor = noise_floor
+        self.transition_level = transition_level
+        self.quiet_ratio = quiet_ratio
+        self.max_blip = max_blip
+        self.slides = slides
+        self.samples = samples
+        self.interval = interval
+        self.fallback = fallback
+
+    def explain(self):
+        """Returns: 多行说明文字 (GUI 对话框与命令行日志共用)"""
+        if self.fallback:
+            return (f"{self.samples} 个采样的帧差分布中找不到噪声与切页之间的明显分界 (静止画面约 {self.quiet_ratio:.0%})，"
+                    f"保留当前值：阈值 {self.threshold}，防抖 {self.stability}。")
+        return "\n".join([
+            f"噪声底 {self.noise_floor:.2f}：{self.quiet_ratio:.0%} 的采样为静止画面，其中 95% 的帧差低于此值。",
+            f"切页幅度 {self.transition_level:.1f}：变化采样的帧差中位数。",
+            f"阈值 {self.threshold}：取两者的几何平均，离噪声和切页都留有倍数余量。",
+            f"防抖 {self.stability} ({self.stability * self.interval:.1f} 秒)：动画/鼠标造成的短暂静止最长 "
+            f"{self.max_blip} 个采样，再放宽稳定计数页数也不再变化。",
+            f"预计 {self.slides} 页 ({self.samples} 个采样)。",
+        ])
+
+
+def _split_gap(values):
+    """
+    Note: 在 log10 域上找排序后相邻帧差的最大空档 (静止 ~1e-2, 切页 ~1e1，相差数个数量级)。
+    切页通常只占百分之几的采样，类间方差 (Otsu) 会把分界放进噪声内部；最大空档对类别比例不敏感。
+    只在下四分位以上搜索，避开静止画面内部接近 0 的稀疏低端。
+    Returns: 分界值 (原始域)，没有足够大的空档时返回 None
+    """
+    logs = np.sort(np.log10(values + 1e-3))
+    logs = logs[len(logs) // 4:]
+    if len(logs) < 2:
+        return None
+    gaps = np.diff(logs)
+    k = int(np.argmax(gaps))
+    if gaps[k] < MIN_GAP_DECADES:
+        return None
+    return 10 ** ((logs[k] + logs[k + 1]) / 2) - 1e-3
+
+
+def _run_lengths(static):
+    """Returns: 每段连续静止采样的长度"""
+    padded = np.concatenate(([False], static, [False])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    return edges[1::2] - edges[::2]
+
+
+def _pick_stability(diffs, thresh, interval):
+    """
+    Note: 稳定计数 s 下的页数 = 长度 >= s 的静止段个数。短暂静止 (动画停顿、摄像头画面里的片刻不动)
+    只在 s 较小时计入，s 增大时页数先快速下降、再进入平台；取平台起点，再保证至少 MIN_SETTLE_SEC。
+    Returns: (stability, 平台起点之前最长的短暂静止段)
+    """
+    runs = _run_lengths(diffs[1:] < thresh)
+    lo, hi = STABILITY_RANGE
+    counts = [int(np.count_nonzero(runs >= s)) for s in range(lo, hi + PLATEAU)]
+    stability = None
+    for i in range(hi - lo + 1):
+        if len(set(counts[i:i + PLATEAU])) == 1 and counts[i] > 0:
+            stability = lo + i
+            break
+    if stability is None:
+        stability = lo
+    blips = runs[runs < stability]
+    stability = max(stability, int(math.ceil(MIN_SETTLE_SEC / interval)))
+    return min(stability, hi), int(blips.max()) if len(blips) else 0
+
+
+def calibrate(thumbs, interval, diffs=None, global_dedup=True, dedup_radius=DEFAULT_RADIUS,
+              default_threshold=10, default_stability=5):
+    """
+    Auto-Calibration.
+    thumbs: 一次采样得到的缩略图序列 (FeatureSeries.thumbs)；interval: 采样间隔 (秒)
+    由相邻帧差的分布拟合噪声底与切页幅度，给出 diff_threshold / stability_frames 建议值。
+    Returns: Calibration
+    """
+    if diffs is None:
+        diffs = frame_diff_series(thumbs)
+    d = diffs[1:]
+    if len(d) < 4:
+        return Calibration(default_threshold, default_stability, 0.0, 0.0, 0.0, 0, 0, len(thumbs), interval,
+                           fallback=True)
+
+    split = _split_gap(d)
+    quiet = d[d <= split] if split is not None else d[d < default_threshold]
+    active = d[d > split] if split is not None else d[d >= default_threshold]
+    quiet_ratio = len(quiet) / len(d)
+    if split is None or quiet_ratio < MIN_QUIET_RATIO or not len(active):
+        return Calibration(default_threshold, default_stability, 0.0, 0.0, quiet_ratio, 0, 0, len(thumbs),
+                           interval, fallback=True)
+
+    noise = max(float(np.percentile(quiet, 95)), MIN_NOISE)
+    level = float(np.median(active))
+    threshold = int(round(math.sqrt(noise * level)))
+    threshold = max(THRESHOLD_RANGE[0], min(threshold, THRESHOLD_RANGE[1]))
+    stability, max_blip = _pick_stability(diffs, threshold, interval)
+
+    registry = SlideRegistry(dedup_radius) if global_dedup else None
+    slides = len(detect_captures(thumbs, threshold, stability, diffs=diffs, registry=registry))
+    return Calibration(threshold, stability, noise, level, quiet_ratio, max_blip, slides, len(thumbs), interval)
+
+
+def auto_tune(engine):
+    """
+    Note: 用引擎当前的视频/ROI/范围/步长采样一遍 (命中特征缓存时不解码；否则顺带写入缓存，
+    随后的正式抽取直接重放)，并把建议值写回 engine.params。
+    Returns: Calibration，被取消时返回 None
+    """
+    features = engine.collect_features()
+    if features is None:
+        return None
+    params = engine.params
+    cal = calibrate(features.thumbs, params.check_interval, global_dedup=params.global_dedup,
+                    dedup_radius=params.dedup_radius, default_threshold=params.diff_threshold,
+                    default_stability=params.stability_frames)
+    params.diff_threshold = cal.threshold
+    params.stability_frames = cal.stability
+    return cal
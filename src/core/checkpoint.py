@@ -0,0 +1,59 @@
+import json
+import os
+
+import numpy as np
+
+CHECKPOINT_FILE = "checkpoint.npz"
+
+
+class Checkpoint:
+    """
+    Resumable Extraction State.
+    保存到项目目录下的 checkpoint.npz：
+        meta  -- JSON (任务签名、已处理到的帧号/时间戳、稳定计数、已捕获列表)
+        prev  -- 上一次采样的 64x64 灰度缩略图 (prev_frame_gray)
+        last  -- 最近一次捕获的缩略图 (last_captured_hash)
+        history -- 已捕获幻灯片的缩略图 (N, 64, 64)，用于恢复全局去重注册表
+    Safety: 先写临时文件再 os.replace，进程在写入中途被杀也不会留下半个检查点。
+    """
+
+    def __init__(self, project_dir):
+        self.path = os.path.join(project_dir, CHECKPOINT_FILE)
+
+    @staticmethod
+    def _pack(arr):
+        return np.zeros((0,), np.uint8) if arr is None else arr
+
+    @staticmethod
+    def _unpack(arr):
+        return None if arr.size == 0 else arr
+
+    def save(self, meta, prev_frame_gray, last_captured_hash, history=None):
+        tmp = self.path + ".tmp"
+        history = np.stack(history) if history else None
+        with open(tmp, "wb") as f:
+            np.savez(f, meta=np.frombuffer(json.dumps(meta).encode("utf-8"), np.uint8),
+                     prev=self._pack(prev_frame_gray), last=self._pack(last_captured_hash),
+                     history=self._pack(history))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def load(self):
+        """Returns: (meta, prev_frame_gray, last_captured_hash, history)，不存在或损坏时返回 None"""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                meta = json.loads(data["meta"].tobytes().decode("utf-8"))
+                history = self._unpack(data["history"]) if "history" in data.files else None
+                return meta, self._unpack(data["prev"]), self._unpack(data["last"]), history
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def clear(self):
+        for p in (self.path, self.path + ".tmp"):
+            try:
+                os.remove(p)
+            except OSError:
+                pass
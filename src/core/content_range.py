@@ -0,0 +1,115 @@
+import cv2
+import numpy as np
+
+from src.core.image_algo import frame_diff_series, gray_thumbnail
+from src.core.sampler import FrameSampler, AUTO
+from src.core.timeline import cached_timeline
+
+# 粗扫描的采样间隔 (秒)：步长远大于一个 GOP，FrameSampler 会选择 seek，基本只解码关键帧附近的少量帧
+RANGE_INTERVAL = 2.0
+# 相邻采样 MSE 低于该值视为画面静止 (与 get_frame_diff 同一度量)
+QUIET_MSE = 2.0
+# 静止持续至少这么久才算一页幻灯片；倒计时、摄像头画面、问答环节很少能满足
+MIN_STATIC_SEC = 6.0
+# 建议区间两端额外保留的余量 (秒)
+RANGE_PAD_SEC = 1.0
+
+
+def content_span(pos_sec, diffs, interval, duration=None, quiet=QUIET_MSE, min_static=MIN_STATIC_SEC,
+                 pad=RANGE_PAD_SEC):
+    """
+    Note: diffs[i] 为采样 i 与前一采样的差异。连续静止采样 i..j 表示同一画面从 pos[i-1] 持续到 pos[j]，
+    持续时间达到 min_static 的段落视为幻灯片；返回第一段开始到最后一段结束 (两端各放宽一个采样间隔 + pad)。
+    Returns: (start_sec, end_sec)，找不到幻灯片段落时返回 None
+    """
+    pos_sec = np.asarray(pos_sec, np.float64)
+    static = np.asarray(diffs) < quiet
+    if len(static):
+        static[0] = False
+
+    first = last = None
+    i, n = 1, len(static)
+    while i < n:
+        if not static[i]:
+            i += 1
+            continue
+        j = i
+        while j + 1 < n and static[j + 1]:
+            j += 1
+        if pos_sec[j] - pos_sec[i - 1] >= min_static:
+            if first is None:
+                first = pos_sec[i - 1]
+            last = pos_sec[j]
+        i = j + 1
+
+    if first is None:
+        return None
+    start = max(0.0, first - interval - pad)
+    end = last + interval + pad
+    if duration is not None:
+        end = min(end, duration)
+    return float(start), float(end)
+
+
+def span_from_timeline(timeline, **kw):
+    """Note: 时间轴的活动曲线是每秒最大差异，按 1 秒一个采样处理"""
+    secs = np.arange(len(timeline.activity)) + 0.5
+    diffs = np.asarray(timeline.activity, np.float64).copy()
+    if len(diffs):
+        diffs[0] = np.inf
+    return content_span(secs, diffs, 1.0, duration=timeline.duration, **kw)
+
+
+def coarse_activity(video_path, interval=RANGE_INTERVAL, stop_event=None, on_progress=None):
+    """
+    Note: 粗扫描，按 interval 取低分辨率灰度缩略图并计算相邻差异。
+    Returns: (pos_sec, diffs, duration)，被取消或无法打开时返回 None
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        return None
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        duration = float(cap.get(cv2.CAP_PROP_FRAME_COUNT)) / fps
+        step = max(1, int(fps * interval))
+        sampler = FrameSampler(cap, 0, strategy=AUTO)
+        thumbs, positions = [], []
+        while True:
+            if stop_event is not None and stop_event.is_set():
+                return None
+            ret, frame = sampler.read(step)
+            if not ret:
+                break
+            pos = sampler.last_frame / fps
+            if pos > duration:
+                break
+            thumbs.append(gray_thumbnail(frame))
+            positions.append(pos)
+            if on_progress:
+                on_progress(min(100, int(pos * 100 / max(duration, 1))))
+    finally:
+        cap.release()
+    if not thumbs:
+        return np.zeros(0), np.zeros(0), duration
+    return np.asarray(positions), frame_diff_series(np.stack(thumbs)), duration
+
+
+def find_content_range(video_path, use_cache=True, cache_dir=None, stop_event=None, on_progress=None,
+                       on_log=None):
+    """
+    Auto IN/OUT: 找出幻灯片实际出现的时间段，跳过片头倒计时、纯摄像头开场与结尾问答。
+    已有剪辑器时间轴缓存时直接使用 (不解码)，否则做一次粗扫描。
+    Returns: (start_sec, end_sec)，找不到幻灯片段落或被取消时返回 None
+    """
+    log = on_log or (lambda text: None)
+    timeline = cached_timeline(video_path, cache_dir) if use_cache else None
+    if timeline is not None:
+        log("Auto range: using cached timeline")
+        return span_from_timeline(timeline)
+
+    scan = coarse_activity(video_path, stop_event=stop_event, on_progress=on_progress)
+    if scan is None:
+        return None
+    pos_sec, diffs, duration = scan
+    log(f"Auto range: coarse pass over {len(pos_sec)} samples")
+    return content_span(pos_sec, diffs, RANGE_INTERVAL, duration=duration)
@@ -0,0 +1,788 @@
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field, asdict
+
+import cv2
+import numpy as np
+
+from src.core.borders import detect_content_roi
+from src.core.checkpoint import Checkpoint
+from src.core.fingerprint import SlideRegistry, DEFAULT_RADIUS
+from src.core.feature_cache import FeatureCache, FeatureSeries, DEFAULT_MAX_BYTES, feature_key, video_fingerprint
+from src.core.image_algo import (clamp_roi, crop_roi, thumb_diff, detect_captures, frame_diff_series, get_blur_score,
+                                 gray_thumbnail)
+from src.core.pipeline import AdaptiveStride, DecodeAhead, FrameSample
+from src.core.profiler import StageProfiler, NULL_PROFILER
+from src.core.proxy import build_proxy, proxy_gap, proxy_step
+from src.core.refine import PendingSlide, SharpestPicker, SHARPEST_RING, TransitionRefiner, write_slides_json
+from src.core.sampler import FrameSampler, AUTO, sample_step
+from src.core.writer import AsyncSlideWriter, OutputFormat
+from src.utils.file_ops import cv2_imread_safe, sanitize_filename, prepare_project_dirs
+from src.utils.pdf_ops import images_to_pdf
+from src.utils.time_ops import format_time
+
+
+class ExtractionError(Exception):
+    """配置/输入错误 (路径无效、视频无法打开等)，在进入检测循环前抛出"""
+
+
+@dataclass
+class ExtractionParams:
+    """
+    Algorithmic Parameters.
+    Note: 检测循环每次采样都会重新读取字段，GUI 可在运行中直接改写实现热调节。
+    """
+    diff_threshold: float = 10
+    stability_frames: int = 5
+    check_interval: float = 0.5
+    # Note: 全局去重 —— 候选帧与本次已保存的全部幻灯片比较 (讲者翻回旧页时不再重复保存)
+    global_dedup: bool = True
+    dedup_radius: int = DEFAULT_RADIUS
+    # Note: 自适应步长 —— 静止期间步长按 check_interval 的 2^k 倍放宽，最大 max_interval 秒；检测到变化立即回到最小步长
+    adaptive_interval: bool = False
+    max_interval: float = 8.0
+    # Note: 捕获后二分定位精确切换帧，并在稳定窗口内挑选最清晰的一帧输出 (写出 slides.json 时间戳)
+    refine_transitions: bool = False
+    # Note: 最清晰帧 —— 稳定窗口内按清晰度 (get_blur_score) 挑选输出帧，窗口结束时才写出 (不额外解码)
+    sharpest_frame: bool = False
+    # Note: 去黑边 —— 按视频探测一次内容区域并收窄分析 ROI，黑边不再参与缩略图/清晰度计算，输出图也随之裁掉
+    remove_borders: bool = False
+
+
+@dataclass
+class ExtractionResult:
+    project_dir: str
+    images: list = field(default_factory=list)
+    # 每页的时间信息 {"file", "time", "transition", "frame", "sharpness"} (refine_transitions 时写出 slides.json)
+    slides: list = field(default_factory=list)
+    pdf_path: str = None
+    cancelled: bool = False
+
+
+class SlideDetector:
+    """
+    Temporal Convergence State Machine.
+    连续 N 次采样的 MSE 低于阈值即视为稳态，并与上一张捕获做去重比较；
+    global_dedup 时再查询指纹注册表，与所有历史捕获比较。
+    last_match: 最近一次被全局去重拦下时，匹配到的幻灯片编号
+    """
+
+    def __init__(self, radius=DEFAULT_RADIUS):
+        self.prev_frame_gray = None
+        self.last_captured_hash = None
+        self.stable_counter = 0
+        self.registry = SlideRegistry(radius)
+        self.last_match = None
+
+    def feed(self, gray_small, thresh, stability, global_dedup=False, label=None):
+        """
+        label: 本采样被保存时的输出路径，随指纹登记，供 revisit 日志引用
+        Returns: True 表示当前采样应被保存为新幻灯片
+        """
+        self.last_match = None
+        is_static = False
+        if self.prev_frame_gray is not None:
+            if thumb_diff(gray_small, self.prev_frame_gray) < thresh:
+                is_static = True
+                self.stable_counter += 1
+            else:
+                self.stable_counter = 0
+        self.prev_frame_gray = gray_small
+
+        if not (is_static and self.stable_counter == stability):
+            return False
+
+        if self.last_captured_hash is not None:
+            if thumb_diff(gray_small, self.last_captured_hash) < (thresh * 1.5):
+                return False
+
+        if global_dedup:
+            self.last_match = self.registry.find(gray_small, thresh)
+            if self.last_match is not None:
+                return False
+
+        self.registry.add(gray_small, label)
+        self.last_captured_hash = gray_small
+        return True
+
+
+class SlideExtractor:
+    """
+    Headless Extraction Engine.
+    不依赖 Tk：所有 UI 交互都通过可选回调完成，可直接用于 CLI / 批处理。
+
+    Callbacks (均在调用 run() 的线程中触发):
+        on_log(text)
+        on_progress(percent, pos_sec)
+        on_frame(process_frame)            -- 每次采样 (ROI 裁剪后)
+        on_capture(process_frame, count, path)
+    """
+
+    def __init__(self, video_path, output_dir, project_name=None, roi=None,
+                 start_sec=0.0, end_sec=None, params=None, make_pdf=True, workers=1, sampling=AUTO,
+                 output_format=None, writer_threads=2, pdf_page_size="fit", pdf_dpi=72,
+                 resume=True, checkpoint_interval=30.0, use_cache=True, cache_dir=None,
+                 cache_max_bytes=DEFAULT_MAX_BYTES, profile=False, use_proxy=False,
+                 on_log=None, on_progress=None, on_frame=None, on_capture=None):
+        self.video_path = video_path
+        self.output_dir = output_dir
+        self.project_name = sanitize_filename((project_name or "").strip()) or f"Lecture_{int(time.time())}"
+        self.roi = roi
+        # Note: 实际用于分析/输出的区域；remove_borders 时在扫描开始前去掉黑边 (每个范围只探测一次)
+        self.scan_roi = roi
+        self._border_rois = {}
+        self.start_sec = start_sec if start_sec and start_sec > 0 else 0.0
+        self.end_sec = end_sec if end_sec and end_sec > 0 else None
+        self.params = params or ExtractionParams()
+        self.make_pdf = make_pdf
+        # Note: workers > 1 启用时间分片多进程模式 (参数在启动时固定，不支持热调节与实时预览)
+        self.workers = max(1, int(workers or 1))
+        self.sampling = sampling
+        self.output_format = output_format or OutputFormat()
+        self.writer_threads = writer_threads
+        self.pdf_page_size = pdf_page_size
+        self.pdf_dpi = pdf_dpi
+        # Note: 单进程模式每隔 checkpoint_interval 秒 (墙钟) 写一次检查点，resume=True 时自动续跑
+        self.resume = resume
+        self.checkpoint_interval = checkpoint_interval
+        # Note: 特征缓存保存每次采样的 64x64 缩略图，换阈值/防抖重跑时直接重放状态机，无需重新解码
+        self.use_cache = use_cache
+        self.cache_dir = cache_dir
+        self.cache_max_bytes = cache_max_bytes
+        # Note: profile=True 时记录各阶段耗时，结束后写出 profile.json / profile.csv 到项目目录
+        self.profile = profile
+        self.profiler = NULL_PROFILER
+        # Note: use_proxy=True 时检测扫描在低清代理上完成 (不存在则先生成)，只有被捕获的帧回到原片解码
+        self.use_proxy = use_proxy
+
+        self.on_log = on_log
+        self.on_progress = on_progress
+        self.on_frame = on_frame
+        self.on_capture = on_capture
+
+        self._stop_event = threading.Event()
+
+    @property
+    def is_running(self):
+        return not self._stop_event.is_set()
+
+    def stop(self):
+        """Safety: 线程安全的取消请求，当前采样处理完后退出循环"""
+        self._stop_event.set()
+
+    def log(self, text):
+        if self.on_log:
+            self.on_log(text)
+
+    def run(self):
+        if not self.output_dir or not self.video_path or not os.path.exists(self.video_path):
+            raise ExtractionError("Invalid paths.")
+
+        try:
+            project_dir, images_dir, pdf_dir = prepare_project_dirs(self.output_dir, self.project_name)
+        except OSError as e:
+            raise ExtractionError(f"Error creating directories: {e}")
+
+        cap = cv2.VideoCapture(self.video_path)
+        if not cap.isOpened():
+            raise ExtractionError("Cannot open video source.")
+
+        self.profiler = StageProfiler() if self.profile else NULL_PROFILER
+        result = ExtractionResult(project_dir=project_dir)
+        try:
+            self._scan(cap, images_dir, result)
+        finally:
+            cap.release()
+
+        result.cancelled = not self.is_running
+        if self.make_pdf and result.images:
+            self.log("Generating PDF...")
+            try:
+                with self.profiler.stage("pdf"):
+                    result.pdf_path = images_to_pdf(result.images,
+                                                    os.path.join(pdf_dir, f"{self.project_name}_Full.pdf"),
+                                                    page_size=self.pdf_page_size, dpi=self.pdf_dpi)
+                self.log("PDF Generated.")
+            except (OSError, ValueError) as e:
+                self.log(f"PDF Gen Error: {e}")
+
+        if self.profiler.enabled:
+            self.profiler.count("captured", len(result.images))
+            try:
+                path = self.profiler.write(project_dir)
+                self.log(f"Profile: {self.profiler.summary()}")
+                self.log(f"Profile written to {os.path.basename(path)}")
+            except OSError as e:
+                self.log(f"Profile Error: {e}")
+        return result
+
+    def collect_features(self):
+        """
+        Feature-only Scan: 只采样缩略图序列，不写幻灯片 (供参数扫描/自动标定使用)。
+        缓存命中时直接返回，否则扫描一遍并写入缓存。
+        Returns: 带 thumbs / frame_idx / pos_sec 的特征序列，被取消时返回 None
+        """
+        if not self.video_path or not os.path.exists(self.video_path):
+            raise ExtractionError("Invalid paths.")
+        cap = cv2.VideoCapture(self.video_path)
+        if not cap.isOpened():
+            raise ExtractionError("Cannot open video source.")
+
+        try:
+            fps, start_frame, end_sec = self._resolve_range(cap)
+            self._resolve_scan_roi(fps, start_frame, end_sec)
+            step = self._sample_step(fps)
+            cache, cache_key = self._open_cache(start_frame, step, end_sec)
+            if cache is not None:
+                entry = cache.lookup(cache_key)
+                if entry is not None:
+                    self.log(f"Feature cache hit: {len(entry)} samples")
+                    return entry
+            if self.use_proxy:
+                features = self._proxy_features(fps, start_frame, end_sec)
+                if features is not None or not self.is_running:
+                    return features
+
+            total_duration = max(end_sec - self.start_sec, 1)
+            frames, times, thumbs = [], [], []
+            sampler = FrameSampler(cap, start_frame, strategy=self.sampling, on_log=self.log)
+            reader = DecodeAhead(cap, sampler, lambda: step, end_sec, self.scan_roi, self._stop_event).start()
+            try:
+                for sample in reader:
+                    if not self.is_running: break
+                    frames.append(sample.frame_idx)
+                    times.append(sample.pos_sec)
+                    thumbs.append(sample.gray_small)
+                    elapsed = sample.pos_sec - self.start_sec
+                    self._report_progress(max(0, min(100, int(elapsed / total_duration * 100))), sample.pos_sec)
+            finally:
+                reader.close()
+        finally:
+            cap.release()
+
+        if not self.is_running:
+            return None
+        series = FeatureSeries(np.stack(thumbs) if thumbs else np.zeros((0, 64, 64), np.uint8),
+                               np.asarray(frames, np.int64), np.asarray(times, np.float64))
+        self.log(f"Decode: {sampler.summary()}")
+
+        if cache is not None and reader.error is None:
+            recorder = cache.recorder(cache_key, self._cache_meta())
+            try:
+                for i in range(len(series)):
+                    recorder.append(int(series.frame_idx[i]), float(series.pos_sec[i]), series.thumbs[i])
+                recorder.commit()
+            except OSError as e:
+                recorder.abort()
+                self.log(f"Feature cache write failed: {e}")
+        return series
+
+    def _resolve_range(self, cap):
+        """Returns: (fps, start_frame, end_sec)"""
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        end_sec = self.end_sec
+        if end_sec is None:
+            end_sec = float(cap.get(cv2.CAP_PROP_FRAME_COUNT)) / fps
+        start_frame = int(round(self.start_sec * fps))
+        if self.roi:
+            # Safety: 完全落在画面外的 ROI 裁剪后为空，否则要到解码线程里才以 cv2.error 失败
+            width, height = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            _, _, w, h = clamp_roi(self.roi, width, height)
+            if width > 0 and height > 0 and (w <= 0 or h <= 0):
+                raise ExtractionError(f"ROI {tuple(self.roi)} lies outside the {width}x{height} frame.")
+        self.log(f"Range set: {format_time(self.start_sec)} -> {format_time(end_sec)}")
+        return fps, start_frame, end_sec
+
+    def _resolve_scan_roi(self, fps, start_frame, end_sec):
+        """Note: 去黑边结果按扫描范围缓存在引擎上 (自动标定后的正式抽取不再重复探测)"""
+        if not self.params.remove_borders:
+            self.scan_roi = self.roi
+            return
+        key = (tuple(self.roi) if self.roi else None, start_frame, end_sec)
+        if key not in self._border_rois:
+            roi = detect_content_roi(self.video_path, self.roi, start_frame, int(end_sec * fps), self._stop_event)
+            self._border_rois[key] = roi
+            if roi != self.roi:
+                self.log(f"Borders removed: analysis ROI x={roi[0]}, y={roi[1]}, w={roi[2]}, h={roi[3]}")
+            else:
+                self.log("No black borders found.")
+        self.scan_roi = self._border_rois[key]
+
+    def _scan(self, cap, images_dir, result):
+        fps, start_frame, end_sec = self._resolve_range(cap)
+        self._resolve_scan_roi(fps, start_frame, end_sec)
+        checkpoint = Checkpoint(result.project_dir)
+
+        cache, cache_key = self._open_cache(start_frame, self._sample_step(fps), end_sec)
+        if cache is not None:
+            entry = cache.lookup(cache_key)
+            if entry is not None:
+                self._replay(cap, fps, entry, start_frame, end_sec, images_dir, result)
+                if self.is_running:
+                    checkpoint.clear()
+                return
+
+        if self.use_proxy:
+            features = self._proxy_features(fps, start_frame, end_sec)
+            if not self.is_running:
+                return
+            if features is not None:
+                self._replay(cap, fps, features, start_frame, end_sec, images_dir, result, source="Proxy scan")
+                if self.is_running:
+                    checkpoint.clear()
+                return
+
+        if self.workers > 1:
+            if self.params.adaptive_interval:
+                self.log("Adaptive sampling is not available with multiple workers, using the fixed interval.")
+            if self.params.refine_transitions:
+                self.log("Transition refinement is not available with multiple workers, skipped.")
+            if self.params.sharpest_frame:
+                self.log("Sharpest-frame selection is not available with multiple workers, skipped.")
+            recorder = cache.recorder(cache_key, self._cache_meta()) if cache is not None else None
+            return self._scan_parallel(cap, fps, start_frame, end_sec, images_dir, result, recorder)
+
+        start_sec = self.start_sec
+        total_duration = end_sec - start_sec
+        if total_duration <= 0: total_duration = 1
+
+        detector = SlideDetector(self.params.dedup_radius)
+        picker = SharpestPicker() if self.params.sharpest_frame else None
+        signature = self._job_signature(start_frame, end_sec)
+        next_frame = start_frame
+        if self.resume:
+            next_frame = self._restore_checkpoint(checkpoint, signature, detector, images_dir, result,
+                                                  picker, cap) or start_frame
+        # 待定页已占用一个编号
+        captured_count = len(result.images) + (picker is not None and picker.has_pending)
+
+        # Note: 只有从头开始的固定步长完整扫描才写缓存 (续跑时前半段的缩略图已不在内存中)
+        recorder = None
+        cache_step = self._sample_step(fps)
+        if cache is not None and next_frame == start_frame and not self.params.adaptive_interval:
+            recorder = cache.recorder(cache_key, self._cache_meta())
+        prev_idx = None
+
+        # Note: 按帧号定位起点，与分片并行模式共用同一采样网格
+        sampler = FrameSampler(cap, next_frame, strategy=self.sampling, on_log=self.log)
+
+        # Pipeline: 解码线程 -> 有界队列 -> 本线程做状态机 -> 写盘线程
+        profiler = self.profiler
+        adaptive = AdaptiveStride(self.params, lambda: self._sample_step(fps), fps)
+        reader = DecodeAhead(cap, sampler, lambda: self._sample_step(fps), end_sec, self.scan_roi,
+                             self._stop_event, profiler=profiler, adaptive=adaptive).start()
+        writer = AsyncSlideWriter(self.output_format, threads=self.writer_threads,
+                                  on_error=lambda path: self.log(f"Write Error: {os.path.basename(path)}"),
+                                  profiler=profiler)
+
+        self.log(f"Running... Target: {self.project_name}")
+        # 最近若干采样的帧号：捕获时据此找到新画面的第一个采样及其前一个采样 (切换区间)
+        recent = deque(maxlen=64)
+        # Note: 续跑时 recent 不含断点前的采样，首页之前没有切换区间也不代表画面从区间起点就已显示
+        range_start = start_sec if next_frame == start_frame else None
+        refiner = None
+
+        def emit(filename, frame_out, slide):
+            with profiler.stage("submit"):
+                writer.submit(filename, frame_out)
+            result.images.append(filename)
+            result.slides.append(dict(slide, file=os.path.basename(filename)))
+            if self.on_capture:
+                self.on_capture(frame_out, len(result.images), filename)
+            self.log(f"Saved: {os.path.basename(filename)}")
+
+        last_done = None
+        last_saved = time.monotonic()
+        t_idle = time.perf_counter()
+        try:
+            for sample in reader:
+                # 等待解码线程的时间 = 分析阶段空转
+                profiler.add("wait_decode", time.perf_counter() - t_idle)
+                if not self.is_running: break
+                thresh = self.params.diff_threshold
+                stability = self.params.stability_frames
+
+                elapsed = sample.pos_sec - start_sec
+                percent = max(0, min(100, int((elapsed / total_duration) * 100)))
+
+                if self.on_frame:
+                    with profiler.stage("preview"):
+                        self.on_frame(sample.frame)
+
+                filename = os.path.join(images_dir, f"slide_{captured_count + 1:04d}{writer.ext}")
+                with profiler.stage("detect"):
+                    is_new = detector.feed(sample.gray_small, thresh, stability, self.params.global_dedup,
+                                           label=filename)
+                profiler.count("samples_analysed")
+                recent.append(sample.frame_idx)
+                if picker is not None:
+                    # 上一页的稳定窗口在本采样结束：输出窗口内最清晰的一帧
+                    with profiler.stage("sharpest"):
+                        done = picker.push(sample, detector.stable_counter > 0)
+                    if done is not None:
+                        emit(*self._pending_output(done))
+                if is_new:
+                    captured_count += 1
+                    frame_out = sample.frame
+                    slide = {"time": round(sample.pos_sec, 3), "frame": sample.frame_idx}
+                    if self.params.refine_transitions:
+                        if refiner is None:
+                            refiner = TransitionRefiner(self.video_path, self.scan_roi)
+                        k = min(stability, len(recent) - 1)
+                        before_idx = recent[-2 - k] if len(recent) > k + 1 else None
+                        with profiler.stage("refine"):
+                            frame_out, slide = self._refine_capture(refiner, fps, before_idx, recent[-1 - k],
+                                                                    sample, thresh, range_start)
+                    if picker is not None:
+                        with profiler.stage("sharpest"):
+                            picker.capture(sample, frame_out, slide["frame"], slide["time"], thresh,
+                                           (filename, slide))
+                    else:
+                        emit(filename, frame_out, slide)
+                elif detector.last_match is not None:
+                    self.log(f"Revisit of {os.path.basename(detector.registry.label(detector.last_match))} skipped "
+                             f"at {format_time(sample.pos_sec)}")
+
+                self._report_progress(percent, sample.pos_sec)
+                last_done = sample
+
+                if recorder is not None:
+                    # 热调节改变了采样步长，序列不再对应固定网格，放弃本次缓存
+                    if prev_idx is not None and sample.frame_idx - prev_idx != cache_step:
+                        recorder.abort()
+                        recorder = None
+                    else:
+                        recorder.append(sample.frame_idx, sample.pos_sec, sample.gray_small)
+                prev_idx = sample.frame_idx
+
+                if time.monotonic() - last_saved >= self.checkpoint_interval:
+                    # Note: 待定页不提前输出，只把帧号/清晰度记入检查点 (输出不受检查点时机影响)
+                    with profiler.stage("checkpoint"):
+                        writer.flush()
+                        self._save_checkpoint(checkpoint, signature, detector, result, last_done,
+                                              picker.state() if picker is not None else None)
+                    last_saved = time.monotonic()
+                t_idle = time.perf_counter()
+        finally:
+            reader.close()
+            # 被取消时待定页按目前最清晰的帧写出，检查点仍记为待定，续跑时接着挑选并覆盖同名文件
+            sharpest = picker.state() if picker is not None else None
+            done = picker.finish() if picker is not None else None
+            if done is not None:
+                emit(*self._pending_output(done))
+            writer.close()
+            if refiner is not None:
+                refiner.close()
+            if recorder is not None and not (self.is_running and reader.error is None):
+                recorder.abort()
+
+        if recorder is not None and not recorder.closed:
+            try:
+                recorder.commit()
+            except OSError as e:
+                self.log(f"Feature cache write failed: {e}")
+
+        if not self.is_running:
+            # 被取消：记录最后一个完整处理的采样，下次从这里继续
+            if last_done is not None:
+                self._save_checkpoint(checkpoint, signature, detector, result, last_done, sharpest)
+        else:
+            checkpoint.clear()
+
+        if reader.reached_end:
+            self.log(f"Reached end time: {format_time(end_sec)}")
+            self._report_progress(100, end_sec)
+        if refiner is not None:
+            self._finish_refine(refiner, result)
+        if picker is not None:
+            profiler.count("sharpness_scored", picker.scored)
+            self.log(f"Sharpest frame: scored {picker.scored} samples, no extra decodes")
+        profiler.count("frames_decoded", sampler.frames_decoded)
+        if adaptive.grid_samples > adaptive.samples:
+            self.log(f"Adaptive sampling: {adaptive.summary()}")
+            profiler.count("bisect_probes", adaptive.probes)
+            profiler.count("samples_skipped", adaptive.grid_samples - adaptive.samples - adaptive.probes)
+        if profiler.enabled and last_done is not None:
+            # 续跑时只统计本次实际扫描的视频时长
+            profiler.video_sec = last_done.pos_sec - next_frame / fps
+        self.log(f"Decode: {sampler.summary()}")
+        self.log(f"Writer: {writer.stats.summary()}")
+
+    def _open_cache(self, start_frame, step, end_sec):
+        """Returns: (FeatureCache, key)；缓存关闭或不可用时返回 (None, None)"""
+        if not self.use_cache:
+            return None, None
+        try:
+            cache = FeatureCache(self.cache_dir, self.cache_max_bytes)
+            key = feature_key(video_fingerprint(self.video_path), self.scan_roi, start_frame, step, end_sec)
+        except OSError as e:
+            self.log(f"Feature cache disabled: {e}")
+            return None, None
+        return cache, key
+
+    def _cache_meta(self):
+        return {"video": os.path.abspath(self.video_path), "roi": list(self.scan_roi) if self.scan_roi else None,
+                "interval": self.params.check_interval}
+
+    def _replay(self, cap, fps, entry, start_frame, end_sec, images_dir, result, source="Feature cache hit"):
+        """
+        Cache Replay.
+        直接在缓存 (或代理扫描) 的缩略图序列上重放状态机，只对被捕获的采样点定位解码全分辨率帧。
+        """
+        self.log(f"{source}: replaying {len(entry)} samples without decoding")
+        start_sec = self.start_sec
+        total_duration = max(end_sec - start_sec, 1)
+
+        # Note: 参数在重放期间固定，整段序列一次性向量化检测，只对捕获点逐个解码
+        profiler = self.profiler
+        registry = SlideRegistry(self.params.dedup_radius) if self.params.global_dedup else None
+        with profiler.stage("detect"):
+            diffs = frame_diff_series(entry.thumbs)
+            captures = detect_captures(entry.thumbs, self.params.diff_threshold, self.params.stability_frames,
+                                       diffs=diffs, registry=registry)
+        profiler.count("samples_analysed", len(entry))
+        if profiler.enabled:
+            profiler.video_sec = end_sec - start_sec
+        writer = AsyncSlideWriter(self.output_format, threads=self.writer_threads,
+                                  on_error=lambda path: self.log(f"Write Error: {os.path.basename(path)}"),
+                                  profiler=profiler)
+        if registry is not None:
+            for i, number in registry.duplicates:
+                self.log(f"Revisit of slide_{number:04d}{self.output_format.ext} skipped "
+                         f"at {format_time(float(entry.pos_sec[i]))}")
+        refiner = TransitionRefiner(self.video_path, self.scan_roi) if self.params.refine_transitions else None
+        stability = self.params.stability_frames
+        try:
+            for i in captures:
+                if not self.is_running: break
+                pos_sec = float(entry.pos_sec[i])
+                with profiler.stage("decode"):
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, int(entry.frame_idx[i]))
+                    ret, frame = cap.read()
+                profiler.count("frames_decoded")
+                if not ret:
+                    self.log(f"Replay Error: cannot decode frame {int(entry.frame_idx[i])}")
+                    continue
+                process_frame = crop_roi(frame, self.scan_roi)
+                filename = os.path.join(images_dir, f"slide_{len(result.images) + 1:04d}{writer.ext}")
+                slide = {"time": round(pos_sec, 3), "frame": int(entry.frame_idx[i])}
+                if refiner is not None:
+                    # 稳定段从第 i - stability 个采样开始 (detect_captures 的捕获条件)
+                    k = min(stability, i)
+                    before_idx = int(entry.frame_idx[i - k - 1]) if i - k > 0 else None
+                    sample = FrameSample(int(entry.frame_idx[i]), pos_sec, process_frame, entry.thumbs[i])
+                    with profiler.stage("refine"):
+                        process_frame, slide = self._refine_capture(refiner, fps, before_idx,
+                                                                    int(entry.frame_idx[i - k]), sample,
+                                                                    self.params.diff_threshold, start_sec)
+                if self.params.sharpest_frame:
+                    with profiler.stage("sharpest"):
+                        _, process_frame, slide = self._replay_sharpest(cap, entry, diffs, i, process_frame,
+                                                                        (filename, slide))
+                writer.submit(filename, process_frame)
+                result.images.append(filename)
+                result.slides.append(dict(slide, file=os.path.basename(filename)))
+
+                if self.on_capture:
+                    self.on_capture(process_frame, len(result.images), filename)
+                self.log(f"Saved: {os.path.basename(filename)}")
+                self._report_progress(max(0, min(100, int((pos_sec - start_sec) / total_duration * 100))),
+                                      pos_sec)
+        finally:
+            writer.close()
+            if refiner is not None:
+                refiner.close()
+
+        if self.is_running:
+            self._report_progress(100, end_sec)
+        if refiner is not None:
+            self._finish_refine(refiner, result)
+        self.log(f"Writer: {writer.stats.summary()}")
+
+    def _refine_capture(self, refiner, fps, before_idx, start_idx, sample, thresh, range_start=None):
+        """
+        range_start: 扫描区间起点 (秒)；before_idx 为 None 表示这一页从区间第一个采样起就已显示，
+        切换时间记为区间起点，而不是新画面第一个采样的时间
+        Returns: (输出画面, 时间信息)
+        """
+        refined = refiner.refine(before_idx, start_idx, sample.frame_idx, sample.frame, sample.gray_small, thresh)
+        transition = refined.transition_idx / fps
+        if before_idx is None and range_start is not None:
+            transition = range_start
+        slide = {
+            "time": round(refined.frame_idx / fps, 3),
+            "frame": refined.frame_idx,
+            "transition": round(transition, 3),
+            "sharpness": round(float(refined.sharpness), 2),
+        }
+        return refined.frame, slide
+
+    @staticmethod
+    def _pending_output(pending):
+        """Returns: (文件名, 输出画面, 时间信息)"""
+        filename, slide = pending.payload
+        slide = dict(slide, time=round(pending.pos_sec, 3), frame=pending.frame_idx,
+                     sharpness=round(float(pending.sharpness), 2))
+        return filename, pending.frame, slide
+
+    def _replay_sharpest(self, cap, entry, diffs, i, frame, payload):
+        """
+        Note: 与 SharpestPicker 相同的候选集，按同样的顺序比较：稳定段内截至捕获的最近 SHARPEST_RING 个采样，
+        加上捕获后窗口内至多 SHARPEST_RING 个静止采样；缩略图与捕获差异超过阈值的采样先行排除 (不解码)。
+        Returns: (文件名, 输出画面, 时间信息)
+        """
+        thresh = self.params.diff_threshold
+        lo = max(i - min(self.params.stability_frames, i), i - SHARPEST_RING + 1)
+        hi = i + 1
+        while hi < len(diffs) and hi - i <= SHARPEST_RING and diffs[hi] < thresh:
+            hi += 1
+
+        slide = payload[1]
+        pending = PendingSlide(frame, slide["frame"], slide["time"], get_blur_score(frame), entry.thumbs[i],
+                               thresh, payload)
+        window = [j for j in range(lo, hi) if int(entry.frame_idx[j]) != slide["frame"]
+                  and thumb_diff(entry.thumbs[j], entry.thumbs[i]) < thresh]
+        for j in window:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(entry.frame_idx[j]))
+            ret, candidate = cap.read()
+            self.profiler.count("frames_decoded")
+            if ret:
+                candidate = crop_roi(candidate, self.scan_roi)
+                pending.offer(candidate, int(entry.frame_idx[j]), float(entry.pos_sec[j]),
+                              get_blur_score(candidate))
+        return self._pending_output(pending)
+
+    def _finish_refine(self, refiner, result):
+        self.profiler.count("refine_decodes", refiner.decodes)
+        self.log(f"Refined {len(result.slides)} transitions with {refiner.decodes} extra decodes")
+        try:
+            write_slides_json(result.project_dir, result.slides)
+        except OSError as e:
+            self.log(f"Slides JSON Error: {e}")
+
+    def _proxy_features(self, fps, start_frame, end_sec):
+        """Returns: 代理上的缩略图序列；代理不可用时返回 None (回退到原片扫描)"""
+        step, gap = self._sample_step(fps), proxy_gap(proxy_step(fps))
+        if step < gap:
+            # Note: 在生成代理之前检查，避免白白解码一遍原片
+            self.log(f"Sampling step {step} is finer than the proxy ({gap} frames), scanning the original video.")
+            return None
+        duration = max(end_sec, 1)
+        proxy = build_proxy(self.video_path, self.cache_dir, self.cache_max_bytes, stop_event=self._stop_event,
+                            on_progress=lambda p: self._report_progress(p, p / 100 * duration), on_log=self.log)
+        if proxy is None:
+            if self.is_running:
+                self.log("Proxy unavailable, scanning the original video.")
+            return None
+
+        total_duration = max(end_sec - self.start_sec, 1)
+        with self.profiler.stage("proxy_scan"):
+            features = proxy.features(
+                self.scan_roi, start_frame, step, end_sec, stop_event=self._stop_event,
+                on_progress=lambda pos: self._report_progress(
+                    max(0, min(100, int((pos - self.start_sec) / total_duration * 100))), pos), on_log=self.log)
+        return features
+
+    def _job_signature(self, start_frame, end_sec):
+        """Note: 检查点只在 视频/ROI/范围/输出格式/检测参数 全部一致时才可续跑"""
+        return {
+            "video": os.path.basename(self.video_path),
+            "video_size": os.path.getsize(self.video_path),
+            "roi": list(self.scan_roi) if self.scan_roi else None,
+            "start_frame": start_frame,
+            "end_sec": end_sec,
+            "ext": self.output_format.ext,
+            "params": asdict(self.params),
+        }
+
+    def _save_checkpoint(self, checkpoint, signature, detector, result, sample, sharpest=None):
+        signature = dict(signature, params=asdict(self.params))
+        # 待定页 (--sharpest) 即使已按目前最清晰的帧写出，也不计入已捕获列表
+        pending = sharpest["pending"] if sharpest else None
+        images = [p for p in result.images if pending is None or p != pending["file"]]
+        meta = {
+            "signature": signature,
+            "next_frame": sample.frame_idx + 1,
+            "pos_sec": sample.pos_sec,
+            "stable_counter": detector.stable_counter,
+            "captured": [os.path.basename(p) for p in images],
+            "slides": result.slides[:len(images)],
+            "sharpest": sharpest,
+        }
+        try:
+            checkpoint.save(meta, detector.prev_frame_gray, detector.last_captured_hash, detector.registry.thumbs)
+        except OSError as e:
+            self.log(f"Checkpoint Error: {e}")
+
+    def _restore_checkpoint(self, checkpoint, signature, detector, images_dir, result, picker=None, cap=None):
+        """Returns: 续跑的起始帧号；无可用检查点时返回 None"""
+        state = checkpoint.load()
+        if state is None:
+            return None
+        meta, prev_frame_gray, last_captured_hash, history = state
+        if meta.get("signature") != signature:
+            self.log("Checkpoint ignored: video, range or parameters changed.")
+            return None
+
+        images = [os.path.join(images_dir, name) for name in meta["captured"]]
+        if not all(os.path.exists(p) for p in images):
+            self.log("Checkpoint ignored: captured slides are missing.")
+            return None
+
+        sharpest = meta.get("sharpest")
+        if picker is not None and sharpest:
+            if not picker.restore(sharpest, lambda idx, pos: self._decode_sample(cap, idx, pos), last_captured_hash):
+                self.log("Checkpoint ignored: cannot decode the pending sharpest-frame candidates.")
+                return None
+        pending = 1 if sharpest and sharpest.get("pending") else 0
+
+        detector.prev_frame_gray = prev_frame_gray
+        detector.last_captured_hash = last_captured_hash
+        detector.stable_counter = meta["stable_counter"]
+        if history is not None and len(history) == len(images) + pending:
+            labels = images + ([sharpest["pending"]["file"]] if pending else [])
+            for gray_small, label in zip(history, labels):
+                detector.registry.add(gray_small, label)
+        result.images.extend(images)
+        result.slides.extend(meta.get("slides", []))
+        self.log(f"Resumed from checkpoint at {format_time(meta['pos_sec'])} ({len(images)} slides)")
+        return meta["next_frame"]
+
+    def _decode_sample(self, cap, frame_idx, pos_sec):
+        """Returns: 定位解码并裁剪到扫描 ROI 的 FrameSample，失败时返回 None"""
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(frame_idx))
+        ret, frame = cap.read()
+        self.profiler.count("frames_decoded")
+        if not ret:
+            return None
+        frame = crop_roi(frame, self.scan_roi)
+        return FrameSample(int(frame_idx), pos_sec, frame, gray_thumbnail(frame))
+
+    def _sample_step(self, fps):
+        """Note: 每次采样前进的帧数，随 check_interval 热调节变化"""
+        return sample_step(fps, self.params.check_interval)
+
+    def _scan_parallel(self, cap, fps, start_frame, end_sec, images_dir, result, recorder=None):
+        from src.core.parallel import ShardedScan
+
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        end_frame = min(total_frames, int(end_sec * fps)) if total_frames > 0 else int(end_sec * fps)
+        scan = ShardedScan(self.video_path, self.scan_roi, fps, start_frame, end_frame, end_sec,
+                           self.params, self.workers, images_dir, sampling=self.sampling,
+                           output_format=self.output_format, recorder=recorder)
+
+        self.log(f"Running... Target: {self.project_name} ({scan.shard_count} shards / {self.workers} workers)")
+        # Note: 分片在子进程中运行，这里只统计整体时长 (各阶段细分请用单进程模式)
+        if self.profiler.enabled:
+            self.profiler.video_sec = end_sec - self.start_sec
+        for n, path in scan.run(self._stop_event, on_progress=self._report_progress):
+            result.images.append(path)
+            if self.on_capture:
+                self.on_capture(cv2_imread_safe(path, cv2.IMREAD_COLOR), n, path)
+            self.log(f"Saved: {os.path.basename(path)}")
+
+    def _report_progress(self, percent, pos_sec):
+        if self.on_progress:
+            self.on_progress(percent, pos_sec)
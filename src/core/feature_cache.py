@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ppt_extractor", "features")
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+THUMB_SIZE = 64
+# 缩略图算法版本：gray_thumbnail 的计算方式改变时递增，旧缓存自动失效
+THUMB_VERSION = 2
+
+_CHUNK = 1024 * 1024
+
+
+def video_fingerprint(path):
+    """
+    Note: 视频内容指纹 = 文件大小 + 头/中/尾各 1MB 的 SHA1。
+    对数 GB 的录像做全量哈希需要数十秒，采样哈希足以区分不同文件 (改名/移动后仍能命中)。
+    """
+    size = os.path.getsize(path)
+    h = hashlib.sha1(str(size).encode())
+    with open(path, "rb") as f:
+        for offset in (0, max(0, size // 2 - _CHUNK // 2), max(0, size - _CHUNK)):
+            f.seek(offset)
+            h.update(f.read(_CHUNK))
+    return h.hexdigest()
+
+
+def feature_key(fingerprint, roi, start_frame, step, end_sec):
+    """Note: 缓存键只包含决定缩略图序列的因素；阈值/防抖等级不在其中，改了也能命中"""
+    spec = {
+        "video": fingerprint,
+        "roi": list(roi) if roi else None,
+        "start_frame": start_frame,
+        "step": step,
+        "end_sec": round(end_sec, 3),
+        "thumb": THUMB_SIZE,
+        "thumb_version": THUMB_VERSION,
+    }
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:24]
+
+
+class CacheEntry:
+    """一个视频 (ROI + 采样网格) 的完整缩略图序列，thumbs 为只读内存映射"""
+
+    def __init__(self, path, meta):
+        self.path = path
+        self.meta = meta
+        count = meta["count"]
+        self.thumbs = np.memmap(os.path.join(path, "thumbs.u8"), dtype=np.uint8, mode="r",
+                                shape=(count, THUMB_SIZE, THUMB_SIZE)) if count else \
+            np.zeros((0, THUMB_SIZE, THUMB_SIZE), np.uint8)
+        self.frame_idx = np.load(os.path.join(path, "frames.npy"))
+        self.pos_sec = np.load(os.path.join(path, "times.npy"))
+
+    def __len__(self):
+        return len(self.frame_idx)
+
+
+class FeatureSeries:
+    """内存中的缩略图序列 (未启用缓存时使用)，接口与 CacheEntry 相同"""
+
+    def __init__(self, thumbs, frame_idx, pos_sec):
+        self.thumbs = thumbs
+        self.frame_idx = frame_idx
+        self.pos_sec = pos_sec
+
+    def __len__(self):
+        return len(self.frame_idx)
+
+
+class FeatureRecorder:
+    """
+    边抽取边写缓存：缩略图直接追加到磁盘文件，内存占用恒定。
+    只有完整覆盖整个范围的扫描才会 commit()，中途取消/参数变化时 abort()。
+    """
+
+    def __init__(self, cache, key, meta):
+        self.cache = cache
+        self.key = key
+        self.meta = dict(meta)
+        self.tmp_dir = os.path.join(cache.root, f"{key}.tmp-{os.getpid()}")
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        os.makedirs(self.tmp_dir)
+        self._thumbs = open(os.path.join(self.tmp_dir, "thumbs.u8"), "wb")
+        self._frames = []
+        self._times = []
+        self.closed = False
+
+    def append(self, frame_idx, pos_sec, gray_small):
+        self._thumbs.write(np.ascontiguousarray(gray_small, dtype=np.uint8).tobytes())
+        self._frames.append(frame_idx)
+        self._times.append(pos_sec)
+
+    def commit(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._thumbs.close()
+        np.save(os.path.join(self.tmp_dir, "frames.npy"), np.asarray(self._frames, np.int64))
+        np.save(os.path.join(self.tmp_dir, "times.npy"), np.asarray(self._times, np.float64))
+        self.meta.update(count=len(self._frames), created=time.time(), last_access=time.time())
+        self.meta["nbytes"] = _dir_size(self.tmp_dir) + 1024
+        with open(os.path.join(self.tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, ensure_ascii=False)
+
+        final = os.path.join(self.cache.root, self.key)
+        shutil.rmtree(final, ignore_errors=True)
+        os.replace(self.tmp_dir, final)
+        self.cache.evict(keep=self.key)
+
+    def abort(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._thumbs.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+
+class FeatureCache:
+    """
+    Persistent Feature Cache.
+    <root>/<key>/{thumbs.u8, frames.npy, times.npy, meta.json}
+    总大小超过 max_bytes 时按最近访问时间 (LRU) 淘汰整个条目。
+    """
+
+    def __init__(self, root=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root or os.environ.get("PPT_EXTRACTOR_CACHE") or DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        os.makedirs(self.root, exist_ok=True)
+
+    def _meta_path(self, key):
+        return os.path.join(self.root, key, "meta.json")
+
+    def lookup(self, key):
+        """Returns: CacheEntry，未命中或条目损坏时返回 None"""
+        path = os.path.join(self.root, key)
+        try:
+            with open(self._meta_path(key), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            entry = CacheEntry(path, meta)
+        except (OSError, ValueError, KeyError):
+            return None
+
+        meta["last_access"] = time.time()
+        try:
+            with open(self._meta_path(key), "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+        except OSError:
+            pass
+        return entry
+
+    def recorder(self, key, meta):
+        return FeatureRecorder(self, key, meta)
+
+    def entries(self):
+        """Returns: [(key, meta)]，按最近访问时间从旧到新"""
+        items = []
+        for name in os.listdir(self.root):
+            try:
+                with open(self._meta_path(name), "r", encoding="utf-8") as f:
+                    items.append((name, json.load(f)))
+            except (OSError, ValueError):
+                continue
+        return sorted(items, key=lambda kv: kv[1].get("last_access", 0))
+
+    def evict(self, keep=None):
+        entries = self.entries()
+        total = sum(meta.get("nbytes", 0) for _, meta in entries)
+        for key, meta in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(os.path.join(self.root, key), ignore_errors=True)
+            total -= meta.get("nbytes", 0)
+
+
+def _dir_size(path):
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
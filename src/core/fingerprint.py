@@ -0,0 +1,126 @@
+from itertools import combinations
+
+from src.core.image_algo import dhash64, hamming64, thumb_diff
+
+# Note: 同一页重现时 dHash 距离实测为 0，不同幻灯片之间 >= 12；半径 3 时 4 段均整段精确匹配，候选数最少
+DEFAULT_RADIUS = 3
+# 每段 16 位；段内探测 radius // 段数 位以内的全部邻近值，上限 15 时每段 697 个
+CHUNK_BITS = 16
+MAX_RADIUS = 15
+
+
+def split_chunks(bits=64, parts=64 // CHUNK_BITS):
+    """Returns: [(shift, mask)]，把 bits 位整数切成 parts 段 (前几段多 1 位)"""
+    base, extra = divmod(bits, parts)
+    chunks, shift = [], bits
+    for i in range(parts):
+        width = base + (1 if i < extra else 0)
+        shift -= width
+        chunks.append((shift, (1 << width) - 1))
+    return chunks
+
+
+def flip_masks(dist, width=CHUNK_BITS):
+    """Returns: width 位内翻转不超过 dist 位的全部异或掩码 (含 0)"""
+    masks = [0]
+    for d in range(1, dist + 1):
+        for bits in combinations(range(width), d):
+            m = 0
+            for b in bits:
+                m |= 1 << b
+            masks.append(m)
+    return masks
+
+
+class FingerprintIndex:
+    """
+    Multi-Index Hashing over packed 64-bit fingerprints.
+    切成 bits // CHUNK_BITS 段，每段一张哈希表。抽屉原理：汉明距离 <= radius 的两个哈希，
+    至少有一段的距离 <= radius // 段数，查询在每段探测这个距离内的邻近值，再对召回的候选精确计算距离。
+    Note: 段宽决定候选规模：radius <= 3 时每段整段精确匹配，每个桶约占全部条目的 1/65536，
+    几万条以内候选数基本不变；radius 4-7 每段探测 17 个邻近桶，8-11 探测 137 个，候选随之按比例增加。
+    若按 radius + 1 段切 (约 7 位)，每桶约占全部条目的 1/128，查询退化为线性扫描。
+    compared: 累计精确比较过的候选数 (benchmarks/bench_fingerprint.py 统计用)
+    """
+
+    def __init__(self, radius=DEFAULT_RADIUS, bits=64):
+        if not 0 <= radius <= MAX_RADIUS:
+            raise ValueError(f"Fingerprint radius must be 0-{MAX_RADIUS}, got {radius}")
+        self.radius = radius
+        self._chunks = split_chunks(bits, max(1, bits // CHUNK_BITS))
+        self._width = self._chunks[0][1].bit_length()
+        self._masks = flip_masks(radius // len(self._chunks), self._width)
+        self._tables = [{} for _ in self._chunks]
+        self._hashes = {}
+        self.compared = 0
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def add(self, key, h):
+        self._hashes[key] = h
+        for table, (shift, mask) in zip(self._tables, self._chunks):
+            table.setdefault((h >> shift) & mask, []).append(key)
+
+    def query(self, h, radius=None):
+        """Returns: [(距离, key)]，按距离升序；radius 不能超过建索引时的 radius"""
+        radius = self.radius if radius is None else min(radius, self.radius)
+        probe = radius // len(self._chunks)
+        masks = self._masks if probe == self.radius // len(self._chunks) else flip_masks(probe, self._width)
+        seen, hits = set(), []
+        for table, (shift, mask) in zip(self._tables, self._chunks):
+            value = (h >> shift) & mask
+            for m in masks:
+                for key in table.get(value ^ m, ()):
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    d = hamming64(h, self._hashes[key])
+                    if d <= radius:
+                        hits.append((d, key))
+        self.compared += len(seen)
+        hits.sort()
+        return hits
+
+
+class SlideRegistry:
+    """
+    Feature Fingerprint Registry.
+    记录本次抽取已保存的全部幻灯片：dHash 索引负责快速召回，
+    再用与 SlideDetector 相同的缩略图 MSE 判据 (< thresh * 1.5) 确认，避免同模板幻灯片被误判。
+    幻灯片编号从 1 开始，与 slide_XXXX 文件序号一致。
+    duplicates: 离线检测 (detect_captures) 时记录的 [(采样下标, 匹配到的编号)]
+    labels: 与 thumbs 一一对应的标签 (逐帧扫描时为输出文件路径)；续跑未恢复历史时编号会与文件序号错位，日志应以标签为准
+    """
+
+    def __init__(self, radius=DEFAULT_RADIUS):
+        self.index = FingerprintIndex(radius)
+        self.thumbs = []
+        self.labels = []
+        self.duplicates = []
+
+    def __len__(self):
+        return len(self.thumbs)
+
+    def add(self, gray_small, label=None):
+        """Returns: 新幻灯片的编号"""
+        self.thumbs.append(gray_small)
+        self.labels.append(label)
+        h = dhash64(gray_small)
+        if h is not None:
+            self.index.add(len(self.thumbs), h)
+        return len(self.thumbs)
+
+    def label(self, number):
+        """Returns: 编号对应的标签，登记时未提供则为 None"""
+        return self.labels[number - 1]
+
+    def find(self, gray_small, thresh):
+        """Returns: 与之重复的已有幻灯片编号，没有则返回 None"""
+        h = dhash64(gray_small)
+        if h is None:
+            return None
+        for _, number in self.index.query(h):
+            if thumb_diff(gray_small, self.thumbs[number - 1]) < thresh * 1.5:
+                return number
+        return None
@@ -2,24 +2,44 @@ import cv2
 import numpy as np
 
 
+# 黑边判定：亮度阈值，以及检测时缩小到的宽度 (像素)
+BORDER_LUMA = 15
+BORDER_WORK_WIDTH = 480
+
+
+def find_content_rect(img):
+    """
+    Border Detection: 在缩小的灰度图上做阈值 + 开运算 (去噪点)，取非黑像素的外接矩形。
+    Note: 换算回原图时向外取整，宁可多留一两像素也不裁掉内容。
+    Returns: (x, y, w, h) 原图坐标，全黑时返回 None
+    """
+    h, w = img.shape[:2]
+    scale = min(1.0, BORDER_WORK_WIDTH / w)
+    if scale < 1.0:
+        img = cv2.resize(img, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    _, mask = cv2.threshold(gray, BORDER_LUMA, 255, cv2.THRESH_BINARY)
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+
+    coords = cv2.findNonZero(mask)
+    if coords is None:
+        return None
+    x, y, bw, bh = cv2.boundingRect(coords)
+    x0, y0 = int(x / scale), int(y / scale)
+    x1 = min(w, int(np.ceil((x + bw) / scale)))
+    y1 = min(h, int(np.ceil((y + bh) / scale)))
+    return x0, y0, x1 - x0, y1 - y0
+
+
 def auto_crop_smart(img):
     """
     Smart Cropping: Removes static black borders using morphological operations.
     """
     if img is None: return None
     try:
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        _, thresh = cv2.threshold(gray, 15, 255, cv2.THRESH_BINARY)
-
-        # Morphological opening to remove noise
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
-        thresh = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel)
-
-        coords = cv2.findNonZero(thresh)
-        if coords is not None:
-            x, y, w, h = cv2.boundingRect(coords)
-            return img[y:y + h, x:x + w]
-        return img
+        rect = find_content_rect(img)
+        return crop_roi(img, rect) if rect else img
     except Exception:
         return img
 
@@ -42,6 +62,50 @@ def get_blur_score(img):
         return 0
 
 
+def clamp_roi(roi, w_frame, h_frame):
+    """
+    Clamps (x, y, w, h) to the frame bounds (same rule as crop_roi).
+    Returns: (x, y, w, h); w or h <= 0 means the ROI lies outside the frame.
+    """
+    x, y, w, h = roi
+    x = max(0, x)
+    y = max(0, y)
+    return x, y, min(w, w_frame - x), min(h, h_frame - y)
+
+
+def crop_roi(frame, roi):
+    """
+    ROI Cropping: Clamps (x, y, w, h) to the frame bounds.
+    Returns a view, no pixel data is copied.
+    """
+    if not roi: return frame
+    h_frame, w_frame = frame.shape[:2]
+    x, y, w, h = clamp_roi(roi, w_frame, h_frame)
+    return frame[y:y + h, x:x + w]
+
+
+def gray_thumbnail(img, size=64):
+    """
+    Analysis Thumbnail: Grayscale + downscale, the unit all detection runs on.
+    Note: 先缩放再转灰度。INTER_LINEAR 缩小时每个输出像素只读取 2x2 个源像素，
+    对 ROI 视图直接缩放只触及约 4*size*size 个像素，4K 画面的单次开销从整幅 cvtColor 降到微秒级；
+    与先转灰度的结果只差舍入 (平均 < 0.2 灰度级)。
+    """
+    if img.ndim == 2:
+        return cv2.resize(img, (size, size))
+    return cv2.cvtColor(cv2.resize(img, (size, size)), cv2.COLOR_BGR2GRAY)
+
+
+def thumb_diff(g1, g2):
+    """
+    MSE between two gray thumbnails of equal shape.
+    Returns: Float (0.0 - 100.0+), lower is more similar.
+    """
+    err = np.sum((g1.astype("float") - g2.astype("float")) ** 2)
+    err /= float(g1.shape[0] * g1.shape[1])
+    return err / 100.0  # Normalized roughly
+
+
 def get_frame_diff(img1, img2):
     """
     MSE Calculation: Fast frame difference metric.
@@ -50,17 +114,7 @@ def get_frame_diff(img1, img2):
     if img1 is None or img2 is None: return 100.0
     try:
         # Convert to grayscale and resize for speed
-        g1 = cv2.cvtColor(img1, cv2.COLOR_BGR2GRAY)
-        g2 = cv2.cvtColor(img2, cv2.COLOR_BGR2GRAY)
-
-        g1 = cv2.resize(g1, (64, 64))
-        g2 = cv2.resize(g2, (64, 64))
-
-        # Calculate Mean Squared Error
-        err = np.sum((g1.astype("float") - g2.astype("float")) ** 2)
-        err /= float(g1.shape[0] * g1.shape[1])
-
-        return err / 100.0  # Normalized roughly
+        return thumb_diff(gray_thumbnail(img1), gray_thumbnail(img2))
     except Exception:
         return 100.0
 
@@ -81,4 +135,120 @@ def get_dhash(img):
 def hamming_distance(hash1, hash2):
     """Compare two dHash fingerprints."""
     if hash1 is None or hash2 is None: return 64
-    return np.count_nonzero(hash1 != hash2)
\ No newline at end of file
+    return np.count_nonzero(hash1 != hash2)
+
+
+def pack_hash(bits):
+    """
+    Pack a 64-bit boolean fingerprint (e.g. get_dhash output) into a Python int.
+    Returns: int in [0, 2**64), row-major, first bit is the most significant.
+    """
+    return int.from_bytes(np.packbits(np.asarray(bits, dtype=bool).ravel()).tobytes(), "big")
+
+
+# dHash 比较的死区 (灰度级)：纯色背景上相邻格子几乎相等，压缩/噪声的 ±1 抖动会随机翻转这些比特
+DHASH_MARGIN = 2
+
+
+def dhash64(img):
+    """
+    Packed dHash: accepts BGR frames or gray thumbnails (e.g. gray_small).
+    Note: 右格比左格亮超过 DHASH_MARGIN 才记为 1，平坦区域稳定为 0。
+    Returns: 64-bit int, or None on failure.
+    """
+    try:
+        if img.ndim == 3:
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        resized = cv2.resize(img, (9, 8), interpolation=cv2.INTER_AREA).astype(np.int16)
+        return pack_hash(resized[:, 1:] > resized[:, :-1] + DHASH_MARGIN)
+    except Exception:
+        return None
+
+
+def hamming64(h1, h2):
+    """Hamming distance between two packed 64-bit fingerprints."""
+    return bin(h1 ^ h2).count("1")
+
+
+# ================= Batch (Vectorized) Detection =================
+
+def frame_diff_series(thumbs, chunk=2048):
+    """
+    Vectorized MSE: thumbs 为 (N, H, W) uint8 缩略图序列。
+    Returns: (N,) float64，diffs[i] = thumb_diff(thumbs[i], thumbs[i-1])，diffs[0] = inf。
+    Note: 平方差在 int64 上精确求和后再归一化，与逐对的 thumb_diff 结果逐位一致；
+          分块计算，内存占用与 N 无关。
+    """
+    n = len(thumbs)
+    diffs = np.full(n, np.inf)
+    if n < 2:
+        return diffs
+    pixels = float(thumbs.shape[1] * thumbs.shape[2])
+    for s in range(1, n, chunk):
+        e = min(n, s + chunk)
+        block = np.asarray(thumbs[s - 1:e], dtype=np.int32)
+        d = block[1:] - block[:-1]
+        sq = np.einsum("nij,nij->n", d, d, dtype=np.int64)
+        diffs[s:e] = sq.astype(np.float64) / pixels / 100.0
+    return diffs
+
+
+def stable_run_lengths(diffs, thresh):
+    """
+    Returns: (N,) int64，第 i 次采样时的稳定计数 (等价于 SlideDetector.stable_counter)
+    """
+    static = diffs < thresh
+    idx = np.arange(len(diffs))
+    last_reset = np.maximum.accumulate(np.where(static, 0, idx))
+    return idx - last_reset
+
+
+def _dedup_candidates(thumbs, candidates, thresh, registry=None):
+    """
+    去重依赖之前的捕获，是天然串行的；候选点很少，逐个比较即可。
+    registry: 可选的全局指纹注册表 (SlideRegistry)，与所有历史捕获比较
+    """
+    captures, last = [], None
+    for i in candidates:
+        g = thumbs[i]
+        if last is not None and thumb_diff(g, last) < thresh * 1.5:
+            continue
+        if registry is not None:
+            match = registry.find(g, thresh)
+            if match is not None:
+                registry.duplicates.append((int(i), match))
+                continue
+            registry.add(g)
+        captures.append(int(i))
+        last = g
+    return captures
+
+
+def detect_captures(thumbs, thresh, stability, diffs=None, registry=None):
+    """
+    Offline Detection: 一次性计算整段缩略图序列的捕获点，结果与逐帧运行 SlideDetector 相同。
+    Returns: 被捕获采样的下标列表
+    """
+    if diffs is None:
+        diffs = frame_diff_series(thumbs)
+    runs = stable_run_lengths(diffs, thresh)
+    candidates = np.flatnonzero(runs == stability) if stability > 0 else []
+    return _dedup_candidates(thumbs, candidates, thresh, registry)
+
+
+def sweep_detection(thumbs, thresholds, stabilities, diffs=None, make_registry=None):
+    """
+    Parameter Sweep: 帧差只计算一次，在 阈值 x 防抖等级 网格上批量评估。
+    make_registry: 可选，每个组合新建一个全局去重注册表
+    Returns: {(thresh, stability): [捕获下标, ...]}
+    """
+    if diffs is None:
+        diffs = frame_diff_series(thumbs)
+    results = {}
+    for thresh in thresholds:
+        runs = stable_run_lengths(diffs, thresh)
+        for stability in stabilities:
+            candidates = np.flatnonzero(runs == stability) if stability > 0 else []
+            registry = make_registry() if make_registry else None
+            results[(thresh, stability)] = _dedup_candidates(thumbs, candidates, thresh, registry)
+    return results
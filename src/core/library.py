@@ -0,0 +1,204 @@
+import os
+import sqlite3
+import time
+
+import cv2
+import numpy as np
+
+from src.core.fingerprint import flip_masks
+from src.core.image_algo import dhash64, gray_thumbnail, hamming64, thumb_diff
+from src.utils.file_ops import cv2_imread_safe
+from src.utils.pdf_ops import project_slides
+
+DEFAULT_LIBRARY_DB = os.path.join(os.path.expanduser("~"), ".cache", "ppt_extractor", "library.sqlite")
+DEFAULT_QUERY_RADIUS = 6
+# 查询半径的实用上限：每段探测 radius // CHUNKS 位以内的全部变体，15 时每段 697 个 (低于 SQLite 默认 999 个参数)，
+# 再大则变体数按组合数爆炸，且距离 > 15 的 dHash 已基本不是同一张幻灯片
+MAX_QUERY_RADIUS = 15
+# 指纹算法版本 (存于 PRAGMA user_version)：2 = 带死区的 dhash64，与抽取时的全局去重一致；3 = 每行附带灰度缩略图
+FINGERPRINT_VERSION = 3
+# 候选确认：缩略图 MSE 低于此值才算同一张幻灯片。库里比较的是已保存的幻灯片图片，同一张图重新编码/缩放后实测 < 0.05；
+# 不沿用抽取时的 thresh * 1.5 (= 15)，那会让空白页与只有一行字的页 (实测 13.2) 互相命中
+THUMB_SIZE = 64
+CONFIRM_MSE = 3.0
+# 置位数不超过此值的 dHash 几乎不含信息 (纯色/空白页)，匹配只能依赖缩略图确认
+LOW_DETAIL_BITS = 6
+
+# 64 位指纹切成 4 段 16 位，每段一列并建索引
+CHUNKS = 4
+CHUNK_BITS = 64 // CHUNKS
+_CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+
+def _chunks(h):
+    return [(h >> (CHUNK_BITS * (CHUNKS - 1 - i))) & _CHUNK_MASK for i in range(CHUNKS)]
+
+
+def _to_signed(h):
+    """Note: SQLite INTEGER 为有符号 64 位"""
+    return h - (1 << 64) if h >= 1 << 63 else h
+
+
+def image_fingerprint(img):
+    """
+    Note: 与抽取时的全局去重共用 dhash64 (含 DHASH_MARGIN 死区)，纯色背景的幻灯片不会因重新编码而翻转比特。
+    Returns: 幻灯片图片的 64 位 dHash (打包整数)，失败返回 None
+    """
+    return dhash64(img)
+
+
+def image_thumbnail(img):
+    """Returns: 入库/查询确认用的 THUMB_SIZE x THUMB_SIZE 灰度缩略图"""
+    return gray_thumbnail(img, THUMB_SIZE)
+
+
+def is_low_detail(h):
+    """Note: 空白或纯色幻灯片的 dHash 接近全 0，彼此之间都在查询半径内"""
+    return bin(h).count("1") <= LOW_DETAIL_BITS
+
+
+class SlideLibrary:
+    """
+    Cross-Project Slide Library.
+    SQLite 持久化所有项目 Runs/ 下幻灯片的 64 位 dHash，每段 16 位单独建索引。
+    Multi-Index Hashing：汉明距离 <= r 时，至少有一段的距离 <= r // 4，
+    查询只需在每段的索引里探测少量邻近值，再对召回结果精确计算距离。
+    Safety: dHash 只负责召回；每行另存 64x64 灰度缩略图，候选须通过缩略图 MSE 确认才返回，
+    否则空白/纯色幻灯片的指纹都接近 0，会互相命中。
+    Note: 按 (mtime, size) 增量更新，未变化的文件不会重新解码。
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or DEFAULT_LIBRARY_DB
+        db_dir = os.path.dirname(os.path.abspath(self.db_path))
+        os.makedirs(db_dir, exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path)
+        self._init_schema()
+
+    def _init_schema(self):
+        # Note: 旧版本算出的指纹与新指纹不可比 (v2 之前也没有缩略图列)，重建表，下次 index 时全部重新计算
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != FINGERPRINT_VERSION:
+            self.conn.execute("DROP TABLE IF EXISTS slides")
+            self.conn.execute("DROP TABLE IF EXISTS projects")
+            self.conn.execute(f"PRAGMA user_version = {FINGERPRINT_VERSION}")
+        chunk_cols = ", ".join(f"c{i} INTEGER NOT NULL" for i in range(CHUNKS))
+        self.conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS slides (
+                id INTEGER PRIMARY KEY,
+                project TEXT NOT NULL,
+                path TEXT NOT NULL UNIQUE,
+                mtime REAL NOT NULL,
+                size INTEGER NOT NULL,
+                hash INTEGER NOT NULL,
+                thumb BLOB NOT NULL,
+                {chunk_cols})""")
+        for i in range(CHUNKS):
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_slides_c{i} ON slides (c{i})")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_slides_project ON slides (project)")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS projects (
+                project TEXT PRIMARY KEY,
+                indexed_at REAL NOT NULL)""")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM slides").fetchone()[0]
+
+    # ---------------- Indexing ----------------
+
+    def index_project(self, project_dir):
+        """
+        Note: 增量同步单个项目：新增/修改的幻灯片重新计算指纹，已删除的移出索引
+        Returns: (新增或更新数, 删除数)
+        """
+        project = os.path.abspath(project_dir)
+        known = {path: (mtime, size) for path, mtime, size in self.conn.execute(
+            "SELECT path, mtime, size FROM slides WHERE project = ?", (project,))}
+
+        rows, seen = [], set()
+        for path in project_slides(project):
+            path = os.path.abspath(path)
+            seen.add(path)
+            st = os.stat(path)
+            if known.get(path) == (st.st_mtime, st.st_size):
+                continue
+            img = cv2_imread_safe(path, cv2.IMREAD_COLOR)
+            h = image_fingerprint(img)
+            if h is None:
+                continue
+            rows.append((project, path, st.st_mtime, st.st_size, _to_signed(h), image_thumbnail(img).tobytes(),
+                         *_chunks(h)))
+
+        removed = [(p,) for p in known if p not in seen]
+        placeholders = ", ".join("?" * (6 + CHUNKS))
+        with self.conn:
+            self.conn.executemany(f"INSERT OR REPLACE INTO slides (project, path, mtime, size, hash, thumb, "
+                                  f"{', '.join(f'c{i}' for i in range(CHUNKS))}) VALUES ({placeholders})", rows)
+            self.conn.executemany("DELETE FROM slides WHERE path = ?", removed)
+            self.conn.execute("INSERT OR REPLACE INTO projects (project, indexed_at) VALUES (?, ?)",
+                              (project, time.time()))
+        return len(rows), len(removed)
+
+    def index_tree(self, root, on_project=None):
+        """Note: 递归查找含 Runs/ 的项目目录并逐个增量同步"""
+        totals = [0, 0]
+        for dirpath, dirnames, _ in os.walk(root):
+            if "Runs" not in dirnames:
+                continue
+            added, removed = self.index_project(dirpath)
+            totals[0] += added
+            totals[1] += removed
+            if on_project:
+                on_project(dirpath, added, removed)
+            dirnames[:] = [d for d in dirnames if d not in ("Runs", "PDFs")]
+        return tuple(totals)
+
+    def prune(self):
+        """Note: 移除磁盘上已不存在的项目"""
+        gone = [(p,) for (p,) in self.conn.execute("SELECT project FROM projects")
+                if not os.path.isdir(p)]
+        with self.conn:
+            self.conn.executemany("DELETE FROM slides WHERE project = ?", gone)
+            self.conn.executemany("DELETE FROM projects WHERE project = ?", gone)
+        return len(gone)
+
+    # ---------------- Query ----------------
+
+    def query_hash(self, h, thumb, radius=DEFAULT_QUERY_RADIUS, limit=20):
+        """
+        thumb: 查询图的 image_thumbnail，用于确认 dHash 召回的候选
+        Returns: [(距离, 项目目录, 幻灯片路径)]，按距离升序
+        """
+        if not 0 <= radius <= MAX_QUERY_RADIUS:
+            raise ValueError(f"Query radius must be 0-{MAX_QUERY_RADIUS}, got {radius}")
+        per_chunk = radius // CHUNKS
+        hits = {}
+        for i, value in enumerate(_chunks(h)):
+            probes = [value ^ m for m in flip_masks(per_chunk, CHUNK_BITS)]
+            marks = ", ".join("?" * len(probes))
+            for project, path, stored, blob in self.conn.execute(
+                    f"SELECT project, path, hash, thumb FROM slides WHERE c{i} IN ({marks})", probes):
+                if path in hits:
+                    continue
+                d = hamming64(h, stored & ((1 << 64) - 1))
+                if d > radius:
+                    continue
+                stored_thumb = np.frombuffer(blob, dtype=np.uint8).reshape(THUMB_SIZE, THUMB_SIZE)
+                # None 占位：已确认不匹配，后续段再次召回时不必重复计算
+                hits[path] = (d, project, path) if thumb_diff(thumb, stored_thumb) < CONFIRM_MSE else None
+        hits = [hit for hit in hits.values() if hit is not None]
+        return sorted(hits)[:limit]
+
+    def query_image(self, img, radius=DEFAULT_QUERY_RADIUS, limit=20):
+        h = image_fingerprint(img)
+        return [] if h is None else self.query_hash(h, image_thumbnail(img), radius, limit)
@@ -0,0 +1,229 @@
+import os
+import shutil
+import time
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import cv2
+import numpy as np
+
+from src.core.fingerprint import SlideRegistry
+from src.core.image_algo import crop_roi, gray_thumbnail, detect_captures
+from src.core.sampler import FrameSampler, AUTO, sample_step
+from src.core.writer import OutputFormat
+from src.utils.file_ops import cv2_imwrite_safe
+
+# 主进程轮询分片状态 (取消/进度) 的间隔，分片上报进度的最小间隔 (秒)
+POLL_SEC = 0.2
+
+
+def sample_frame_index(start_frame, step, k):
+    """Note: 采样网格 —— 第 k 次采样读取的帧号 (先 grab step-1 帧，再 read 1 帧)"""
+    return start_frame + k * step + (step - 1)
+
+
+def scan_shard(video_path, roi, start_frame, step, first_k, own_from_k, own_to_k, end_sec,
+               thresh, stability, tmp_dir, cancel_event=None, sampling=AUTO, output_format=None,
+               progress=None, shard_index=0):
+    """
+    Worker: 解码单个时间分片，返回缩略图序列与候选帧。
+    Note: 分片向前多解码 stability 次采样 (first_k < own_from_k)，保证本分片内
+          任何真实捕获点的局部稳定计数与全局一致，候选帧因此可以直接复用。
+    progress: Manager 共享列表，progress[shard_index] 为本分片已处理的采样数 (至多每 POLL_SEC 秒更新一次)
+    """
+    # 局部导入避免与 extractor 形成循环依赖
+    from src.core.extractor import SlideDetector
+
+    output_format = output_format or OutputFormat()
+    cap = cv2.VideoCapture(video_path)
+    ks, positions, thumbs, candidates = [], [], [], {}
+    try:
+        if not cap.isOpened():
+            return {"ks": ks, "pos": positions, "thumbs": None, "candidates": candidates}
+
+        sampler = FrameSampler(cap, start_frame + first_k * step, strategy=sampling)
+
+        # Note: 局部检测器只看稳定计数，去重留给合并阶段做全局判定
+        detector = SlideDetector()
+        k = first_k
+        last_report = time.monotonic()
+        while own_to_k is None or k < own_to_k:
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            ret, frame = sampler.read(step)
+            if not ret: break
+
+            pos_sec = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+            if pos_sec > end_sec: break
+
+            process_frame = crop_roi(frame, roi)
+            gray_small = gray_thumbnail(process_frame)
+            detector.feed(gray_small, thresh, stability)
+            detector.last_captured_hash = None
+
+            if k >= own_from_k:
+                ks.append(k)
+                positions.append(pos_sec)
+                thumbs.append(gray_small)
+                if detector.stable_counter == stability:
+                    path = os.path.join(tmp_dir, f"cand_{k:08d}{output_format.ext}")
+                    if cv2_imwrite_safe(path, process_frame, output_format.params()):
+                        candidates[k] = path
+            k += 1
+            if progress is not None and time.monotonic() - last_report >= POLL_SEC:
+                progress[shard_index] = k - first_k
+                last_report = time.monotonic()
+    finally:
+        cap.release()
+
+    return {"ks": ks, "pos": positions,
+            "thumbs": np.stack(thumbs) if thumbs else None,
+            "candidates": candidates}
+
+
+class ShardedScan:
+    """
+    Time-Sharded Parallel Scan.
+    1. 将 [start, end] 的采样序号切成 N 段，每段在独立进程里用独立的 VideoCapture 解码；
+    2. 合并阶段按顺序重放 SlideDetector (稳定计数 + 去重)，边界处的判定与单线程完全一致；
+    3. 命中的候选帧直接改名为 slide_XXXX.jpg，未命中的 (理论上不会发生) 回退为定点解码。
+    """
+
+    def __init__(self, video_path, roi, fps, start_frame, end_frame, end_sec, params, workers, images_dir,
+                 sampling=AUTO, output_format=None, recorder=None):
+        self.video_path = video_path
+        self.roi = roi
+        self.fps = fps
+        self.start_frame = start_frame
+        self.end_sec = end_sec
+        self.thresh = params.diff_threshold
+        self.stability = params.stability_frames
+        self.global_dedup = params.global_dedup
+        self.dedup_radius = params.dedup_radius
+        self.workers = workers
+        self.images_dir = images_dir
+        self.sampling = sampling
+        self.output_format = output_format or OutputFormat()
+        self.recorder = recorder
+
+        self.step = sample_step(fps, params.check_interval)
+
+        total_samples = max(1, (end_frame - start_frame) // self.step)
+        self.total_samples = total_samples
+        self.shards = self._plan(total_samples)
+
+    @property
+    def shard_count(self):
+        return len(self.shards)
+
+    def _plan(self, total_samples):
+        """Returns: [(first_k, own_from_k, own_to_k)]，最后一段不设上限，交给 end_sec 截断"""
+        count = max(1, min(self.workers, total_samples // max(1, self.stability * 4)))
+        size = -(-total_samples // count)
+        shards = []
+        for i in range(count):
+            own_from = i * size
+            own_to = None if i == count - 1 else (i + 1) * size
+            shards.append((max(0, own_from - self.stability), own_from, own_to))
+        return shards
+
+    def run(self, cancel_event, on_progress=None):
+        """Generator: 按顺序产出 (序号, 文件路径)"""
+        tmp_dir = os.path.join(self.images_dir, ".shards")
+        os.makedirs(tmp_dir, exist_ok=True)
+        try:
+            parts = self._scan_all(cancel_event, tmp_dir, on_progress)
+            if parts is None:
+                return
+            if self.recorder is not None:
+                for part in parts:
+                    if part["thumbs"] is None:
+                        continue
+                    for k, pos_sec, gray_small in zip(part["ks"], part["pos"], part["thumbs"]):
+                        self.recorder.append(sample_frame_index(self.start_frame, self.step, k), pos_sec, gray_small)
+                self.recorder.commit()
+            yield from self._merge(parts)
+        finally:
+            if self.recorder is not None:
+                self.recorder.abort()
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _shard_samples(self, first_k, own_to):
+        return (self.total_samples if own_to is None else own_to) - first_k
+
+    def _report(self, on_progress, progress, parts):
+        """Note: 已完成的分片按实际采样数计，运行中的按共享进度计；时间按采样网格折算"""
+        done = sum(len(part["ks"]) + (own_from - first_k) if part is not None else progress[i]
+                   for i, (part, (first_k, own_from, _)) in enumerate(zip(parts, self.shards)))
+        total = sum(self._shard_samples(first_k, own_to) for first_k, _, own_to in self.shards)
+        fraction = min(1.0, done / max(1, total))
+        start_sec = self.start_frame / self.fps
+        on_progress(int(fraction * 100), start_sec + fraction * (self.end_sec - start_sec))
+
+    def _scan_all(self, cancel_event, tmp_dir, on_progress):
+        # 局部导入避免与 extractor 形成循环依赖
+        from src.core.extractor import ExtractionError
+
+        manager = multiprocessing.Manager()
+        try:
+            remote_cancel = manager.Event()
+            progress = manager.list([0] * len(self.shards))
+            parts = [None] * len(self.shards)
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(self.shards))) as pool:
+                futures = {
+                    pool.submit(scan_shard, self.video_path, self.roi, self.start_frame, self.step,
+                                first_k, own_from, own_to, self.end_sec, self.thresh, self.stability,
+                                tmp_dir, remote_cancel, self.sampling, self.output_format, progress, i): i
+                    for i, (first_k, own_from, own_to) in enumerate(self.shards)
+                }
+                # Note: 定时轮询而不是等分片完成：取消要立即转发给仍在运行的分片，进度也随扫描推进
+                pending = set(futures)
+                while pending:
+                    if cancel_event.is_set():
+                        remote_cancel.set()
+                        pool.shutdown(wait=True, cancel_futures=True)
+                        return None
+                    finished, pending = wait(pending, timeout=POLL_SEC, return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        try:
+                            parts[futures[fut]] = fut.result()
+                        except Exception as e:
+                            # 一个分片失败，其余分片没有继续解码的意义
+                            remote_cancel.set()
+                            pool.shutdown(wait=True, cancel_futures=True)
+                            raise ExtractionError(f"Shard {futures[fut] + 1} failed: {e}") from e
+                    if on_progress:
+                        self._report(on_progress, progress, parts)
+            return parts
+        finally:
+            manager.shutdown()
+
+    def _merge(self, parts):
+        """Note: 各分片的缩略图按顺序拼接后一次性向量化检测，结果与逐帧重放 SlideDetector 相同"""
+        parts = [part for part in parts if part["thumbs"] is not None and len(part["ks"])]
+        if not parts:
+            return
+        thumbs = np.concatenate([part["thumbs"] for part in parts])
+        owners = [(k, part) for part in parts for k in part["ks"]]
+
+        registry = SlideRegistry(self.dedup_radius) if self.global_dedup else None
+        for count, i in enumerate(detect_captures(thumbs, self.thresh, self.stability, registry=registry), 1):
+            k, part = owners[i]
+            path = os.path.join(self.images_dir, f"slide_{count:04d}{self.output_format.ext}")
+            cand = part["candidates"].get(k)
+            if cand and os.path.exists(cand):
+                os.replace(cand, path)
+            else:
+                self._fetch_frame(k, path)
+            yield count, path
+
+    def _fetch_frame(self, k, path):
+        """Fallback: 定点解码单帧"""
+        cap = cv2.VideoCapture(self.video_path)
+        try:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, sample_frame_index(self.start_frame, self.step, k))
+            ret, frame = cap.read()
+            if ret:
+                cv2_imwrite_safe(path, crop_roi(frame, self.roi), self.output_format.params())
+        finally:
+            cap.release()
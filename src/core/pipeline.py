@@ -0,0 +1,211 @@
+import queue
+import threading
+
+import cv2
+
+from src.core.image_algo import crop_roi, gray_thumbnail, thumb_diff
+from src.core.profiler import NULL_PROFILER
+
+_END = object()
+
+
+class FrameSample:
+    """解码阶段的产出：帧号 + 时间戳 + ROI 画面 + 分析用缩略图"""
+    __slots__ = ("frame_idx", "pos_sec", "frame", "gray_small")
+
+    def __init__(self, frame_idx, pos_sec, frame, gray_small):
+        self.frame_idx = frame_idx
+        self.pos_sec = pos_sec
+        self.frame = frame
+        self.gray_small = gray_small
+
+
+class AdaptiveStride:
+    """
+    Adaptive Sampling Interval.
+    步长始终是基础步长 (check_interval) 的 2^k 倍，采样点仍落在固定网格上：
+    - 连续 stability 次静止 (已满足捕获条件) 后，每次静止采样步长翻倍，直到 max_interval
+    - 一旦相邻采样的差异超过阈值立即回到基础步长 (由 DecodeAhead 在跨越的区间内二分回退定位变化点)
+    Note: 参数每次读取，热调节生效；adaptive_interval 关闭时等价于固定步长。
+          max_interval 决定了可能漏掉的最短画面时长，应小于最短的一页幻灯片停留时间。
+    """
+
+    def __init__(self, params, base_step_fn, fps):
+        self.params = params
+        self.base_step_fn = base_step_fn
+        self.fps = fps
+        self.factor = 1
+        self.stable = 0
+        self.prev = None
+        self.prev_idx = None
+        self.last_base = 1
+        self.last_factor = 1
+        # 统计：实际分析的采样数、二分探测次数、固定步长覆盖同一区间所需的采样数
+        self.samples = 0
+        self.probes = 0
+        self.grid_samples = 0
+
+    def _max_factor(self, base):
+        limit = max(1, int(self.params.max_interval * self.fps / base))
+        factor = 1
+        while factor * 2 <= limit:
+            factor *= 2
+        return factor
+
+    def step(self):
+        base = self.base_step_fn()
+        if not self.params.adaptive_interval:
+            self.factor = 1
+        self.factor = min(self.factor, self._max_factor(base))
+        self.last_base, self.last_factor = base, self.factor
+        return base * self.factor
+
+    def is_change(self, gray_small):
+        return self.prev is not None and thumb_diff(gray_small, self.prev) >= self.params.diff_threshold
+
+    def observe(self, sample):
+        """Note: 每个交给分析阶段的采样调用一次，与 SlideDetector 的稳态计数保持一致"""
+        self.samples += 1
+        self.grid_samples += (sample.frame_idx - self.prev_idx) // self.last_base if self.prev_idx is not None else 1
+        if self.prev is None or self.is_change(sample.gray_small):
+            self.stable = 0
+            self.factor = 1
+        else:
+            self.stable += 1
+            if self.stable >= self.params.stability_frames:
+                self.factor *= 2
+        self.prev = sample.gray_small
+        self.prev_idx = sample.frame_idx
+
+    def summary(self):
+        used = self.samples + self.probes
+        saved = 1 - used / self.grid_samples if self.grid_samples else 0.0
+        return (f"{self.samples} samples + {self.probes} bisect probes vs {self.grid_samples} "
+                f"at fixed interval ({saved:.0%} saved)")
+
+
+class DecodeAhead:
+    """
+    Decode Stage.
+    独立线程按采样网格解码、裁剪 ROI 并生成缩略图，填入有界队列；
+    分析阶段只需迭代本对象。cv2 的解码/色彩转换会释放 GIL，两阶段可真正重叠。
+
+    Note: 队列满时解码线程阻塞 (背压)；stop_event 置位或迭代方调用 close() 后
+          解码线程在下一次入队尝试时退出，不会残留。
+    """
+
+    def __init__(self, cap, sampler, step_fn, end_sec, roi, stop_event, maxsize=8, profiler=NULL_PROFILER,
+                 adaptive=None):
+        self.cap = cap
+        # Note: 传入 AdaptiveStride 时由它决定步长 (step_fn 作为基础步长)，变化点通过二分回退定位
+        self.adaptive = adaptive
+        self.profiler = profiler
+        self.sampler = sampler
+        self.step_fn = step_fn
+        self.end_sec = end_sec
+        self.roi = roi
+        self.stop_event = stop_event
+
+        self.reached_end = False
+        self.error = None
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="DecodeAhead", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _cancelled(self):
+        return self._closed.is_set() or self.stop_event.is_set()
+
+    def _put(self, item):
+        while not self._cancelled():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        try:
+            profiler = self.profiler
+            adaptive = self.adaptive
+            while not self._cancelled():
+                step = adaptive.step() if adaptive is not None else self.step_fn()
+                with profiler.stage("decode"):
+                    ret, frame = self.sampler.read(step)
+                if not ret: break
+
+                pos_sec = self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+                if pos_sec > self.end_sec:
+                    self.reached_end = True
+                    break
+
+                process_frame = crop_roi(frame, self.roi)
+                with profiler.stage("thumbnail"):
+                    gray_small = gray_thumbnail(process_frame)
+                sample = FrameSample(self.sampler.last_frame, pos_sec, process_frame, gray_small)
+                if adaptive is not None:
+                    if adaptive.last_factor > 1 and adaptive.is_change(gray_small):
+                        with profiler.stage("bisect"):
+                            sample = self._bisect(sample) or sample
+                    adaptive.observe(sample)
+                # 队列满时的阻塞时间 = 下游 (分析/预览/写盘) 跟不上解码
+                with profiler.stage("decode_blocked"):
+                    if not self._put(sample):
+                        return
+        except Exception as e:
+            self.error = e
+        finally:
+            self._put(_END)
+
+    def _bisect(self, sample):
+        """
+        Note: 大步长跨越了一次变化：在 (上一采样, 当前采样] 的网格点上二分，找到第一个与上一采样不同的点。
+        Returns: 该点的 FrameSample (当前采样本身即是时返回 None)；解码器定位不准时不做二分
+        """
+        adaptive, sampler = self.adaptive, self.sampler
+        if sampler.seek_broken:
+            return None
+        base, lo, hi = adaptive.last_base, adaptive.prev_idx, sample.frame_idx
+        found = None
+        while hi - lo > base:
+            mid = lo + (hi - lo) // base // 2 * base
+            ret, frame = sampler.read_at(mid)
+            if not ret or sampler.seek_broken:
+                found = None
+                break
+            adaptive.probes += 1
+            process_frame = crop_roi(frame, self.roi)
+            gray_small = gray_thumbnail(process_frame)
+            if adaptive.is_change(gray_small):
+                hi = mid
+                found = FrameSample(mid, self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000, process_frame, gray_small)
+            else:
+                lo = mid
+        # 之后的采样从选中点之后继续
+        resume = (found.frame_idx if found is not None else sample.frame_idx) + 1
+        if sampler.next_frame != resume:
+            sampler.seek(resume)
+        return found
+
+    def __iter__(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                if self._cancelled() or not self._thread.is_alive():
+                    if self._queue.empty():
+                        break
+                continue
+            if item is _END:
+                break
+            yield item
+        if self.error is not None:
+            raise self.error
+
+    def close(self):
+        self._closed.set()
+        self._thread.join()
@@ -0,0 +1,156 @@
+import csv
+import json
+import os
+import threading
+import time
+
+PROFILE_JSON = "profile.json"
+PROFILE_CSV = "profile.csv"
+
+# 直方图桶上界 (毫秒)，最后一桶为 "> 1000 ms"
+HIST_EDGES_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 1000)
+
+
+class _StageTimer:
+    __slots__ = ("profiler", "name", "t0")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profiler.add(self.name, time.perf_counter() - self.t0)
+
+
+class _StageStats:
+    __slots__ = ("count", "total", "min", "max", "hist")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.hist = [0] * (len(HIST_EDGES_MS) + 1)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        ms = seconds * 1000
+        for i, edge in enumerate(HIST_EDGES_MS):
+            if ms <= edge:
+                self.hist[i] += 1
+                return
+        self.hist[-1] += 1
+
+
+class StageProfiler:
+    """
+    Per-Stage Profiler.
+    各阶段 (decode / thumbnail / detect / preview / encode ...) 的累计耗时、次数、极值与耗时直方图，
+    以及计数器 (解码帧数 / 分析采样数 / 捕获数)。线程安全：解码线程、写盘线程与检测循环共用一个实例。
+    """
+    enabled = True
+
+    def __init__(self):
+        self._stages = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+        self.video_sec = 0.0
+
+    def stage(self, name):
+        """用法: with profiler.stage("decode"): ..."""
+        return _StageTimer(self, name)
+
+    def add(self, name, seconds):
+        with self._lock:
+            stats = self._stages.get(name)
+            if stats is None:
+                stats = self._stages[name] = _StageStats()
+            stats.add(seconds)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def report(self):
+        wall = time.perf_counter() - self._t0
+        with self._lock:
+            stages = {
+                name: {
+                    "count": s.count,
+                    "total_s": round(s.total, 6),
+                    "mean_ms": round(s.total / s.count * 1000, 4) if s.count else 0.0,
+                    "min_ms": round(s.min * 1000, 4) if s.count else 0.0,
+                    "max_ms": round(s.max * 1000, 4),
+                    "share": round(s.total / wall, 4) if wall else 0.0,
+                    "hist": s.hist,
+                }
+                for name, s in sorted(self._stages.items(), key=lambda kv: -kv[1].total)
+            }
+            counters = dict(self._counters)
+        return {
+            "wall_s": round(wall, 4),
+            "video_s": round(self.video_sec, 3),
+            "realtime_factor": round(self.video_sec / wall, 3) if wall else 0.0,
+            "counters": counters,
+            "hist_edges_ms": list(HIST_EDGES_MS),
+            "stages": stages,
+        }
+
+    def summary(self):
+        rep = self.report()
+        top = ", ".join(f"{name} {s['total_s']:.2f}s" for name, s in list(rep["stages"].items())[:4])
+        counters = ", ".join(f"{k} {v}" for k, v in rep["counters"].items())
+        return f"{rep['realtime_factor']:.1f}x realtime | {top} | {counters}"
+
+    def write(self, directory):
+        """Note: 写出 profile.json (完整报告) 与 profile.csv (每阶段一行)；Returns: json 路径"""
+        rep = self.report()
+        json_path = os.path.join(directory, PROFILE_JSON)
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(rep, f, indent=2)
+
+        edges = [f"le_{e}ms" for e in HIST_EDGES_MS] + [f"gt_{HIST_EDGES_MS[-1]}ms"]
+        with open(os.path.join(directory, PROFILE_CSV), "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(["stage", "count", "total_s", "mean_ms", "min_ms", "max_ms", "share"] + edges)
+            for name, s in rep["stages"].items():
+                w.writerow([name, s["count"], s["total_s"], s["mean_ms"], s["min_ms"], s["max_ms"], s["share"]]
+                           + s["hist"])
+        return json_path
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class NullProfiler:
+    """关闭状态的空实现：所有调用都是无操作，热路径上的开销只有一次方法调用"""
+    enabled = False
+    video_sec = 0.0
+    _timer = _NullTimer()
+
+    def stage(self, name):
+        return self._timer
+
+    def add(self, name, seconds):
+        pass
+
+    def count(self, name, n=1):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
@@ -0,0 +1,258 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import cv2
+import numpy as np
+
+from src.core.feature_cache import FeatureCache, FeatureSeries, DEFAULT_MAX_BYTES, THUMB_SIZE, video_fingerprint
+from src.core.image_algo import crop_roi, gray_thumbnail
+from src.core.sampler import FrameSampler, AUTO, sample_step
+
+PROXY_FILE = "proxy.avi"
+PROXY_WIDTH = 640
+# 代理以默认 check_interval 的采样步长为周期，每个周期再均分为 PROXY_SUBDIV 份 (约 0.1 秒一帧)：
+# 周期末帧正是默认网格上的采样点 (默认参数下与原片扫描完全一致)，其他间隔/起点就近取帧，偏差不超过半个细网格
+PROXY_INTERVAL = 0.5
+PROXY_SUBDIV = 5
+PROXY_QUALITY = 85
+
+
+def proxy_step(fps):
+    """Returns: 代理的周期 (原片帧数，即 check_interval=0.5 的采样步长)"""
+    return sample_step(fps, PROXY_INTERVAL)
+
+
+def proxy_offsets(every):
+    """Returns: 每个周期内保留的帧相对周期起点的偏移，末项为 every - 1 (默认网格上的采样点)"""
+    n = max(1, min(PROXY_SUBDIV, every))
+    return [(j + 1) * every // n - 1 for j in range(n)]
+
+
+def proxy_gap(every):
+    """Returns: 相邻代理帧的最大间隔 (原片帧数)"""
+    offsets = proxy_offsets(every)
+    return max(b - a for a, b in zip([offsets[-1] - every] + offsets, offsets))
+
+
+def proxy_key(fingerprint, every):
+    spec = {"proxy": fingerprint, "every": every, "offsets": proxy_offsets(every), "width": PROXY_WIDTH,
+            "quality": PROXY_QUALITY}
+    return "px-" + hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:21]
+
+
+class VideoProxy:
+    """
+    Low-Resolution Proxy.
+    原片每 every 帧 (一个周期) 取 proxy_offsets(every) 处的几帧，缩放到 PROXY_WIDTH 宽并以 MJPEG (全部为关键帧)
+    写入 AVI，任意定位都只解码一帧小图。ROI 选择、剪辑器拖动与检测扫描都在代理上完成，只有最终捕获回到原片解码。
+    """
+
+    def __init__(self, path, meta):
+        self.path = os.path.join(path, PROXY_FILE)
+        self.fps = meta["fps"]
+        self.every = meta["every"]
+        self.offsets = meta["offsets"]
+        self.scale = meta["scale"]
+        self.frames = meta["frames"]
+        self.source_frames = meta["source_frames"]
+        self.gap = proxy_gap(self.every)
+        # 每帧代理对应的原片帧号 (严格递增)
+        n = len(self.offsets)
+        p = np.arange(self.frames)
+        self.sources = (p // n) * self.every + np.asarray(self.offsets, np.int64)[p % n]
+
+    def source_index(self, p):
+        return int(self.sources[p])
+
+    def proxy_index(self, source_idx):
+        """Returns: 与原片帧号最接近的代理帧序号 (数组输入时逐个换算)"""
+        hi = np.clip(np.searchsorted(self.sources, source_idx), 0, self.frames - 1)
+        lo = np.maximum(hi - 1, 0)
+        p = np.where(np.abs(source_idx - self.sources[lo]) <= np.abs(self.sources[hi] - source_idx), lo, hi)
+        return int(p) if np.ndim(p) == 0 else p
+
+    def to_proxy_roi(self, roi):
+        if not roi:
+            return roi
+        return tuple(int(round(v * self.scale)) for v in roi)
+
+    def to_source_roi(self, roi):
+        if not roi:
+            return roi
+        return tuple(int(round(v / self.scale)) for v in roi)
+
+    def open(self):
+        return cv2.VideoCapture(self.path)
+
+    def read(self, cap, source_idx):
+        """Returns: 最接近 source_idx 的代理帧 (BGR)，失败时 None"""
+        cap.set(cv2.CAP_PROP_POS_FRAMES, self.proxy_index(source_idx))
+        ret, frame = cap.read()
+        return frame if ret else None
+
+    @classmethod
+    def load(cls, path):
+        """Returns: VideoProxy，不存在或不完整时返回 None"""
+        try:
+            with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            proxy = cls(path, meta)
+        except (OSError, ValueError, KeyError):
+            return None
+        if not os.path.exists(proxy.path):
+            return None
+        meta["last_access"] = time.time()
+        try:
+            with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+        except OSError:
+            pass
+        return proxy
+
+    def features(self, roi, start_frame, step, end_sec, stop_event=None, on_progress=None, on_log=None):
+        """
+        Note: 在代理上按 (原片) 采样网格扫描缩略图，每个采样点取最接近的代理帧 (相差不超过半个细网格)，
+        帧号/时间记为该代理帧对应的原片帧，结果可直接交给缓存重放路径。默认网格上的采样点恰好都是代理帧。
+        Returns: FeatureSeries；被取消、或采样步长比代理帧间隔还细时返回 None (调用方回退到原片扫描)
+        """
+        if step < self.gap:
+            if on_log:
+                on_log(f"Sampling step {step} is finer than the proxy ({self.gap} frames).")
+            return None
+        wanted = np.arange(start_frame + step - 1, int(end_sec * self.fps) + 1, step)
+        picks = self.proxy_index(wanted) if len(wanted) else np.zeros(0, np.int64)
+        # 超出代理末尾的采样点不算命中；相邻采样点落在同一代理帧时只取一次
+        picks = picks[np.abs(self.sources[picks] - wanted) * 2 <= self.gap]
+        picks = picks[np.concatenate(([True], np.diff(picks) > 0))] if len(picks) else picks
+
+        roi = self.to_proxy_roi(roi)
+        cap = self.open()
+        frames, times, thumbs = [], [], []
+        try:
+            sampler = FrameSampler(cap, int(picks[0]) if len(picks) else 0, strategy=AUTO)
+            prev = int(picks[0]) - 1 if len(picks) else 0
+            for p in picks:
+                if stop_event is not None and stop_event.is_set():
+                    return None
+                ret, frame = sampler.read(int(p) - prev)
+                if not ret:
+                    break
+                prev = int(p)
+                idx = self.source_index(p)
+                pos_sec = idx / self.fps
+                if pos_sec > end_sec:
+                    break
+                frames.append(idx)
+                times.append(pos_sec)
+                thumbs.append(gray_thumbnail(crop_roi(frame, roi)))
+                if on_progress:
+                    on_progress(pos_sec)
+        finally:
+            cap.release()
+        return FeatureSeries(np.stack(thumbs) if thumbs else np.zeros((0, THUMB_SIZE, THUMB_SIZE), np.uint8),
+                             np.asarray(frames, np.int64), np.asarray(times, np.float64))
+
+
+def _locate(video_path, cache_dir):
+    """Returns: (cache, 条目路径)"""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            return None, None
+        every = proxy_step(cap.get(cv2.CAP_PROP_FPS) or 25.0)
+    finally:
+        cap.release()
+    cache = FeatureCache(cache_dir)
+    return cache, os.path.join(cache.root, proxy_key(video_fingerprint(video_path), every))
+
+
+def find_proxy(video_path, cache_dir=None):
+    """Returns: 已生成的 VideoProxy，没有时返回 None (不解码)"""
+    try:
+        _, path = _locate(video_path, cache_dir)
+    except OSError:
+        return None
+    return VideoProxy.load(path) if path else None
+
+
+def build_proxy(video_path, cache_dir=None, cache_max_bytes=DEFAULT_MAX_BYTES, stop_event=None,
+                on_progress=None, on_log=None):
+    """
+    Note: 解码原片一遍生成代理 (已存在时直接返回)，与特征缓存放在同一目录并参与 LRU 淘汰。
+    Returns: VideoProxy，被取消或失败时返回 None
+    """
+    log = on_log or (lambda text: None)
+    try:
+        cache, path = _locate(video_path, cache_dir)
+    except OSError as e:
+        log(f"Proxy Error: {e}")
+        return None
+    if path is None:
+        return None
+    proxy = VideoProxy.load(path)
+    if proxy is not None:
+        return proxy
+
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    source_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    every = proxy_step(fps)
+    offsets = proxy_offsets(every)
+    tmp = path + f".tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    writer = None
+    count, scale, completed = 0, 1.0, False
+    log(f"Building proxy ({PROXY_WIDTH}px, {len(offsets)} frames every {every})...")
+    try:
+        sampler = FrameSampler(cap, 0, strategy=AUTO)
+        prev = -1
+        while True:
+            if stop_event is not None and stop_event.is_set():
+                break
+            target = (count // len(offsets)) * every + offsets[count % len(offsets)]
+            ret, frame = sampler.read(target - prev)
+            prev = target
+            if not ret:
+                completed = True
+                break
+            if writer is None:
+                h, w = frame.shape[:2]
+                scale = min(1.0, PROXY_WIDTH / w)
+                size = (max(2, int(w * scale) // 2 * 2), max(2, int(h * scale) // 2 * 2))
+                writer = cv2.VideoWriter(os.path.join(tmp, PROXY_FILE), cv2.VideoWriter_fourcc(*"MJPG"),
+                                         fps * len(offsets) / every, size)
+                writer.set(cv2.VIDEOWRITER_PROP_QUALITY, PROXY_QUALITY)
+            writer.write(cv2.resize(frame, size, interpolation=cv2.INTER_AREA))
+            count += 1
+            if on_progress and count % 50 == 0:
+                on_progress(min(100, int(sampler.last_frame * 100 / max(source_frames, 1))))
+    finally:
+        cap.release()
+        if writer is not None:
+            writer.release()
+
+    if not completed or count == 0:
+        shutil.rmtree(tmp, ignore_errors=True)
+        return None
+
+    nbytes = os.path.getsize(os.path.join(tmp, PROXY_FILE))
+    meta = {"video": os.path.abspath(video_path), "kind": "proxy", "fps": fps, "every": every, "offsets": offsets,
+            "scale": scale, "frames": count, "source_frames": source_frames, "nbytes": nbytes,
+            "created": time.time(), "last_access": time.time()}
+    try:
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)
+        FeatureCache(cache.root, cache_max_bytes).evict(keep=os.path.basename(path))
+    except OSError as e:
+        shutil.rmtree(tmp, ignore_errors=True)
+        log(f"Proxy Error: {e}")
+        return None
+    log(f"Proxy ready: {count} frames, {nbytes / 1024 ** 2:.1f} MB")
+    return VideoProxy.load(path)
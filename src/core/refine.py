@@ -0,0 +1,213 @@
+import json
+import os
+from collections import deque
+
+import cv2
+
+from src.core.image_algo import crop_roi, get_blur_score, gray_thumbnail, thumb_diff
+
+SLIDES_JSON = "slides.json"
+# 稳定窗口内额外解码、参与清晰度比较的候选帧数
+REFINE_CANDIDATES = 3
+# 最清晰帧选择：捕获前保留的最近采样数 (环形缓冲)；缓存重放时每页最多解码的候选采样数
+SHARPEST_RING = 8
+
+
+class RefinedSlide:
+    """定位结果：切换发生的帧号 + 最清晰的候选帧 (ROI 裁剪后)"""
+    __slots__ = ("frame", "frame_idx", "transition_idx", "sharpness")
+
+    def __init__(self, frame, frame_idx, transition_idx, sharpness):
+        self.frame = frame
+        self.frame_idx = frame_idx
+        self.transition_idx = transition_idx
+        self.sharpness = sharpness
+
+
+class TransitionRefiner:
+    """
+    Transition Localisation.
+    捕获发生在稳定计数达标的采样上，距真正的切换可能已过去数秒。对每次捕获：
+    1. 在 (切换前最后一个采样, 新画面第一个采样] 之间按帧二分，找到第一帧与捕获画面差异低于阈值的帧 -> 精确切换时间
+    2. 在 [切换帧, 捕获帧] 内再取少量候选帧，按 get_blur_score 选出最清晰的一帧作为输出
+
+    Note: 使用独立的 VideoCapture，不与解码线程共享；每页只多 log2(步长) + REFINE_CANDIDATES 次定位解码。
+    """
+
+    def __init__(self, video_path, roi=None):
+        self.roi = roi
+        self.decodes = 0
+        self._cap = cv2.VideoCapture(video_path)
+
+    def _read(self, frame_idx):
+        """Returns: (ROI 画面, 缩略图)，解码失败时 (None, None)"""
+        self._cap.set(cv2.CAP_PROP_POS_FRAMES, int(frame_idx))
+        ret, frame = self._cap.read()
+        self.decodes += 1
+        if not ret:
+            return None, None
+        process_frame = crop_roi(frame, self.roi)
+        return process_frame, gray_thumbnail(process_frame)
+
+    def refine(self, before_idx, start_idx, capture_idx, capture_frame, capture_thumb, thresh):
+        """
+        before_idx: 切换前最后一个采样的帧号 (视频/扫描起点处没有时为 None)
+        start_idx: 新画面第一个采样的帧号；capture_idx/capture_frame/capture_thumb: 被捕获的采样
+        Returns: RefinedSlide
+        """
+        candidates = [(capture_idx, capture_frame)]
+        lo, hi = before_idx, start_idx
+        if lo is not None:
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                frame, thumb = self._read(mid)
+                if frame is None:
+                    break
+                if thumb_diff(thumb, capture_thumb) < thresh:
+                    hi = mid
+                    candidates.append((mid, frame))
+                else:
+                    lo = mid
+
+        # 稳定窗口内均匀取候选帧 (已解码过的帧不再重复)
+        span = capture_idx - hi
+        seen = {idx for idx, _ in candidates}
+        for k in range(REFINE_CANDIDATES):
+            idx = hi + span * k // REFINE_CANDIDATES
+            if idx in seen:
+                continue
+            seen.add(idx)
+            frame, thumb = self._read(idx)
+            if frame is not None and thumb_diff(thumb, capture_thumb) < thresh:
+                candidates.append((idx, frame))
+
+        best_idx, best_frame = capture_idx, capture_frame
+        best_score = get_blur_score(capture_frame)
+        for idx, frame in candidates[1:]:
+            score = get_blur_score(frame)
+            if score > best_score:
+                best_idx, best_frame, best_score = idx, frame, score
+        return RefinedSlide(best_frame, best_idx, hi, best_score)
+
+    def close(self):
+        self._cap.release()
+
+
+class PendingSlide:
+    """已判定为新幻灯片、等待稳定窗口结束再输出的一页；payload 由调用方携带 (文件名、时间信息等)"""
+    __slots__ = ("frame", "frame_idx", "pos_sec", "sharpness", "thumb", "thresh", "payload", "seen")
+
+    def __init__(self, frame, frame_idx, pos_sec, sharpness, thumb, thresh, payload, seen=0):
+        self.frame = frame
+        self.frame_idx = frame_idx
+        self.pos_sec = pos_sec
+        self.sharpness = sharpness
+        self.thumb = thumb
+        self.thresh = thresh
+        self.payload = payload
+        # 捕获后已看过的静止采样数
+        self.seen = seen
+
+    def offer(self, frame, frame_idx, pos_sec, sharpness):
+        if sharpness > self.sharpness:
+            self.frame, self.frame_idx, self.pos_sec, self.sharpness = frame, frame_idx, pos_sec, sharpness
+
+
+class SharpestPicker:
+    """
+    Sharpest-frame Selection.
+    在稳定窗口 (同一画面连续静止的采样) 内按 get_blur_score 挑选最清晰的一帧输出，只使用解码阶段已有的采样，不额外解码。
+    - 捕获前：环形缓冲保存当前稳定段最近 SHARPEST_RING 个采样，捕获时才计算清晰度
+    - 捕获后：只保留目前最好的一帧，再看至多 SHARPEST_RING 个静止采样，或出现变化的采样 (窗口结束) 时交给调用方输出
+    候选帧必须与捕获画面的缩略图差异低于阈值，缓慢渐变的画面不会选到变化前的帧。
+    候选集只由采样序列决定 (与检查点时机无关)，缓存重放按同样的规则定位解码，结果一致。
+    """
+
+    def __init__(self, ring=SHARPEST_RING):
+        self.scored = 0
+        self.ring = ring
+        self._ring = deque(maxlen=ring)
+        self._pending = None
+
+    @property
+    def has_pending(self):
+        return self._pending is not None
+
+    def _score(self, frame):
+        self.scored += 1
+        return get_blur_score(frame)
+
+    def push(self, sample, is_static):
+        """Returns: 本采样结束了上一个稳定窗口时，返回其 PendingSlide，否则 None"""
+        done = None
+        if not is_static:
+            done, self._pending = self._pending, None
+            self._ring.clear()
+        p = self._pending
+        if p is None:
+            self._ring.append(sample)
+            return done
+        if thumb_diff(sample.gray_small, p.thumb) < p.thresh:
+            p.offer(sample.frame, sample.frame_idx, sample.pos_sec, self._score(sample.frame))
+        p.seen += 1
+        if p.seen >= self.ring:
+            done, self._pending = p, None
+        return done
+
+    def capture(self, sample, frame, frame_idx, pos_sec, thresh, payload):
+        """
+        Note: frame/frame_idx/pos_sec 为初始候选 (捕获采样本身，或 TransitionRefiner 的结果)。
+        """
+        p = PendingSlide(frame, frame_idx, pos_sec, self._score(frame), sample.gray_small, thresh, payload)
+        for s in self._ring:
+            if s.frame_idx != frame_idx and thumb_diff(s.gray_small, p.thumb) < thresh:
+                p.offer(s.frame, s.frame_idx, s.pos_sec, self._score(s.frame))
+        self._ring.clear()
+        self._pending = p
+
+    def finish(self):
+        """Returns: 尚未输出的 PendingSlide (扫描结束/暂停时调用)，没有时返回 None"""
+        done, self._pending = self._pending, None
+        return done
+
+    def state(self):
+        """Returns: 写入检查点的状态 (环形缓冲与待定页只记帧号，画面续跑时重新解码)"""
+        p = self._pending
+        pending = None
+        if p is not None:
+            filename, slide = p.payload
+            pending = {"frame": p.frame_idx, "time": p.pos_sec, "sharpness": float(p.sharpness),
+                       "thresh": p.thresh, "seen": p.seen, "file": filename, "slide": slide}
+        return {"ring": [[s.frame_idx, s.pos_sec] for s in self._ring], "pending": pending}
+
+    def restore(self, state, load, thumb):
+        """
+        Note: 从检查点恢复。load(frame_idx, pos_sec) 定位解码并返回 FrameSample (失败返回 None)；
+        thumb 为待定页捕获画面的缩略图 (即检测器的 last_captured_hash)。
+        Returns: 是否全部恢复成功 (失败时保持原状)
+        """
+        ring = [load(frame_idx, pos_sec) for frame_idx, pos_sec in state.get("ring", [])]
+        if any(s is None for s in ring):
+            return False
+        pending = None
+        p = state.get("pending")
+        if p is not None:
+            sample = load(p["frame"], p["time"])
+            if sample is None:
+                return False
+            pending = PendingSlide(sample.frame, p["frame"], p["time"], p["sharpness"], thumb, p["thresh"],
+                                   (p["file"], p["slide"]), p["seen"])
+        self._ring.clear()
+        self._ring.extend(ring)
+        self._pending = pending
+        return True
+
+
+def write_slides_json(project_dir, slides):
+    """Note: 每页幻灯片的文件名、切换时间、输出帧时间与清晰度；Returns: 文件路径"""
+    path = os.path.join(project_dir, SLIDES_JSON)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"slides": slides}, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+    return path
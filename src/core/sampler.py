@@ -0,0 +1,153 @@
+import time
+
+import cv2
+
+GRAB = "grab"
+SEEK = "seek"
+AUTO = "auto"
+STRATEGIES = (AUTO, GRAB, SEEK)
+
+# Note: OpenCV 的 seek 会回退到前一个关键帧再逐帧解码到目标帧，
+# 步长小于一个 GOP 时必然比顺序 grab 更慢，因此只在大步长时参与竞争。
+SEEK_MIN_STRIDE = 24
+
+
+def sample_step(fps, interval):
+    """
+    Note: 所有扫描路径 (单进程/分片并行/时间轴/代理) 共用的采样网格：跳过 int(fps * interval) 帧 (至少 1 帧) 后读取 1 帧。
+    Returns: 每次采样前进的帧数
+    """
+    return max(1, int(fps * interval)) + 1
+
+
+class FrameSampler:
+    """
+    Grid Frame Sampler.
+    按固定网格读取帧：第 n 次 read(step) 返回帧号 next_frame + step - 1 的画面。
+
+    strategy:
+        grab -- 顺序 grab() 跳帧 (每一帧都会被解复用+解码)
+        seek -- 直接定位到目标帧 (解码量取决于关键帧间隔)
+        auto -- 先各试 probe_samples 次并计时，取每次采样更快的一种；
+                每种步长单独测量并记住结果 (热调节 check_interval / 自适应步长在几种步长间切换)
+    任何一次 seek 落点不准都会永久退回 grab 模式，保证与顺序读取的结果一致。
+    """
+
+    def __init__(self, cap, start_frame=0, strategy=AUTO, probe_samples=3, on_log=None):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown sampling strategy '{strategy}'")
+        self.cap = cap
+        self.strategy = strategy
+        self.probe_samples = probe_samples
+        self.on_log = on_log
+
+        self.next_frame = start_frame
+        if start_frame > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+
+        self.seek_broken = False
+        # 每种步长各自的测量结果与选择: step -> {mode: [n, t]} / step -> mode
+        self._probes = {}
+        self._choices = {}
+        # 统计：各模式的采样次数与耗时 (秒)
+        self.stats = {GRAB: [0, 0.0], SEEK: [0, 0.0]}
+        # 实际解码的帧数 (grab 模式每次采样解码 step 帧，seek 模式只计目标帧)
+        self.frames_decoded = 0
+
+    @property
+    def last_frame(self):
+        """最近一次 read() 返回的帧号"""
+        return self.next_frame - 1
+
+    def read(self, step):
+        """Returns: (ret, frame)"""
+        step = max(1, int(step))
+        target = self.next_frame + step - 1
+        mode = self._pick_mode(step)
+
+        t0 = time.perf_counter()
+        if mode == SEEK:
+            ret, frame = self._read_seek(target)
+        else:
+            ret, frame = self._read_grab(step)
+        cost = time.perf_counter() - t0
+
+        self.next_frame = target + 1
+        self.frames_decoded += 1 if mode == SEEK else step
+        self.stats[mode][0] += 1
+        self.stats[mode][1] += cost
+        if self.strategy == AUTO and step in self._probes and step not in self._choices:
+            self._probes[step][mode][0] += 1
+            self._probes[step][mode][1] += cost
+        return ret, frame
+
+    def seek(self, frame_idx):
+        """Note: 重新定位网格起点，下一次 read(step) 返回帧号 frame_idx + step - 1"""
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+        self.next_frame = frame_idx
+
+    def read_at(self, frame_idx):
+        """Note: 定位读取单帧 (自适应采样回退二分用)，之后的 read() 从其后继续；Returns: (ret, frame)"""
+        t0 = time.perf_counter()
+        ret, frame = self._read_seek(frame_idx)
+        self.next_frame = frame_idx + 1
+        self.frames_decoded += 1
+        self.stats[SEEK][0] += 1
+        self.stats[SEEK][1] += time.perf_counter() - t0
+        return ret, frame
+
+    def _read_grab(self, step):
+        for _ in range(step - 1):
+            self.cap.grab()
+        return self.cap.read()
+
+    def _read_seek(self, target):
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+        ret, frame = self.cap.read()
+        if not ret:
+            return ret, frame
+
+        actual = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES)) - 1
+        if actual != target:
+            self.seek_broken = True
+            self._log(f"Seek inaccurate (wanted frame {target}, got {actual}), falling back to grab.")
+            # Fix: 落点偏前时顺序补读到目标帧；偏后无法回退，只能接受这一次偏差
+            while actual < target:
+                ret, frame = self.cap.read()
+                if not ret: break
+                actual += 1
+        return ret, frame
+
+    def _pick_mode(self, step):
+        if self.strategy == GRAB or self.seek_broken or step == 1:
+            return GRAB
+        if self.strategy == SEEK:
+            return SEEK
+        if step < SEEK_MIN_STRIDE:
+            return GRAB
+
+        choice = self._choices.get(step)
+        if choice is not None:
+            return choice
+        probe = self._probes.setdefault(step, {GRAB: [0, 0.0], SEEK: [0, 0.0]})
+        for mode in (GRAB, SEEK):
+            if probe[mode][0] < self.probe_samples:
+                return mode
+        g_n, g_t = probe[GRAB]
+        s_n, s_t = probe[SEEK]
+        choice = self._choices[step] = SEEK if s_t / s_n < g_t / g_n else GRAB
+        self._log(f"Sampling strategy: {choice} at stride {step} "
+                  f"(grab {g_t / g_n * 1000:.1f} ms vs seek {s_t / s_n * 1000:.1f} ms per sample)")
+        return choice
+
+    def summary(self):
+        parts = []
+        for mode in (GRAB, SEEK):
+            n, t = self.stats[mode]
+            if n:
+                parts.append(f"{mode}: {n} samples / {t:.2f}s")
+        return ", ".join(parts) or "no samples"
+
+    def _log(self, text):
+        if self.on_log:
+            self.on_log(text)
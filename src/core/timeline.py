@@ -0,0 +1,224 @@
+import hashlib
+import json
+import math
+import os
+import shutil
+import time
+
+import cv2
+import numpy as np
+
+from src.core.feature_cache import FeatureCache, DEFAULT_MAX_BYTES, THUMB_VERSION, feature_key, video_fingerprint
+from src.core.image_algo import frame_diff_series, gray_thumbnail
+from src.core.sampler import FrameSampler, AUTO, sample_step
+
+# Note: 与默认 check_interval 相同，全片扫描的缩略图序列可直接作为 (无 ROI、全片范围) 抽取的特征缓存
+TIMELINE_INTERVAL = 0.5
+# 胶片条最多保留的缩略图数量与尺寸 (BGR)
+STRIP_MAX = 600
+STRIP_SIZE = (96, 54)
+
+
+def timeline_key(fingerprint, step):
+    spec = {"timeline": fingerprint, "step": step, "strip": [STRIP_MAX, *STRIP_SIZE], "thumb_version": THUMB_VERSION}
+    return "tl-" + hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:21]
+
+
+class VideoTimeline:
+    """
+    Visual Activity Timeline.
+    activity[s]: 第 s 秒内相邻采样的最大 MSE (与 get_frame_diff 同一度量)，静止的幻灯片接近 0
+    strip: (M, h, w, 3) 低分辨率胶片条缩略图，strip_times 为对应时间 (秒)
+    """
+
+    def __init__(self, fps, duration, activity, strip, strip_times):
+        self.fps = fps
+        self.duration = duration
+        self.activity = activity
+        self.strip = strip
+        self.strip_times = strip_times
+
+    def strip_at(self, sec):
+        """Returns: 最接近 sec 的胶片条缩略图，没有时返回 None"""
+        if not len(self.strip_times):
+            return None
+        i = int(np.searchsorted(self.strip_times, sec))
+        if i > 0 and (i == len(self.strip_times) or sec - self.strip_times[i - 1] < self.strip_times[i] - sec):
+            i -= 1
+        return self.strip[i]
+
+    def save(self, path, meta):
+        tmp = path + f".tmp-{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        np.save(os.path.join(tmp, "activity.npy"), self.activity)
+        np.save(os.path.join(tmp, "strip.npy"), self.strip)
+        np.save(os.path.join(tmp, "strip_times.npy"), self.strip_times)
+        meta = dict(meta, fps=self.fps, duration=self.duration, created=time.time(), last_access=time.time())
+        meta["nbytes"] = self.activity.nbytes + self.strip.nbytes + self.strip_times.nbytes + 1024
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """Returns: VideoTimeline，不存在或损坏时返回 None"""
+        try:
+            with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            timeline = cls(meta["fps"], meta["duration"], np.load(os.path.join(path, "activity.npy")),
+                           np.load(os.path.join(path, "strip.npy")), np.load(os.path.join(path, "strip_times.npy")))
+        except (OSError, ValueError, KeyError):
+            return None
+        meta["last_access"] = time.time()
+        try:
+            with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+        except OSError:
+            pass
+        return timeline
+
+
+def _activity_per_second(thumbs, pos_sec, duration):
+    diffs = frame_diff_series(thumbs)
+    if len(diffs):
+        diffs[0] = 0.0
+    activity = np.zeros(max(1, int(math.ceil(duration))), np.float32)
+    secs = np.clip(pos_sec.astype(np.int64), 0, len(activity) - 1)
+    np.maximum.at(activity, secs, diffs.astype(np.float32))
+    return activity
+
+
+def cached_timeline(video_path, cache_dir=None):
+    """Returns: 已缓存的 VideoTimeline (只查缓存，不解码)，没有时返回 None"""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            return None
+        step = sample_step(cap.get(cv2.CAP_PROP_FPS) or 25.0, TIMELINE_INTERVAL)
+    finally:
+        cap.release()
+    try:
+        cache = FeatureCache(cache_dir)
+        return VideoTimeline.load(os.path.join(cache.root, timeline_key(video_fingerprint(video_path), step)))
+    except OSError:
+        return None
+
+
+def build_timeline(video_path, use_cache=True, cache_dir=None, cache_max_bytes=DEFAULT_MAX_BYTES,
+                   stop_event=None, on_progress=None, on_log=None):
+    """
+    Note: 全片按 TIMELINE_INTERVAL 采样一次，生成活动曲线与胶片条，并按视频指纹缓存到磁盘。
+    与特征缓存双向共享：已有同网格的特征缓存时只需稀疏解码胶片条；
+    否则全片扫描的缩略图会顺带写入特征缓存，之后的全片抽取可直接重放。
+    Returns: VideoTimeline，被取消或视频无法打开时返回 None
+    """
+    log = on_log or (lambda text: None)
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        return None
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        duration = float(cap.get(cv2.CAP_PROP_FRAME_COUNT)) / fps
+        step = sample_step(fps, TIMELINE_INTERVAL)
+        strip_every = max(1, math.ceil(frame_count / step / STRIP_MAX))
+
+        cache = fkey = tl_path = None
+        if use_cache:
+            try:
+                cache = FeatureCache(cache_dir, cache_max_bytes)
+                fingerprint = video_fingerprint(video_path)
+                fkey = feature_key(fingerprint, None, 0, step, duration)
+                tl_path = os.path.join(cache.root, timeline_key(fingerprint, step))
+            except OSError as e:
+                log(f"Feature cache disabled: {e}")
+                cache = None
+        if tl_path:
+            timeline = VideoTimeline.load(tl_path)
+            if timeline is not None:
+                return timeline
+
+        entry = cache.lookup(fkey) if cache is not None else None
+        if entry is not None and len(entry):
+            log(f"Timeline: reusing {len(entry)} cached samples")
+            thumbs, pos_sec = np.asarray(entry.thumbs), entry.pos_sec
+            strip, strip_times = [], []
+            for k in range(0, len(entry), strip_every):
+                if stop_event is not None and stop_event.is_set():
+                    return None
+                cap.set(cv2.CAP_PROP_POS_FRAMES, int(entry.frame_idx[k]))
+                ret, frame = cap.read()
+                if ret:
+                    strip.append(cv2.resize(frame, STRIP_SIZE, interpolation=cv2.INTER_AREA))
+                    strip_times.append(float(pos_sec[k]))
+                if on_progress:
+                    on_progress(min(100, int(k * 100 / len(entry))))
+        else:
+            thumbs, pos_sec, strip, strip_times = _scan(cap, fps, step, duration, strip_every, cache, fkey,
+                                                        video_path, stop_event, on_progress)
+            if thumbs is None:
+                return None
+
+        timeline = VideoTimeline(
+            fps, duration, _activity_per_second(thumbs, pos_sec, duration),
+            np.stack(strip) if strip else np.zeros((0, STRIP_SIZE[1], STRIP_SIZE[0], 3), np.uint8),
+            np.asarray(strip_times, np.float64))
+    finally:
+        cap.release()
+
+    if tl_path:
+        try:
+            timeline.save(tl_path, {"video": os.path.abspath(video_path), "kind": "timeline"})
+            cache.evict(keep=os.path.basename(tl_path))
+        except OSError as e:
+            log(f"Timeline cache write failed: {e}")
+    return timeline
+
+
+def _scan(cap, fps, step, duration, strip_every, cache, fkey, video_path, stop_event, on_progress):
+    """Returns: (thumbs, pos_sec, strip, strip_times)，被取消时 thumbs 为 None"""
+    recorder = None
+    if cache is not None:
+        recorder = cache.recorder(fkey, {"video": os.path.abspath(video_path), "roi": None,
+                                         "interval": TIMELINE_INTERVAL})
+    sampler = FrameSampler(cap, 0, strategy=AUTO)
+    thumbs, positions, strip, strip_times = [], [], [], []
+    completed = False
+    try:
+        while True:
+            if stop_event is not None and stop_event.is_set():
+                return None, None, None, None
+            ret, frame = sampler.read(step)
+            if not ret:
+                completed = True
+                break
+            pos = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+            if pos > duration:
+                completed = True
+                break
+
+            # Note: 与抽取引擎的解码阶段完全一致 (无 ROI)，记录的缩略图可被抽取直接重放
+            gray_small = gray_thumbnail(frame)
+            if recorder is not None:
+                recorder.append(sampler.last_frame, pos, gray_small)
+            if len(thumbs) % strip_every == 0:
+                strip.append(cv2.resize(frame, STRIP_SIZE, interpolation=cv2.INTER_AREA))
+                strip_times.append(pos)
+            thumbs.append(gray_small)
+            positions.append(pos)
+            if on_progress and len(thumbs) % 50 == 0:
+                on_progress(min(100, int(pos * 100 / max(duration, 1))))
+    finally:
+        if recorder is not None:
+            if completed:
+                try:
+                    recorder.commit()
+                except OSError:
+                    recorder.abort()
+            else:
+                recorder.abort()
+
+    thumbs = np.stack(thumbs) if thumbs else np.zeros((0, 64, 64), np.uint8)
+    return thumbs, np.asarray(positions, np.float64), strip, strip_times
@@ -0,0 +1,157 @@
+import queue
+import threading
+from dataclasses import dataclass
+
+import cv2
+
+from src.core.profiler import NULL_PROFILER
+from src.utils.file_ops import cv2_imwrite_safe
+
+# 未指定质量时 WebP 的有损质量
+WEBP_DEFAULT_QUALITY = 90
+
+
+@dataclass
+class OutputFormat:
+    """
+    Slide Output Format.
+    fmt: jpg / png / webp
+    quality: JPEG / WebP 质量 (1-100)，None 表示默认值 (JPEG 为编码器默认 95，WebP 为 WEBP_DEFAULT_QUALITY)
+    compression: PNG 压缩等级 (0-9)，越高越小越慢
+    lossless: WebP 无损 (PNG 本身即无损)
+    """
+    fmt: str = "jpg"
+    quality: int = None
+    compression: int = None
+    lossless: bool = False
+
+    @property
+    def ext(self):
+        return "." + self.fmt
+
+    def params(self):
+        """Returns: 传给 cv2_imwrite_safe 的编码参数"""
+        if self.fmt == "jpg" and self.quality is not None:
+            return [cv2.IMWRITE_JPEG_QUALITY, int(self.quality)]
+        if self.fmt == "png" and self.compression is not None:
+            return [cv2.IMWRITE_PNG_COMPRESSION, int(self.compression)]
+        if self.fmt == "webp":
+            # Note: OpenCV 约定 WebP 质量 > 100 即无损编码，不传参数时也按无损编码，因此有损必须显式给出质量
+            if self.lossless:
+                return [cv2.IMWRITE_WEBP_QUALITY, 101]
+            quality = WEBP_DEFAULT_QUALITY if self.quality is None else self.quality
+            return [cv2.IMWRITE_WEBP_QUALITY, int(quality)]
+        return None
+
+    @classmethod
+    def parse(cls, spec):
+        """
+        Note: 解析 'jpg' / 'jpg:90' / 'png:3' / 'webp:80' / 'webp:lossless' 形式的格式描述
+        """
+        fmt, _, opt = spec.strip().lower().partition(":")
+        if fmt == "jpeg":
+            fmt = "jpg"
+        if fmt not in ("jpg", "png", "webp"):
+            raise ValueError(f"Unsupported output format '{fmt}'")
+        if not opt:
+            return cls(fmt)
+        if fmt == "webp" and opt == "lossless":
+            return cls(fmt, lossless=True)
+
+        try:
+            value = int(opt)
+        except ValueError:
+            raise ValueError(f"Invalid option '{opt}' for {fmt}")
+        if fmt == "png":
+            if not 0 <= value <= 9:
+                raise ValueError("PNG compression must be 0-9")
+            return cls(fmt, compression=value)
+        if not 1 <= value <= 100:
+            raise ValueError("Quality must be 1-100")
+        return cls(fmt, quality=value)
+
+
+class WriterStats:
+    """逐文件记录编码/写盘耗时，供结束时汇总"""
+
+    def __init__(self):
+        self.records = []
+        self._lock = threading.Lock()
+
+    def add(self, path, timings):
+        with self._lock:
+            self.records.append((path, timings.get("encode", 0.0), timings.get("write", 0.0),
+                                 timings.get("bytes", 0)))
+
+    def summary(self):
+        with self._lock:
+            n = len(self.records)
+            if not n:
+                return "no slides written"
+            enc = sum(r[1] for r in self.records)
+            wr = sum(r[2] for r in self.records)
+            size = sum(r[3] for r in self.records)
+            worst = max(self.records, key=lambda r: r[1] + r[2])
+        return (f"{n} files, {size / 1048576:.1f} MB, "
+                f"encode {enc / n * 1000:.1f} ms/file, write {wr / n * 1000:.1f} ms/file, "
+                f"slowest {(worst[1] + worst[2]) * 1000:.0f} ms")
+
+
+class AsyncSlideWriter:
+    """
+    Write Stage.
+    JPEG/PNG/WebP 编码与落盘交给后台线程池，检测循环只负责入队。
+    Note: 队列有界 (max_pending)，磁盘/网络盘过慢时 submit() 阻塞形成背压，内存不会无限增长。
+          编码在 cv2 内部释放 GIL，多线程可同时编码多张幻灯片。
+    """
+
+    def __init__(self, output_format=None, threads=2, max_pending=8, on_error=None, profiler=NULL_PROFILER):
+        self.output_format = output_format or OutputFormat()
+        self.profiler = profiler
+        self.on_error = on_error
+        self.failed = []
+        self.stats = WriterStats()
+        self._params = self.output_format.params()
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._threads = [threading.Thread(target=self._run, name=f"SlideWriter-{i}", daemon=True)
+                         for i in range(max(1, threads))]
+        for t in self._threads:
+            t.start()
+
+    @property
+    def ext(self):
+        return self.output_format.ext
+
+    def submit(self, path, img):
+        self._queue.put((path, img))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                path, img = item
+                timings = {}
+                if cv2_imwrite_safe(path, img, self._params, timings):
+                    self.stats.add(path, timings)
+                    self.profiler.add("encode", timings.get("encode", 0.0))
+                    self.profiler.add("write", timings.get("write", 0.0))
+                else:
+                    self.failed.append(path)
+                    if self.on_error:
+                        self.on_error(path)
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """阻塞直到已提交的图片全部写完"""
+        self._queue.join()
+
+    def close(self):
+        """Note: 先写完队列中剩余的图片再退出，取消任务时已捕获的幻灯片也不会丢失"""
+        alive = [t for t in self._threads if t.is_alive()]
+        for _ in alive:
+            self._queue.put(None)
+        for t in alive:
+            t.join()
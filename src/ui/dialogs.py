@@ -4,9 +4,20 @@ from tkinter import messagebox
 from PIL import Image, ImageTk
 import cv2
 import math
+import threading
 
 # Note: 确保 time_ops.py 路径正确
 from src.utils.time_ops import format_time
+from src.ui.frame_source import PreviewFrameSource
+from src.ui.timeline_view import TimelineView
+from src.core.timeline import build_timeline
+from src.core.content_range import span_from_timeline
+from src.core.proxy import find_proxy
+
+# 界面侧轮询解码结果的间隔 (毫秒)
+PREVIEW_POLL_MS = 15
+# 时间轴后台构建的进度轮询间隔 (毫秒)
+TIMELINE_POLL_MS = 200
 
 
 class VideoCutterDialog(tb.Toplevel):
@@ -35,6 +46,13 @@ class VideoCutterDialog(tb.Toplevel):
         self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
         self.fps = self.cap.get(cv2.CAP_PROP_FPS)
         if self.fps <= 0: self.fps = 25.0
+        # Note: 预览解码交给后台线程 (带 LRU 缓存与预取)，这里的 cap 只用于读取元数据
+        self.cap.release()
+        # 已生成低清代理时 (只查缓存，不会现场生成)，远距离拖动先显示代理帧
+        self.source = PreviewFrameSource(video_path, proxy=find_proxy(video_path))
+        self._pending_idx = None
+        self._placeholder_idx = None
+        self._poll_job = None
 
         # Boundary logic
         duration = self.total_frames / self.fps
@@ -45,6 +63,16 @@ class VideoCutterDialog(tb.Toplevel):
         self.start_frame = int(initial_start_sec * self.fps)
         self.end_frame = int(initial_end_sec * self.fps)
         self.current_frame_idx = self.start_frame
+        self.duration = duration
+
+        # Note: 胶片条/活动曲线在后台线程构建 (按视频指纹缓存)，结果通过属性交给 Tk 侧轮询
+        self.timeline = None
+        self._timeline_result = None
+        self._timeline_error = None
+        self._timeline_done = False
+        self._timeline_progress = 0
+        self._timeline_stop = threading.Event()
+        self._timeline_job = None
 
         self.create_ui()
 
@@ -52,6 +80,9 @@ class VideoCutterDialog(tb.Toplevel):
         self.seek_to(self.start_frame)
         self.update_boundary_labels()
 
+        threading.Thread(target=self._build_timeline, name="TimelineBuild", daemon=True).start()
+        self._timeline_job = self.after(TIMELINE_POLL_MS, self._poll_timeline)
+
         self.protocol("WM_DELETE_WINDOW", self._on_close)
 
     def create_ui(self):
@@ -81,6 +112,9 @@ class VideoCutterDialog(tb.Toplevel):
                                variable=self.slider_var, command=self.on_slide, bootstyle="info")
         self.slider.pack(fill=X)
 
+        self.timeline_view = TimelineView(slider_frame, self.duration, on_seek=self._on_timeline_seek)
+        self.timeline_view.pack(fill=X, pady=(4, 0))
+
         # --- Fine Tuning Controls ---
         fine_tune_frame = tb.Frame(control_container, padding=5)
         fine_tune_frame.pack(fill=X, pady=5)
@@ -96,6 +130,10 @@ class VideoCutterDialog(tb.Toplevel):
                                                                                                            padx=2)
         tb.Button(btn_box, text="+1s >>", bootstyle="outline-secondary",
                   command=lambda: self.step_frame(int(self.fps))).pack(side=LEFT, padx=2)
+        # 时间轴就绪后可用：根据活动曲线自动定位幻灯片出现的区间
+        self.btn_auto_range = tb.Button(btn_box, text="AUTO IN/OUT", bootstyle="info-outline",
+                                        command=self.auto_range, state=DISABLED)
+        self.btn_auto_range.pack(side=LEFT, padx=(20, 2))
 
         # --- Dashboard ---
         dashboard = tb.Frame(control_container, padding=5)
@@ -130,6 +168,7 @@ class VideoCutterDialog(tb.Toplevel):
         self.slider.set(frame_idx)
         self.update_preview(frame_idx)
         self.lbl_current_disp.config(text=format_time(frame_idx / self.fps))
+        self.timeline_view.set_cursor(frame_idx / self.fps)
 
     def on_slide(self, val):
         frame_idx = int(float(val))
@@ -137,36 +176,65 @@ class VideoCutterDialog(tb.Toplevel):
             self.current_frame_idx = frame_idx
             self.update_preview(frame_idx)
             self.lbl_current_disp.config(text=format_time(frame_idx / self.fps))
+            self.timeline_view.set_cursor(frame_idx / self.fps)
 
     def step_frame(self, delta):
         new_frame = self.current_frame_idx + delta
         self.seek_to(new_frame)
 
     def update_preview(self, frame_idx):
-        if not self.cap.isOpened(): return
-
-        self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-        ret, frame = self.cap.read()
-
-        if ret:
-            h, w = frame.shape[:2]
-
-            # [FIX: Calculate resize ratio based on fixed container size]
-            # Use slightly less than 1150/550 to ensure margins
-            max_w, max_h = 1100, 530
+        """
+        Note: 命中缓存立即显示；否则把目标交给后台线程 (覆盖旧目标)，由轮询循环在解码完成后显示。
+        预览帧在后台已缩放到 1100x530 以内 (固定容器尺寸留出边距) 并转为 RGB。
+        """
+        if not self.source.is_open: return
+
+        rgb = self.source.get(frame_idx)
+        self.source.request(frame_idx)
+        if rgb is not None:
+            self._pending_idx = None
+            self._show(rgb)
+            return
 
-            ratio = min(max_w / w, max_h / h)
-            new_w, new_h = int(w * ratio), int(h * ratio)
+        # 解码完成前先用胶片条中最接近的缩略图占位，拖动时画面不会停在旧帧上
+        thumb = self.timeline.strip_at(frame_idx / self.fps) if self.timeline is not None else None
+        if thumb is not None:
+            self._show_placeholder(thumb)
 
-            frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(rgb)
-            tk_img = ImageTk.PhotoImage(img)
+        self._pending_idx = frame_idx
+        if self._poll_job is None:
+            self._poll_job = self.after(PREVIEW_POLL_MS, self._poll_preview)
 
-            self.lbl_image.config(image=tk_img, text="")
-            self.lbl_image.image = tk_img
-        else:
+    def _poll_preview(self):
+        self._poll_job = None
+        idx = self._pending_idx
+        if idx is None:
+            return
+        rgb = self.source.get(idx)
+        if rgb is not None:
+            self._pending_idx = None
+            self._show(rgb)
+        elif self.source.is_failed(idx):
+            self._pending_idx = None
             self.lbl_image.config(image="", text="[ End of Stream ]")
+        else:
+            placeholder = self.source.placeholder(idx)
+            if placeholder is not None and idx != self._placeholder_idx:
+                self._placeholder_idx = idx
+                self._show(placeholder)
+            self._poll_job = self.after(PREVIEW_POLL_MS, self._poll_preview)
+
+    def _show_placeholder(self, thumb):
+        max_w, max_h = self.source.max_size
+        h, w = thumb.shape[:2]
+        ratio = min(max_w / w, max_h / h)
+        big = cv2.resize(thumb, (int(w * ratio), int(h * ratio)), interpolation=cv2.INTER_LINEAR)
+        self._show(cv2.cvtColor(big, cv2.COLOR_BGR2RGB))
+
+    def _show(self, rgb):
+        tk_img = ImageTk.PhotoImage(Image.fromarray(rgb))
+        self.lbl_image.config(image=tk_img, text="")
+        self.lbl_image.image = tk_img
 
     def set_start(self):
         self.start_frame = self.current_frame_idx
@@ -179,10 +247,60 @@ class VideoCutterDialog(tb.Toplevel):
     def update_boundary_labels(self):
         self.lbl_start_disp.config(text=format_time(self.start_frame / self.fps))
         self.lbl_end_disp.config(text=format_time(self.end_frame / self.fps))
+        self.timeline_view.set_range(self.start_frame / self.fps, self.end_frame / self.fps)
+
+    # ================= Timeline =================
+
+    def _build_timeline(self):
+        """Safety: 工作线程，只写 _timeline_* 属性，不触碰任何 Tk 对象"""
+        try:
+            self._timeline_result = build_timeline(
+                self.video_path, stop_event=self._timeline_stop,
+                on_progress=lambda p: setattr(self, "_timeline_progress", p))
+        except Exception as e:
+            self._timeline_error = str(e) or type(e).__name__
+        finally:
+            self._timeline_done = True
+
+    def _poll_timeline(self):
+        self._timeline_job = None
+        if not self._timeline_done:
+            self.timeline_view.set_status(f"Building timeline... {self._timeline_progress}%")
+            self._timeline_job = self.after(TIMELINE_POLL_MS, self._poll_timeline)
+            return
+        if self._timeline_result is None:
+            if self._timeline_error:
+                self.timeline_view.set_status(f"Timeline unavailable: {self._timeline_error}")
+            else:
+                self.timeline_view.set_status("Timeline unavailable")
+            return
+        self.timeline = self._timeline_result
+        self.timeline_view.set_timeline(self.timeline)
+        self.btn_auto_range.config(state=NORMAL)
+
+    def auto_range(self):
+        """Note: 只修改 IN/OUT，仍需用户确认 (APPLY) 后才通过 callback 同步到主界面"""
+        span = span_from_timeline(self.timeline)
+        if span is None:
+            messagebox.showinfo("Auto Range", "未检测到稳定的幻灯片画面，请手动设置起止点。", parent=self)
+            return
+        self.start_frame = int(span[0] * self.fps)
+        self.end_frame = min(int(span[1] * self.fps), self.total_frames)
+        self.update_boundary_labels()
+        self.seek_to(self.start_frame)
+
+    def _on_timeline_seek(self, sec):
+        self.seek_to(int(sec * self.fps))
 
     def _on_close(self):
-        if self.cap.isOpened():
-            self.cap.release()
+        if self._poll_job is not None:
+            self.after_cancel(self._poll_job)
+            self._poll_job = None
+        if self._timeline_job is not None:
+            self.after_cancel(self._timeline_job)
+            self._timeline_job = None
+        self._timeline_stop.set()
+        self.source.close()
         self.destroy()
 
     def confirm(self):
@@ -0,0 +1,200 @@
+import threading
+from collections import OrderedDict
+
+import cv2
+
+# 预取窗口 (帧)：光标前后各解码多少帧，保证逐帧步进直接命中缓存
+PREFETCH_AHEAD = 24
+PREFETCH_BEHIND = 24
+# 拖动方向上额外预取的落点个数
+PREFETCH_DRAG_POINTS = 3
+# 目标在当前解码位置之后且距离不超过该值时顺序读取，否则 seek
+SEQUENTIAL_WINDOW = 48
+
+
+class PreviewFrameSource:
+    """
+    Scrubber Frame Source (Tk-free).
+    独立线程持有自己的 VideoCapture，解码结果缩放到预览尺寸并转成 RGB 后放入 LRU 缓存。
+
+    - request(idx): 单槽目标，连续的滑块事件会互相覆盖，只解码最新的目标
+    - 空闲时在光标前后、以及拖动方向上预取，逐帧步进与回拖基本都命中缓存
+    - 目标位于解码位置之后不远时顺序读取 (不 seek)，避免 H.264 每次从关键帧重新解码
+    - 给定 proxy (VideoProxy) 时，远距离跳转先解码最接近的代理帧 (MJPEG 单帧) 作为占位，再解码原片
+
+    Safety: 所有 cv2 调用只在后台线程进行；Tk 线程只读缓存 (get)，由界面侧轮询取结果。
+    """
+
+    def __init__(self, video_path, max_size=(1100, 530), max_bytes=192 * 1024 ** 2, proxy=None):
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.failed = set()
+
+        self._proxy = proxy
+        self._proxy_cap = proxy.open() if proxy is not None else None
+        self._placeholder = None  # (帧号, RGB)
+        self._cap = cv2.VideoCapture(video_path)
+        self.total_frames = int(self._cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self._pos = 0  # 下一次 read() 返回的帧号
+
+        self._cache = OrderedDict()
+        self._cache_bytes = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._target = None
+        self._cursor = 0
+        self._direction = 0
+        self._stride = 1
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="ScrubberDecode", daemon=True)
+        self._thread.start()
+
+    @property
+    def is_open(self):
+        return self._cap.isOpened()
+
+    # ---------------- Tk side ----------------
+
+    def get(self, frame_idx):
+        """Returns: 缓存中的 RGB 预览帧，未命中返回 None"""
+        with self._lock:
+            frame = self._cache.get(frame_idx)
+            if frame is not None:
+                self._cache.move_to_end(frame_idx)
+            return frame
+
+    def placeholder(self, frame_idx):
+        """Returns: 该目标的代理占位帧 (RGB)，没有时返回 None"""
+        with self._lock:
+            if self._placeholder is not None and self._placeholder[0] == frame_idx:
+                return self._placeholder[1]
+            return None
+
+    def is_failed(self, frame_idx):
+        with self._lock:
+            return frame_idx in self.failed and frame_idx not in self._cache
+
+    def request(self, frame_idx):
+        """Note: 覆盖之前尚未开始的请求 (事件合并)，并记录拖动方向供预取使用"""
+        with self._lock:
+            delta = frame_idx - self._cursor
+            if delta:
+                self._direction = 1 if delta > 0 else -1
+                self._stride = abs(delta)
+            self._cursor = frame_idx
+            if frame_idx not in self._cache:
+                self._target = frame_idx
+            self._wake.notify()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._wake.notify()
+        self._thread.join(timeout=2)
+        self._cap.release()
+        if self._proxy_cap is not None:
+            self._proxy_cap.release()
+
+    # ---------------- Decode thread ----------------
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while self._target is None and not self._closed and not self._prefetch_pending():
+                    self._wake.wait()
+                if self._closed:
+                    return
+                target, self._target = self._target, None
+                cursor, direction, stride = self._cursor, self._direction, self._stride
+
+            if target is not None:
+                if self._proxy_cap is not None and not (self._pos <= target <= self._pos + SEQUENTIAL_WINDOW):
+                    self._decode_proxy(target)
+                self._decode(target)
+                continue
+            self._prefetch(cursor, direction, stride)
+
+    def _prefetch_pending(self):
+        """调用方持有锁：光标附近是否还有未缓存的帧"""
+        c = self._cursor
+        lo, hi = max(0, c - PREFETCH_BEHIND), min(self.total_frames - 1, c + PREFETCH_AHEAD)
+        return any(i not in self._cache and i not in self.failed for i in range(lo, hi + 1))
+
+    def _interrupted(self):
+        with self._lock:
+            return self._target is not None or self._closed
+
+    def _prefetch(self, cursor, direction, stride):
+        # 1. 光标之后：顺序读取
+        hi = min(self.total_frames - 1, cursor + PREFETCH_AHEAD)
+        for idx in range(cursor, hi + 1):
+            if self._interrupted(): return
+            if not self._cached(idx):
+                self._decode(idx)
+
+        # 2. 光标之前：一次 seek 到窗口起点后顺序读到光标
+        lo = max(0, cursor - PREFETCH_BEHIND)
+        for idx in range(lo, cursor):
+            if self._interrupted(): return
+            if not self._cached(idx):
+                self._decode(idx)
+
+        # 3. 拖动方向上的后续落点
+        for k in range(1, PREFETCH_DRAG_POINTS + 1):
+            if self._interrupted() or not direction: return
+            idx = cursor + direction * stride * k
+            if 0 <= idx < self.total_frames and not self._cached(idx):
+                self._decode(idx)
+
+    def _cached(self, idx):
+        with self._lock:
+            return idx in self._cache or idx in self.failed
+
+    def _decode(self, idx):
+        if not 0 <= idx < max(self.total_frames, 1):
+            with self._lock:
+                self.failed.add(idx)
+            return
+        if not (self._pos <= idx <= self._pos + SEQUENTIAL_WINDOW):
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+            self._pos = idx
+
+        # 顺序读取途经的帧也顺手放进缓存
+        while self._pos <= idx:
+            ret, frame = self._cap.read()
+            if not ret:
+                # 解码位置未知，下一次强制 seek
+                self._pos = -SEQUENTIAL_WINDOW - 1
+                with self._lock:
+                    self.failed.add(idx)
+                return
+            self._store(self._pos, frame)
+            self._pos += 1
+
+    def _decode_proxy(self, idx):
+        frame = self._proxy.read(self._proxy_cap, idx)
+        if frame is not None:
+            rgb = self._to_preview(frame)
+            with self._lock:
+                self._placeholder = (idx, rgb)
+
+    def _to_preview(self, frame):
+        h, w = frame.shape[:2]
+        max_w, max_h = self.max_size
+        ratio = min(max_w / w, max_h / h)
+        # 代理帧需要放大时用线性插值，原片缩小用 INTER_AREA
+        interp = cv2.INTER_AREA if ratio < 1 else cv2.INTER_LINEAR
+        small = cv2.resize(frame, (int(w * ratio), int(h * ratio)), interpolation=interp)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+
+    def _store(self, idx, frame):
+        rgb = self._to_preview(frame)
+        with self._lock:
+            if idx in self._cache:
+                return
+            self._cache[idx] = rgb
+            self._cache_bytes += rgb.nbytes
+            self.failed.discard(idx)
+            while self._cache_bytes > self.max_bytes and len(self._cache) > 1:
+                _, old = self._cache.popitem(last=False)
+                self._cache_bytes -= old.nbytes
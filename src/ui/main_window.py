@@ -2,21 +2,22 @@ import os
 import sys
 import threading
 import time
-import re
 import platform
 import subprocess
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import ttkbootstrap as tb
 from ttkbootstrap.constants import *
-from PIL import Image, ImageTk
 import cv2
-import numpy as np
 
 # Internal utility imports
-from src.utils.file_ops import cv2_imread_safe, cv2_imwrite_safe
+from src.core.extractor import SlideExtractor, ExtractionParams, ExtractionError
+from src.core.calibrate import auto_tune
+from src.core.proxy import find_proxy
+from src.utils.file_ops import sanitize_filename
 from src.utils.time_ops import parse_time, format_time
 from src.ui.dialogs import VideoCutterDialog
+from src.ui.preview import FramePreview
 
 
 class PPTExtractorEngine(tb.Window):
@@ -27,7 +28,7 @@ class PPTExtractorEngine(tb.Window):
     2. UI LAYOUT: Increased dimensions and adjusted splitter for better visibility.
     """
 
-    def __init__(self):
+    def __init__(self, video=None):
         super().__init__(themename="cosmo")
 
         self.title("PPT Extractor Professional")
@@ -55,18 +56,32 @@ class PPTExtractorEngine(tb.Window):
 
         # Feature Flags
         self.monitor_on = tb.BooleanVar(value=True)
+        self.profile_on = tb.BooleanVar(value=False)
         self.make_pdf = tb.BooleanVar(value=True)
         self.remove_borders = tb.BooleanVar(value=True)
         self.high_precision = tb.BooleanVar(value=False)
+        self.global_dedup = tb.BooleanVar(value=True)
+        self.adaptive_interval = tb.BooleanVar(value=False)
+        self.refine_transitions = tb.BooleanVar(value=False)
+        self.sharpest_frame = tb.BooleanVar(value=False)
+        self.use_proxy = tb.BooleanVar(value=False)
 
         # Runtime State
         self.roi_rect = None
         self.is_time_locked = False
         self.is_running = False
         self._thread_lock = threading.Lock()
+        self._engine = None
+        self._engine_params = ExtractionParams()
+        for var in (self.diff_threshold, self.stability_frames, self.check_interval, self.global_dedup,
+                    self.adaptive_interval, self.refine_transitions, self.sharpest_frame, self.remove_borders):
+            var.trace_add("write", self._sync_engine_params)
 
         self._init_ui()
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
+        # Note: 文件关联 / 拖放到程序上启动时，argv 里的视频直接载入
+        if video:
+            self.load_video(video)
 
     def _init_assets(self):
         try:
@@ -91,6 +106,8 @@ class PPTExtractorEngine(tb.Window):
         if self.is_running:
             if messagebox.askokcancel("Quit", "Engine is running. Force quit?"):
                 self.is_running = False
+                if self._engine:
+                    self._engine.stop()
                 self.destroy()
         else:
             self.destroy()
@@ -227,6 +244,8 @@ class PPTExtractorEngine(tb.Window):
             side=LEFT, padx=5)
         tb.Checkbutton(sw_f, text="智能去黑边", variable=self.remove_borders, bootstyle="primary-round-toggle").pack(
             side=RIGHT, padx=5)
+        tb.Checkbutton(sw_f, text="全局去重", variable=self.global_dedup, bootstyle="primary-round-toggle").pack(
+            side=RIGHT, padx=5)
 
         c3 = tb.Labelframe(parent, text=" [3] Visual Kernel / 视觉算子 ", padding=8, bootstyle="primary")
         c3.pack(fill=X, padx=5)
@@ -238,10 +257,26 @@ class PPTExtractorEngine(tb.Window):
         self.lbl_roi_status = tb.Label(row_roi, text="全屏扫描", font=("Segoe UI", 8), foreground="#999")
         self.lbl_roi_status.pack(side=RIGHT, padx=5)
 
+        row_tune = tb.Frame(c3);
+        row_tune.pack(fill=X, pady=(0, 10))
+        self.btn_tune = tb.Button(row_tune, text="[A] 自动标定阈值/防抖", command=self.auto_calibrate,
+                                  bootstyle="info-outline", width=20)
+        self.btn_tune.pack(side=LEFT)
+        tb.Label(row_tune, text="采样一遍，按噪声分布设定", font=("Segoe UI", 8), foreground="#999").pack(
+            side=RIGHT, padx=5)
+
         tb.Separator(c3, orient=HORIZONTAL, bootstyle="light").pack(fill=X, pady=5)
 
         self._add_param_row(c3, "判定阈值:", self.diff_threshold, "12", "越小越灵敏 (5-20)", 0, min_val=2, max_val=50)
         self._add_param_row(c3, "扫描步长:", self.check_interval, "0.5", "步长越短越精准 (0.3-1.0)", 1, is_spin=True)
+        tb.Checkbutton(c3, text="自适应步长 (静止时自动放宽，最长 8 秒)", variable=self.adaptive_interval,
+                       bootstyle="primary-round-toggle").pack(anchor=W, pady=(0, 4))
+        tb.Checkbutton(c3, text="精确定位切换帧 (取最清晰帧，输出 slides.json)", variable=self.refine_transitions,
+                       bootstyle="primary-round-toggle").pack(anchor=W, pady=(0, 4))
+        tb.Checkbutton(c3, text="稳定窗口内取最清晰帧 (不额外解码)", variable=self.sharpest_frame,
+                       bootstyle="primary-round-toggle").pack(anchor=W, pady=(0, 4))
+        tb.Checkbutton(c3, text="低清代理扫描 (长视频首次生成，之后复用)", variable=self.use_proxy,
+                       bootstyle="primary-round-toggle").pack(anchor=W, pady=(0, 4))
         self._add_param_row(c3, "防抖等级:", self.stability_frames, "5", "连续稳定多少帧才抓取 (3-10)", 2,
                             is_spin=False, min_val=2, max_val=20)
 
@@ -270,6 +305,8 @@ class PPTExtractorEngine(tb.Window):
         else:
             s = tb.Scale(top, variable=var, from_=min_val, to=max_val, bootstyle="primary", command=_on_scale_change)
             s.pack(side=LEFT, fill=X, expand=True, padx=5)
+            # 自动标定直接写变量，数值标签随之刷新
+            var.trace_add("write", lambda *_: val_label.config(text=f"[{var.get()}]"))
         tb.Label(f, text=f"说明: {note}", font=("Segoe UI", 8), foreground="#999").pack(anchor=W)
 
     def _build_viewports(self, parent):
@@ -281,6 +318,8 @@ class PPTExtractorEngine(tb.Window):
                  bootstyle="inverse-secondary").pack(side=LEFT, padx=10)
         tb.Checkbutton(m_head, text="LIVE", variable=self.monitor_on,
                        bootstyle="primary-round-toggle", command=self.on_monitor_toggle).pack(side=RIGHT, padx=5)
+        tb.Checkbutton(m_head, text="PROFILE", variable=self.profile_on,
+                       bootstyle="info-round-toggle").pack(side=RIGHT, padx=5)
         self.preview_container = tb.Frame(m_frame, bootstyle="light")
         self.preview_container.pack(fill=BOTH, expand=True)
         self.lbl_preview = tb.Label(self.preview_container, text="[ STANDBY ]", anchor="center", font=("Consolas", 14),
@@ -299,14 +338,22 @@ class PPTExtractorEngine(tb.Window):
                                     foreground="#999")
         self.lbl_capture.pack(fill=BOTH, expand=True)
 
+        self.monitor_preview = FramePreview(self.lbl_preview, self.preview_container)
+        self.capture_preview = FramePreview(self.lbl_capture, self.capture_container, max_fps=4,
+                                            on_render=lambda count: self.var_captured.set(str(count)))
+        self.monitor_preview.start()
+        self.capture_preview.start()
+
     def on_monitor_toggle(self):
+        self.monitor_preview.enabled = self.monitor_on.get()
+        self.monitor_preview.clear()
         if not self.monitor_on.get():
             self.lbl_preview.config(image='', text="[ MONITOR DISABLED / 预览已关闭 ]")
         else:
             self.lbl_preview.config(image='', text="[ INITIALIZING STREAM... ]")
 
     def sanitize_filename(self, name):
-        return re.sub(r'[\\/*?:"<>|]', "", name)
+        return sanitize_filename(name)
 
     def open_folder(self, path):
         try:
@@ -327,18 +374,28 @@ class PPTExtractorEngine(tb.Window):
         self.set_status("SETTING ROI")
         messagebox.showinfo("ROI Guide", "操作提示：\n1. 拖动鼠标框选区域\n2. 按 ENTER 键确认\n3. 按 C 键取消")
         try:
-            cap = cv2.VideoCapture(video)
-            start_txt = self.ent_start.get()
-            if start_txt:
-                try:
-                    h, m, s = map(int, start_txt.split(':'))
-                    start_ms = (h * 3600 + m * 60 + s) * 1000
-                    cap.set(cv2.CAP_PROP_POS_MSEC, start_ms)
-                except ValueError:
-                    pass
-            ret, frame = cap.read()
-            cap.release()
-            if not ret: raise ValueError("Cannot read video stream.")
+            # Note: 启用代理且已生成时在代理帧上框选 (单帧 MJPEG，无需从关键帧解码)，结果换算回原片坐标
+            proxy = find_proxy(video) if self.use_proxy.get() else None
+            frame = None
+            if proxy is not None:
+                cap = proxy.open()
+                frame = proxy.read(cap, max(0, parse_time(self.ent_start.get())) * proxy.fps)
+                cap.release()
+                if frame is None:
+                    proxy = None
+            if frame is None:
+                cap = cv2.VideoCapture(video)
+                start_txt = self.ent_start.get()
+                if start_txt:
+                    try:
+                        h, m, s = map(int, start_txt.split(':'))
+                        start_ms = (h * 3600 + m * 60 + s) * 1000
+                        cap.set(cv2.CAP_PROP_POS_MSEC, start_ms)
+                    except ValueError:
+                        pass
+                ret, frame = cap.read()
+                cap.release()
+                if not ret: raise ValueError("Cannot read video stream.")
 
             win_name = "ROI Selector (Enter=Confirm, C=Cancel)"
             cv2.namedWindow(win_name, cv2.WINDOW_NORMAL)
@@ -346,6 +403,8 @@ class PPTExtractorEngine(tb.Window):
             roi = cv2.selectROI(win_name, frame, showCrosshair=True, fromCenter=False)
             cv2.destroyWindow(win_name)
 
+            if proxy is not None and roi[2] > 0 and roi[3] > 0:
+                roi = proxy.to_source_roi(roi)
             x, y, w, h = roi
             if w > 0 and h > 0:
                 self.roi_rect = (x, y, w, h)
@@ -360,222 +419,116 @@ class PPTExtractorEngine(tb.Window):
             self.log(f"ROI Error: {e}")
             self.set_status("ERROR", "red")
 
-    def run_logic(self):
-        video_path = self.video_path.get()
-        base_output = self.output_path.get()
-        raw_name = self.project_name.get().strip()
-        project_name = self.sanitize_filename(raw_name) or f"Lecture_{int(time.time())}"
-
-        project_dir = os.path.join(base_output, project_name)
-        images_dir = os.path.join(project_dir, "Runs")
-        pdf_dir = os.path.join(project_dir, "PDFs")
-
-        if not base_output or not os.path.exists(video_path):
-            self.log("Error: Invalid paths.")
-            self.is_running = False
-            self.set_status("CONFIG ERROR", "red")
-            self.after(0, lambda: self.btn_run.config(text="INITIALIZE ENGINE / 启动抽取引擎", bootstyle="primary"))
-            return
-
+    def auto_calibrate(self):
+        video = self.video_path.get()
+        if not video or not os.path.exists(video):
+            return messagebox.showwarning("Warning", "请先加载有效的视频文件。")
+        if self.is_running:
+            return messagebox.showwarning("Warning", "引擎运行中，请先停止。")
+        self._sync_engine_params()
+        # Note: 用当前 ROI/范围/步长采样 (写入特征缓存，随后的正式抽取直接重放)；参数副本，不影响运行中的引擎
+        params = ExtractionParams(**vars(self._engine_params))
+        engine = SlideExtractor(
+            video, "", roi=self.roi_rect,
+            start_sec=max(0, parse_time(self.ent_start.get())), end_sec=max(0, parse_time(self.ent_end.get())),
+            params=params, use_proxy=self.use_proxy.get(), on_log=self.log, on_progress=self._on_engine_progress)
+        self.btn_tune.config(state=DISABLED)
+        self.set_status("CALIBRATING / 标定中")
+        threading.Thread(target=self._calibrate_logic, args=(engine,), daemon=True).start()
+
+    def _calibrate_logic(self, engine):
+        """Safety: 工作线程只做采样与计算，结果交回 Tk 线程写入滑块变量"""
         try:
-            os.makedirs(images_dir, exist_ok=True)
-            os.makedirs(pdf_dir, exist_ok=True)
+            cal = auto_tune(engine)
+        except ExtractionError as e:
+            self.log(f"Calibration Error: {e}")
+            cal = None
         except Exception as e:
-            self.log(f"Error creating directories: {e}")
-            return
+            self.log(f"Runtime Exception: {e}")
+            cal = None
+        self.after(0, lambda: self._apply_calibration(cal))
 
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            self.log("Error: Cannot open video source.")
-            self.is_running = False
-            self.set_status("ERROR", "red")
-            self.after(0, lambda: self.btn_run.config(text="INITIALIZE ENGINE", bootstyle="primary"))
+    def _apply_calibration(self, cal):
+        self.btn_tune.config(state=NORMAL)
+        self.progress_var.set(0)
+        if cal is None:
+            self.set_status("READY")
             return
+        self.diff_threshold.set(cal.threshold)
+        self.stability_frames.set(cal.stability)
+        self.log(f"Calibrated: threshold={cal.threshold}, stability={cal.stability}, ~{cal.slides} slides")
+        self.set_status("READY")
+        messagebox.showinfo("Auto Calibration", cal.explain())
 
-        start_sec = 0.0
-        end_sec = float(cap.get(cv2.CAP_PROP_FRAME_COUNT)) / cap.get(cv2.CAP_PROP_FPS)
-
-        try:
-            s_txt = self.ent_start.get()
-            e_txt = self.ent_end.get()
-            p_start = parse_time(s_txt)
-            if p_start >= 0: start_sec = p_start
-            p_end = parse_time(e_txt)
-            if p_end > 0: end_sec = p_end
-
-            cap.set(cv2.CAP_PROP_POS_MSEC, start_sec * 1000)
-            self.log(f"Range set: {format_time(start_sec)} -> {format_time(end_sec)}")
-        except Exception as e:
-            self.log(f"Time Warning: {e}. Using defaults.")
-
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        total_duration = end_sec - start_sec
-        if total_duration <= 0: total_duration = 1
-
-        prev_frame_gray = None
-        last_captured_hash = None
-        stable_counter = 0
-        captured_count = 0
-        captured_image_paths = []
+    def run_logic(self):
+        engine = SlideExtractor(
+            self.video_path.get(), self.output_path.get(),
+            project_name=self.project_name.get(), roi=self.roi_rect,
+            start_sec=max(0, parse_time(self.ent_start.get())), end_sec=max(0, parse_time(self.ent_end.get())),
+            params=self._engine_params, make_pdf=self.make_pdf.get(), profile=self.profile_on.get(),
+            use_proxy=self.use_proxy.get(), on_log=self.log, on_progress=self._on_engine_progress,
+            on_frame=self._on_engine_frame, on_capture=self._on_engine_capture)
+        self._engine = engine
+        if not self.is_running:
+            engine.stop()
 
-        self.log(f"Running... Target: {project_name}")
         self.set_status("RUNNING / 运行中", "#00ff00")
-
         try:
-            while self.is_running:
-                thresh = self.diff_threshold.get()
-                interval = self.check_interval.get()
-                stability = self.stability_frames.get()
-
-                frames_to_skip = int(fps * interval)
-                if frames_to_skip < 1: frames_to_skip = 1
-
-                for _ in range(frames_to_skip):
-                    cap.grab()
-
-                ret, frame = cap.read()
-                if not ret: break
-
-                current_pos_sec = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
-
-                if current_pos_sec > end_sec:
-                    self.log(f"Reached end time: {format_time(end_sec)}")
-                    self.progress_var.set(100)
-                    break
-
-                elapsed = current_pos_sec - start_sec
-                percent = int((elapsed / total_duration) * 100)
-                percent = max(0, min(100, percent))
-                self.progress_var.set(percent)
-
-                # --- [FIX: ROI CROPPING FIRST] ---
-                # Apply ROI BEFORE updating UI or Processing
-                if self.roi_rect:
-                    x, y, w, h = self.roi_rect
-                    h_frame, w_frame = frame.shape[:2]
-                    x = max(0, x);
-                    y = max(0, y)
-                    w = min(w, w_frame - x);
-                    h = min(h, h_frame - y)
-                    # This is the actual image we process and see
-                    process_frame = frame[y:y + h, x:x + w]
-                else:
-                    process_frame = frame
-
-                # Update Monitor with the CROPPED frame
-                if self.monitor_on.get():
-                    self._update_monitor_ui(process_frame)
-
-                # Algorithm uses CROPPED frame
-                gray = cv2.cvtColor(process_frame, cv2.COLOR_BGR2GRAY)
-                gray_small = cv2.resize(gray, (64, 64))
-
-                is_static = False
-                if prev_frame_gray is not None:
-                    err = np.sum((gray_small.astype("float") - prev_frame_gray.astype("float")) ** 2)
-                    err /= float(gray_small.shape[0] * gray_small.shape[1])
-                    metric = err / 100
-                    if metric < thresh:
-                        is_static = True
-                        stable_counter += 1
-                    else:
-                        stable_counter = 0
-                prev_frame_gray = gray_small
-
-                if is_static and stable_counter == stability:
-                    is_unique = True
-                    if last_captured_hash is not None:
-                        dup_err = np.sum((gray_small.astype("float") - last_captured_hash.astype("float")) ** 2)
-                        dup_err /= float(gray_small.shape[0] * gray_small.shape[1])
-                        dup_metric = dup_err / 100
-                        if dup_metric < (thresh * 1.5):
-                            is_unique = False
-
-                    if is_unique:
-                        last_captured_hash = gray_small
-                        captured_count += 1
-
-                        filename = os.path.join(images_dir, f"slide_{captured_count:04d}.jpg")
-                        # Save the CROPPED frame
-                        cv2_imwrite_safe(filename, process_frame)
-                        captured_image_paths.append(filename)
-
-                        # Update Capture UI with the CROPPED frame
-                        self._update_capture_ui(process_frame, captured_count)
-                        self.log(f"Saved: slide_{captured_count:04d}.jpg")
-
-                self.var_processed.set(format_time(current_pos_sec))
-                time.sleep(0.002)
-
-            if self.make_pdf.get() and captured_image_paths:
-                self.log("Generating PDF...")
-                self.set_status("GENERATING PDF", "cyan")
-                try:
-                    pdf_path = os.path.join(pdf_dir, f"{project_name}_Full.pdf")
-                    img1 = Image.open(captured_image_paths[0]).convert('RGB')
-                    img_list = [Image.open(p).convert('RGB') for p in captured_image_paths[1:]]
-                    img1.save(pdf_path, save_all=True, append_images=img_list)
-                    self.log("PDF Generated.")
-                    messagebox.showinfo("Success", f"Extraction Complete!\nPDF Saved to:\n{pdf_path}")
-                except Exception as e:
-                    self.log(f"PDF Gen Error: {e}")
-
-            self.open_folder(project_dir)
-
+            result = engine.run()
+            if result.pdf_path:
+                self.after(0, lambda: messagebox.showinfo(
+                    "Success", f"Extraction Complete!\nPDF Saved to:\n{result.pdf_path}"))
+            self.open_folder(result.project_dir)
+            self.set_status("FINISHED / 完成", "cyan")
+        except ExtractionError as e:
+            self.log(f"Error: {e}")
+            self.set_status("CONFIG ERROR", "red")
         except Exception as e:
             self.log(f"Runtime Exception: {e}")
             self.set_status("CRASHED", "red")
         finally:
-            cap.release()
+            self._engine = None
             self.is_running = False
-            self.set_status("FINISHED / 完成", "cyan")
             self.after(0, lambda: self.btn_run.config(text="INITIALIZE ENGINE / 启动抽取引擎", bootstyle="primary"))
             self.log("Job Done.")
 
-    def _update_monitor_ui(self, frame_cv2):
-        color_frame = cv2.cvtColor(frame_cv2, cv2.COLOR_BGR2RGB)
-        image = Image.fromarray(color_frame)
-        w = self.preview_container.winfo_width() or 400
-        h = self.preview_container.winfo_height() or 300
-        img_w, img_h = image.size
-        ratio = min(w / img_w, h / img_h)
-        new_w, new_h = int(img_w * ratio), int(img_h * ratio)
-        image = image.resize((new_w, new_h), Image.Resampling.BILINEAR)
-        photo = ImageTk.PhotoImage(image)
-
-        def _refresh():
-            if self.monitor_on.get():
-                self.lbl_preview.config(image=photo, text="")
-                self.lbl_preview.image = photo
-
-        self.after(0, _refresh)
-
-    def _update_capture_ui(self, frame_cv2, count):
-        color_frame = cv2.cvtColor(frame_cv2, cv2.COLOR_BGR2RGB)
-        image = Image.fromarray(color_frame)
-        w = self.capture_container.winfo_width() or 400
-        h = self.capture_container.winfo_height() or 300
-        img_w, img_h = image.size
-        ratio = min(w / img_w, h / img_h)
-        new_w, new_h = int(img_w * ratio), int(img_h * ratio)
-        image = image.resize((new_w, new_h), Image.Resampling.LANCZOS)
-        photo = ImageTk.PhotoImage(image)
-
-        def _refresh():
-            self.lbl_capture.config(image=photo, text="")
-            self.lbl_capture.image = photo
-            self.var_captured.set(str(count))
-
-        self.after(0, _refresh)
+    def _sync_engine_params(self, *_):
+        """Note: Tk 变量 -> 引擎参数 (在 Tk 线程执行，运行中拖动滑块即时生效)"""
+        try:
+            self._engine_params.diff_threshold = self.diff_threshold.get()
+            self._engine_params.stability_frames = self.stability_frames.get()
+            self._engine_params.check_interval = self.check_interval.get()
+            self._engine_params.global_dedup = self.global_dedup.get()
+            self._engine_params.adaptive_interval = self.adaptive_interval.get()
+            self._engine_params.refine_transitions = self.refine_transitions.get()
+            self._engine_params.sharpest_frame = self.sharpest_frame.get()
+            self._engine_params.remove_borders = self.remove_borders.get()
+        except tk.TclError:
+            # Spinbox 输入过程中的中间态 (如空字符串)，忽略即可
+            pass
+
+    def _on_engine_progress(self, percent, pos_sec):
+        self.progress_var.set(percent)
+        self.var_processed.set(format_time(pos_sec))
+
+    def _on_engine_frame(self, frame):
+        # Note: 工作线程只做单槽替换，渲染由 Tk 线程按固定帧率完成
+        self.monitor_preview.push(frame)
+
+    def _on_engine_capture(self, frame, count, path):
+        self.capture_preview.push(frame, count)
 
     def select_video(self):
         f = filedialog.askopenfilename(filetypes=[("Video Files", "*.mp4 *.avi *.mkv")])
         if f:
-            self.video_path.set(f)
-            self.roi_rect = None
-            self.lbl_roi_status.config(text="全屏扫描", foreground="#999")
-            self.set_status("READY")
-            self.log(f"Source loaded: {os.path.basename(f)}")
+            self.load_video(f)
+
+    def load_video(self, f):
+        self.video_path.set(f)
+        self.roi_rect = None
+        self.lbl_roi_status.config(text="全屏扫描", foreground="#999")
+        self.set_status("READY")
+        self.log(f"Source loaded: {os.path.basename(f)}")
 
     def select_output(self):
         d = filedialog.askdirectory()
@@ -611,11 +564,14 @@ class PPTExtractorEngine(tb.Window):
     def toggle_run(self):
         if self.is_running:
             self.is_running = False
+            if self._engine:
+                self._engine.stop()
             self.set_status("STOPPING...")
             self.log("Stopping engine...")
             return
         if not self.video_path.get():
             return messagebox.showerror("Error", "请先选择视频文件。")
         self.is_running = True
+        self._sync_engine_params()
         self.btn_run.config(text="ABORT ENGINE / 停止运行", bootstyle="danger")
         threading.Thread(target=self.run_logic, daemon=True).start()
\ No newline at end of file
@@ -0,0 +1,75 @@
+import threading
+
+import cv2
+from PIL import Image, ImageTk
+
+PREVIEW_FPS = 12
+
+
+class FramePreview:
+    """
+    Throttled Live Preview.
+    工作线程 push() 只把最新帧放进单槽邮箱 (旧帧直接丢弃，不排队、不做任何图像处理)；
+    Tk 线程用 after 循环按 max_fps 取出最新帧渲染：先用 cv2 缩放到容器尺寸，再交给 PIL/ImageTk。
+    Safety: 容器尺寸由 <Configure> 事件在 Tk 线程缓存，工作线程不调用任何 winfo_* / Tk 变量。
+    """
+
+    def __init__(self, label, container, max_fps=PREVIEW_FPS, on_render=None):
+        self.label = label
+        self.on_render = on_render
+        self.interval_ms = max(1, int(1000 / max_fps))
+        self.enabled = True
+        self.pushed = 0
+        self.rendered = 0
+
+        self._slot = None
+        self._lock = threading.Lock()
+        self._size = (400, 300)
+        self._job = None
+        container.bind("<Configure>", self._on_resize, add="+")
+
+    def _on_resize(self, event):
+        if event.width > 1 and event.height > 1:
+            self._size = (event.width, event.height)
+
+    def push(self, frame, *extra):
+        """任意线程调用；extra 会原样传给 on_render (如捕获序号)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._slot = (frame, extra)
+        self.pushed += 1
+
+    def clear(self):
+        with self._lock:
+            self._slot = None
+
+    def start(self):
+        if self._job is None:
+            self._job = self.label.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        if self._job is not None:
+            self.label.after_cancel(self._job)
+            self._job = None
+
+    def _tick(self):
+        with self._lock:
+            item, self._slot = self._slot, None
+        if item is not None and self.enabled:
+            self._render(*item)
+        self._job = self.label.after(self.interval_ms, self._tick)
+
+    def _render(self, frame, extra):
+        w, h = self._size
+        img_h, img_w = frame.shape[:2]
+        ratio = min(w / img_w, h / img_h)
+        new_w, new_h = max(1, int(img_w * ratio)), max(1, int(img_h * ratio))
+        # Note: 先在 BGR 原图上缩放 (INTER_AREA 缩小质量好且快)，后续转换只处理显示尺寸的小图
+        small = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_AREA if ratio < 1 else cv2.INTER_LINEAR)
+        photo = ImageTk.PhotoImage(Image.fromarray(cv2.cvtColor(small, cv2.COLOR_BGR2RGB)))
+        self.label.config(image=photo, text="")
+        self.label.image = photo
+        self.rendered += 1
+        if self.on_render:
+            self.on_render(*extra)
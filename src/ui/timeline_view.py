@@ -0,0 +1,135 @@
+import tkinter as tk
+
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+
+# 胶片条行高与活动曲线高度 (像素)
+STRIP_ROW_H = 40
+CURVE_H = 28
+# 活动曲线满刻度对应的 MSE (超过即视为切页/剧烈变化)
+ACTIVITY_FULL_SCALE = 60.0
+
+
+class TimelineView:
+    """
+    Filmstrip + Activity Timeline (Tk side).
+    上排为按画布宽度平铺的胶片条，下排为每秒视觉活动曲线；IN/OUT 之外的区域加暗，竖线为当前指针。
+    点击或拖动时回调 on_seek(sec)。数据由 set_timeline() 一次性给出，之后的重绘只处理画布尺寸的小图。
+    """
+
+    def __init__(self, parent, duration, on_seek=None):
+        self.duration = max(duration, 1e-6)
+        self.on_seek = on_seek
+        self.timeline = None
+        self.cursor_sec = 0.0
+        self.range_sec = (0.0, duration)
+
+        self.canvas = tk.Canvas(parent, height=STRIP_ROW_H + CURVE_H, bg="#1c1c1c",
+                                borderwidth=0, highlightthickness=0, cursor="hand2")
+        self._width = 1
+        self._photo = None
+        self._status = "Building timeline..."
+        self.canvas.bind("<Configure>", self._on_resize)
+        self.canvas.bind("<Button-1>", self._on_click)
+        self.canvas.bind("<B1-Motion>", self._on_click)
+
+    def pack(self, **kw):
+        self.canvas.pack(**kw)
+
+    def set_status(self, text):
+        self._status = text
+        if self.timeline is None:
+            self._redraw()
+
+    def set_timeline(self, timeline):
+        self.timeline = timeline
+        self._rebuild_strip()
+        self._redraw()
+
+    def set_cursor(self, sec):
+        self.cursor_sec = sec
+        self._draw_overlay()
+
+    def set_range(self, start_sec, end_sec):
+        self.range_sec = (start_sec, end_sec)
+        self._draw_overlay()
+
+    # ---------------- Events ----------------
+
+    def _x_to_sec(self, x):
+        return min(max(x, 0), self._width) / self._width * self.duration
+
+    def _sec_to_x(self, sec):
+        return sec / self.duration * self._width
+
+    def _on_resize(self, event):
+        if event.width > 1 and event.width != self._width:
+            self._width = event.width
+            self._rebuild_strip()
+            self._redraw()
+
+    def _on_click(self, event):
+        if self.on_seek:
+            self.on_seek(self._x_to_sec(event.x))
+
+    # ---------------- Drawing ----------------
+
+    def _rebuild_strip(self):
+        """Note: 胶片条拼接成一张画布宽度的图片，只在数据或宽度变化时重建"""
+        tl = self.timeline
+        if tl is None or not len(tl.strip_times):
+            self._photo = None
+            return
+        th, tw = tl.strip.shape[1:3]
+        tile_w = max(1, int(tw * STRIP_ROW_H / th))
+        tiles = []
+        for k in range(int(np.ceil(self._width / tile_w))):
+            thumb = tl.strip_at((k + 0.5) * tile_w / self._width * self.duration)
+            tiles.append(cv2.resize(thumb, (tile_w, STRIP_ROW_H), interpolation=cv2.INTER_AREA))
+        row = np.hstack(tiles)[:, :self._width]
+        self._photo = ImageTk.PhotoImage(Image.fromarray(cv2.cvtColor(row, cv2.COLOR_BGR2RGB)))
+
+    def _curve_points(self):
+        activity = self.timeline.activity
+        if not len(activity):
+            return []
+        # 每个像素列取其覆盖秒数内的最大值，长视频也不会漏掉短暂的切页尖峰
+        starts = np.linspace(0, len(activity), self._width, endpoint=False).astype(int)
+        col = np.maximum.reduceat(activity, np.minimum(starts, len(activity) - 1))
+        level = np.minimum(col / ACTIVITY_FULL_SCALE, 1.0)
+        base = STRIP_ROW_H + CURVE_H - 1
+        ys = base - level * (CURVE_H - 3)
+        points = [0, base]
+        for x, y in enumerate(ys):
+            points += [x, float(y)]
+        return points + [self._width, base]
+
+    def _redraw(self):
+        c = self.canvas
+        c.delete("all")
+        if self.timeline is None:
+            c.create_text(self._width / 2, (STRIP_ROW_H + CURVE_H) / 2, text=self._status, fill="#888888")
+            return
+        if self._photo is not None:
+            c.create_image(0, 0, image=self._photo, anchor="nw")
+        points = self._curve_points()
+        if points:
+            c.create_polygon(*points, fill="#2a6f97", outline="#61a5c2")
+        self._draw_overlay()
+
+    def _draw_overlay(self):
+        c = self.canvas
+        c.delete("overlay")
+        if self.timeline is None:
+            return
+        h = STRIP_ROW_H + CURVE_H
+        x_in, x_out = self._sec_to_x(self.range_sec[0]), self._sec_to_x(self.range_sec[1])
+        if x_in > 0:
+            c.create_rectangle(0, 0, x_in, h, fill="black", stipple="gray50", width=0, tags="overlay")
+        if x_out < self._width:
+            c.create_rectangle(x_out, 0, self._width, h, fill="black", stipple="gray50", width=0, tags="overlay")
+        c.create_line(x_in, 0, x_in, h, fill="#f0ad4e", width=2, tags="overlay")
+        c.create_line(x_out, 0, x_out, h, fill="#d9534f", width=2, tags="overlay")
+        x = self._sec_to_x(self.cursor_sec)
+        c.create_line(x, 0, x, h, fill="white", width=1, tags="overlay")
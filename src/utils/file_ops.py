@@ -1,6 +1,8 @@
 import cv2
 import numpy as np
 import os
+import re
+import time
 
 
 def cv2_imread_safe(file_path, flags=cv2.IMREAD_UNCHANGED):
@@ -22,13 +24,14 @@ def cv2_imread_safe(file_path, flags=cv2.IMREAD_UNCHANGED):
         return None
 
 
-def cv2_imwrite_safe(file_path, img, params=None):
+def cv2_imwrite_safe(file_path, img, params=None, timings=None):
     """
     Fix: 支持将图片保存至含中文名称的路径，并自动适配后缀名
     Args:
         file_path: 保存路径 (如 'D:/测试/image.png')
         img: OpenCV 图像矩阵
         params: 编码参数 (如 [cv2.IMWRITE_JPEG_QUALITY, 90])
+        timings: 可选 dict，写入 'encode' / 'write' 耗时 (秒) 与 'bytes' 文件大小
     """
     if img is None:
         return False
@@ -40,13 +43,37 @@ def cv2_imwrite_safe(file_path, img, params=None):
             ext = ".jpg"  # 默认回退到 jpg
 
         # 2. 根据后缀名编码
-        valid, buf = cv2.imencode(ext, img, params)
+        t0 = time.perf_counter()
+        valid, buf = cv2.imencode(ext, img, params or [])
+        t1 = time.perf_counter()
 
         if valid:
             # 3. 写入文件
             buf.tofile(file_path)
+            if timings is not None:
+                timings["encode"] = t1 - t0
+                timings["write"] = time.perf_counter() - t1
+                timings["bytes"] = buf.size
             return True
         return False
     except Exception as e:
         # print(f"Write Error: {e}") # Debug only
-        return False
\ No newline at end of file
+        return False
+
+
+def sanitize_filename(name):
+    """Fix: 过滤 Windows 文件名非法字符"""
+    return re.sub(r'[\\/*?:"<>|]', "", name)
+
+
+def prepare_project_dirs(base_output, project_name):
+    """
+    Note: 统一的项目目录布局 <output>/<project>/{Runs,PDFs}
+    Returns: (project_dir, images_dir, pdf_dir)
+    """
+    project_dir = os.path.join(base_output, project_name)
+    images_dir = os.path.join(project_dir, "Runs")
+    pdf_dir = os.path.join(project_dir, "PDFs")
+    os.makedirs(images_dir, exist_ok=True)
+    os.makedirs(pdf_dir, exist_ok=True)
+    return project_dir, images_dir, pdf_dir
@@ -0,0 +1,202 @@
+import glob
+import os
+import struct
+import zlib
+
+import cv2
+
+from src.utils.file_ops import cv2_imread_safe
+
+# 纸张尺寸 (pt, 竖版)，横版幻灯片会自动旋转为横向
+PAGE_SIZES = {
+    "a4": (595.28, 841.89),
+    "letter": (612.0, 792.0),
+}
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def jpeg_info(data):
+    """
+    Note: 解析 JPEG 的 SOF 段获取 (宽, 高, 通道数)，不做任何解码
+    Returns: (width, height, components)，非 JPEG 或损坏时返回 None
+    """
+    if data[:2] != b"\xff\xd8":
+        return None
+    i, n = 2, len(data)
+    while i + 4 <= n:
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # 填充字节
+            i += 1
+            continue
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+            i += 2
+            continue
+        seg_len = struct.unpack(">H", data[i + 2:i + 4])[0]
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            if i + 10 > n:
+                return None
+            height, width = struct.unpack(">HH", data[i + 5:i + 9])
+            return width, height, data[i + 9]
+        i += 2 + seg_len
+    return None
+
+
+class StreamingPdfWriter:
+    """
+    Streaming PDF Builder.
+    每页写完立即落盘，内存峰值只与单页大小有关，与页数无关。
+    JPEG 原始字节直接以 DCTDecode 嵌入 (零解码、零重编码)；
+    PNG/WebP 解码后以 FlateDecode 无损嵌入。
+
+    page_size: 'fit' (页面 = 图片尺寸 / dpi) 或 'a4' / 'letter' (居中等比缩放)
+    dpi: 仅 'fit' 模式使用，决定 1 像素对应的物理尺寸 (默认 72，即 1px = 1pt)
+    """
+
+    def __init__(self, path, page_size="fit", dpi=72):
+        if page_size != "fit" and page_size not in PAGE_SIZES:
+            raise ValueError(f"Unknown page size '{page_size}'")
+        self.path = path
+        self.page_size = page_size
+        self.dpi = dpi or 72
+        self.page_count = 0
+
+        self._offsets = {}
+        self._page_ids = []
+        self._next_id = 3  # 1 = Catalog, 2 = Pages (最后写入)
+        self._f = open(path, "wb")
+        self._f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._f.close()
+
+    def _alloc(self):
+        oid = self._next_id
+        self._next_id += 1
+        return oid
+
+    def _write_obj(self, oid, header, stream=None):
+        self._offsets[oid] = self._f.tell()
+        self._f.write(f"{oid} 0 obj\n".encode())
+        if stream is None:
+            self._f.write(header + b"\nendobj\n")
+        else:
+            self._f.write(header + b"\nstream\n")
+            self._f.write(stream)
+            self._f.write(b"\nendstream\nendobj\n")
+
+    def _page_box(self, width, height):
+        """Returns: (页宽, 页高, 图片 x, y, w, h) 单位 pt"""
+        if self.page_size == "fit":
+            pw, ph = width * 72.0 / self.dpi, height * 72.0 / self.dpi
+            return pw, ph, 0.0, 0.0, pw, ph
+        pw, ph = PAGE_SIZES[self.page_size]
+        if width > height:
+            pw, ph = ph, pw
+        scale = min(pw / width, ph / height)
+        w, h = width * scale, height * scale
+        return pw, ph, (pw - w) / 2, (ph - h) / 2, w, h
+
+    def add_image_file(self, image_path):
+        with open(image_path, "rb") as f:
+            data = f.read()
+        info = jpeg_info(data)
+        if info and info[2] in (1, 3):
+            width, height, comps = info
+            color = b"/DeviceGray" if comps == 1 else b"/DeviceRGB"
+            self._add_page(width, height, color, b"/DCTDecode", data)
+            return
+
+        # Fallback: 非 JPEG (或 CMYK JPEG) 逐页解码，无损压缩后嵌入
+        img = cv2_imread_safe(image_path, cv2.IMREAD_COLOR)
+        if img is None:
+            raise ValueError(f"Cannot read image: {image_path}")
+        rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        height, width = rgb.shape[:2]
+        self._add_page(width, height, b"/DeviceRGB", b"/FlateDecode", zlib.compress(rgb.tobytes(), 6))
+
+    def _add_page(self, width, height, color, filt, data):
+        img_id, content_id, page_id = self._alloc(), self._alloc(), self._alloc()
+        pw, ph, x, y, w, h = self._page_box(width, height)
+
+        self._write_obj(img_id, (
+            f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+            f"/BitsPerComponent 8 /ColorSpace ").encode() + color + b" /Filter " + filt +
+            f" /Length {len(data)} >>".encode(), data)
+
+        content = f"q {w:.2f} 0 0 {h:.2f} {x:.2f} {y:.2f} cm /Im0 Do Q".encode()
+        self._write_obj(content_id, f"<< /Length {len(content)} >>".encode(), content)
+
+        self._write_obj(page_id, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {pw:.2f} {ph:.2f}] "
+            f"/Resources << /XObject << /Im0 {img_id} 0 R >> >> /Contents {content_id} 0 R >>").encode())
+        self._page_ids.append(page_id)
+        self.page_count += 1
+
+    def close(self):
+        if self._f.closed:
+            return
+        kids = " ".join(f"{pid} 0 R" for pid in self._page_ids)
+        self._write_obj(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._page_ids)} >>".encode())
+        self._write_obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+
+        xref_pos = self._f.tell()
+        size = self._next_id
+        self._f.write(f"xref\n0 {size}\n0000000000 65535 f \n".encode())
+        for oid in range(1, size):
+            self._f.write(f"{self._offsets[oid]:010d} 00000 n \n".encode())
+        self._f.write(f"trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref_pos}\n%%EOF\n".encode())
+        self._f.close()
+
+
+def images_to_pdf(image_paths, pdf_path, page_size="fit", dpi=72):
+    """
+    Note: 将抽取出的幻灯片按顺序合并为单个 PDF (流式写入)
+    Args:
+        image_paths: 图片路径列表 (按页序)
+        pdf_path: 输出 PDF 路径
+        page_size: 'fit' / 'a4' / 'letter'
+        dpi: 'fit' 模式下的像素密度
+    """
+    if not image_paths:
+        return None
+
+    tmp_path = pdf_path + ".part"
+    try:
+        with StreamingPdfWriter(tmp_path, page_size=page_size, dpi=dpi) as pdf:
+            for p in image_paths:
+                pdf.add_image_file(p)
+        os.replace(tmp_path, pdf_path)
+    except BaseException:
+        # Safety: 写到一半失败 (坏图、磁盘满、Ctrl+C) 时不留下残缺的 .part 文件
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return pdf_path
+
+
+def project_slides(project_dir):
+    """Returns: 项目 Runs/ 目录下按页序排列的幻灯片路径"""
+    runs = os.path.join(project_dir, "Runs")
+    paths = [p for p in glob.glob(os.path.join(runs, "slide_*")) if p.lower().endswith(IMAGE_EXTS)]
+    return sorted(paths)
+
+
+def build_project_pdf(project_dir, page_size="fit", dpi=72):
+    """Note: 对已有项目目录 (Runs/) 事后重新生成 PDFs/<项目名>_Full.pdf"""
+    slides = project_slides(project_dir)
+    if not slides:
+        return None
+    project_name = os.path.basename(os.path.normpath(project_dir))
+    pdf_dir = os.path.join(project_dir, "PDFs")
+    os.makedirs(pdf_dir, exist_ok=True)
+    return images_to_pdf(slides, os.path.join(pdf_dir, f"{project_name}_Full.pdf"), page_size, dpi)